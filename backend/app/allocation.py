@@ -0,0 +1,86 @@
+"""
+Dock allocation strategies for POST /bookings/auto.
+
+All strategies work on a DayOccupancy (minute bitmasks per dock). A dock with no
+room in the window is ruled out with a few bitmask operations; only docks that fit
+have their free runs scored. Each dock's best placement is cached on the day until
+that dock's bookings change, so repeated queries only rescore the docks that moved.
+
+    best_fit           fill the smallest hole the booking fits in (keeps big holes open)
+    least_utilized     spread load: the dock with the fewest booked minutes that day
+    min_fragmentation  avoid leaving slivers shorter than the booking on either side
+"""
+import heapq
+from typing import Iterable, List, Optional, Tuple
+
+from .occupancy import DayOccupancy, MINUTES_PER_DAY
+
+STRATEGIES = ("best_fit", "least_utilized", "min_fragmentation")
+
+_step_masks = {}
+
+
+def _step_mask(step: int) -> int:
+    """Bits at every multiple of `step` minutes from midnight."""
+    mask = _step_masks.get(step)
+    if mask is None:
+        mask = _step_masks[step] = sum(1 << minute for minute in range(0, MINUTES_PER_DAY, step))
+    return mask
+
+
+def _align_up(minute: int, step: int) -> int:
+    return -(-minute // step) * step
+
+
+def _align_down(minute: int, step: int) -> int:
+    return minute // step * step
+
+
+def _dock_best(occupancy: DayOccupancy, dock_id: int, start_min: int, end_min: int,
+               duration: int, step: int, strategy: str) -> Optional[tuple]:
+    """(score..., start, dock_id) of the best placement on one dock, or None if it has no room."""
+    starts = occupancy.start_mask(dock_id, start_min, end_min, duration) & _step_mask(step)
+    if not starts:
+        return None
+    if strategy == "least_utilized":
+        first = (starts & -starts).bit_length() - 1
+        return (occupancy.booked_minutes(dock_id), first, dock_id)
+
+    best = None
+    for run_start, run_end in occupancy.free_runs(dock_id, start_min, end_min):
+        first = _align_up(run_start, step)
+        last = _align_down(run_end - duration, step)
+        if first > last:
+            continue
+        if strategy == "best_fit":
+            candidate = (run_end - run_start - duration, first, dock_id)
+            best = candidate if best is None or candidate < best else best
+            continue
+        # min_fragmentation: packing against either edge of the run leaves at most one leftover piece
+        for start in (first, last):
+            pieces = [piece for piece in (start - run_start, run_end - start - duration) if piece > 0]
+            slivers = sum(1 for piece in pieces if piece < duration)
+            candidate = (slivers, len(pieces), start, dock_id)
+            best = candidate if best is None or candidate < best else best
+    return best
+
+
+def rank(occupancy: DayOccupancy, dock_ids: Iterable[int], start_min: int, end_min: int,
+         duration: int, step: int = 15, strategy: str = "best_fit", limit: int = 5) -> List[Tuple[int, int]]:
+    """
+    Best placements as (dock_id, start_minute), best first, at most one per dock.
+    Start minutes are multiples of `step` from midnight; the booking lies inside [start_min, end_min).
+    """
+    if strategy not in STRATEGIES:
+        raise ValueError(f"Unknown strategy '{strategy}', expected one of {', '.join(STRATEGIES)}")
+    cache = occupancy.placement_cache((start_min, end_min, duration, step, strategy))
+    found = []
+    for dock_id in dock_ids:
+        try:
+            best = cache[dock_id]
+        except KeyError:
+            best = cache[dock_id] = _dock_best(occupancy, dock_id, start_min, end_min, duration, step, strategy)
+        if best is not None:
+            found.append(best)
+    # Every score ends with (start, dock_id)
+    return [(best[-1], best[-2]) for best in heapq.nsmallest(limit, found)]
@@ -0,0 +1,132 @@
+import os
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from . import models
+
+# A dock's working minutes per day: the capacity of a daily bucket (the old dock card
+# assumed 8 one-hour slots). Hourly buckets have 60.
+OPERATING_MINUTES_PER_DAY = int(os.getenv("OPERATING_MINUTES_PER_DAY", "480"))
+# Longest range one /analytics/utilization request may cover, per granularity
+MAX_RANGE_DAYS = {"hour": int(os.getenv("ANALYTICS_MAX_HOURLY_DAYS", "62")), "day": int(os.getenv("ANALYTICS_MAX_DAILY_DAYS", "3660"))}
+
+HOUR = "hour"
+DAY = "day"
+GRANULARITIES = {HOUR: timedelta(hours=1), DAY: timedelta(days=1)}
+CAPACITY_MINUTES = {HOUR: 60, DAY: OPERATING_MINUTES_PER_DAY}
+
+# Summed per (bucket, dock) in the rollup tables
+MEASURES = ("booked_minutes", "bookings", "cancelled", "completed", "late", "no_show", "turnaround_minutes", "turnarounds")
+
+
+class Fact(NamedTuple):
+    """What a booking contributes to the rollups; crud diffs the fact before and after a write."""
+    dock_id: int
+    start_time: datetime
+    end_time: datetime
+    status: models.BookingStatus
+    turnaround_minutes: Optional[int] # Arrived -> Completed, once both are known
+
+
+def fact(booking) -> Optional[Fact]:
+    """From a models.Booking (or BookingArchive row)."""
+    if booking is None or not booking.start_time or not booking.end_time:
+        return None
+    turnaround = None
+    if booking.status == models.BookingStatus.COMPLETED and booking.arrived_at and booking.completed_at:
+        turnaround = max(int((booking.completed_at - booking.arrived_at).total_seconds() // 60), 0)
+    # Naive like the stored values (an update may still hold the request's aware datetimes)
+    return Fact(booking.dock_id, _naive(booking.start_time), _naive(booking.end_time), booking.status, turnaround)
+
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == DAY:
+        return datetime.combine(moment.date(), time())
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def buckets(start: datetime, end: datetime, granularity: str) -> List[datetime]:
+    """Bucket starts covering [start, end)."""
+    step = GRANULARITIES[granularity]
+    found = []
+    current = bucket_start(start, granularity)
+    while current < end:
+        found.append(current)
+        current += step
+    return found
+
+
+def _minute(moment: datetime) -> int:
+    """Whole minutes since the epoch, rounded up like the occupancy index."""
+    return -int(-(moment - datetime(1970, 1, 1)).total_seconds() // 60)
+
+
+def contributions(item: Fact, granularity: str) -> Dict[datetime, Dict[str, int]]:
+    """{bucket start: measures}: booked minutes split over the buckets, counts on the start bucket."""
+    found = {}
+    if item.status != models.BookingStatus.CANCELLED:
+        step = GRANULARITIES[granularity]
+        for bucket in buckets(item.start_time, item.end_time, granularity):
+            minutes = _minute(min(item.end_time, bucket + step)) - _minute(max(item.start_time, bucket))
+            if minutes > 0:
+                found[bucket] = {"booked_minutes": minutes}
+
+    counts = found.setdefault(bucket_start(item.start_time, granularity), {})
+    if item.status == models.BookingStatus.CANCELLED:
+        counts["cancelled"] = 1
+    else:
+        counts["bookings"] = 1
+    if item.status == models.BookingStatus.COMPLETED:
+        counts["completed"] = 1
+    elif item.status == models.BookingStatus.LATE:
+        counts["late"] = 1
+    elif item.status == models.BookingStatus.NO_SHOW:
+        counts["no_show"] = 1
+    if item.turnaround_minutes is not None:
+        counts["turnaround_minutes"] = item.turnaround_minutes
+        counts["turnarounds"] = 1
+    return found
+
+
+def deltas(changes: Iterable[Tuple[Optional[Fact], Optional[Fact]]], granularity: str,
+           start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[dict]:
+    """
+    Rows to add to a rollup table for (old, new) fact pairs (None = no booking), netted
+    per (bucket, dock) with all-zero rows dropped. start/end clip buckets (backfill).
+    """
+    totals: Dict[Tuple[datetime, int], Dict[str, int]] = {}
+    for old, new in changes:
+        for item, sign in ((old, -1), (new, 1)):
+            if item is None:
+                continue
+            for bucket, measures in contributions(item, granularity).items():
+                if (start and bucket < start) or (end and bucket >= end):
+                    continue
+                row = totals.setdefault((bucket, item.dock_id), dict.fromkeys(MEASURES, 0))
+                for name, value in measures.items():
+                    row[name] += sign * value
+    return [
+        {"bucket_start": bucket, "dock_id": dock_id, **row}
+        for (bucket, dock_id), row in sorted(totals.items(), key=lambda item: (item[0][0], item[0][1] or 0))
+        if any(row.values())
+    ]
+
+
+def summarize(row: dict, capacity_minutes: int) -> dict:
+    """Derived fields for one response row: idle minutes, utilization and average turnaround."""
+    booked = min(row["booked_minutes"], capacity_minutes)
+    turnarounds = row.pop("turnarounds")
+    turnaround_minutes = row.pop("turnaround_minutes")
+    row["idle_minutes"] = capacity_minutes - booked
+    row["utilization_percent"] = round(booked * 100 / capacity_minutes, 1) if capacity_minutes else 0
+    row["avg_turnaround_minutes"] = round(turnaround_minutes / turnarounds, 1) if turnarounds else None
+    return row
+
+
+def day_range(start: date, end: date) -> Tuple[datetime, datetime]:
+    """[start, end] as inclusive dates -> [start 00:00, the day after end 00:00)."""
+    return datetime.combine(start, time()), datetime.combine(end + timedelta(days=1), time())
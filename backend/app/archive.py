@@ -0,0 +1,149 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.exc import IntegrityError
+
+from . import metrics, models
+from .database import AsyncSessionLocal, on_primary
+
+ARCHIVE_ENABLED = os.getenv("ARCHIVE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+# Finished bookings (Cancelled, Completed, No Show) that ended this long ago are archived
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "90"))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "1000")) # Rows per transaction
+ARCHIVE_INTERVAL_SECONDS = float(os.getenv("ARCHIVE_INTERVAL_SECONDS", "3600"))
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("ARCHIVE_PAUSE_SECONDS", "0.05")) # Between batches, so writers get the locks
+# How long a worker trusts its copy of the archive's newest start_time
+ARCHIVE_WATERMARK_TTL_SECONDS = float(os.getenv("ARCHIVE_WATERMARK_TTL_SECONDS", "60"))
+
+archived_total = metrics.Counter("simpledock_archived_bookings_total", "Bookings moved to bookings_archive.")
+
+
+def cutoff(after_days: float = ARCHIVE_AFTER_DAYS) -> datetime:
+    return datetime.now() - timedelta(days=after_days)
+
+
+async def archive_batch(db, before: datetime, batch_size: int = ARCHIVE_BATCH_SIZE) -> int:
+    """
+    Moves up to batch_size finished bookings that ended before `before`, in one short
+    transaction. Returns how many were moved.
+    """
+    booking = models.Booking.__table__
+    candidates = (
+        select(booking.c.id)
+        .where(models.finished(), booking.c.end_time < before)
+        .order_by(booking.c.end_time)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True) # Postgres: rows a writer holds wait for the next pass
+    )
+    try:
+        ids = (await db.execute(candidates)).scalars().all()
+        if not ids:
+            await db.rollback()
+            return 0
+        # Every bookings column is copied; archived_at takes its default
+        columns = [column.name for column in booking.c]
+        await db.execute(
+            insert(models.BookingArchive).from_select(columns, select(*booking.c).where(booking.c.id.in_(ids)))
+        )
+        await db.execute(delete(models.Booking).where(models.Booking.id.in_(ids)).execution_options(synchronize_session=False))
+        await db.commit()
+    except IntegrityError:
+        # SQLite: another worker archived the same rows first
+        await db.rollback()
+        return 0
+    archived_total.inc(len(ids))
+    return len(ids)
+
+
+async def archive(session_factory=AsyncSessionLocal, after_days: float = ARCHIVE_AFTER_DAYS,
+                  batch_size: int = ARCHIVE_BATCH_SIZE, pause: float = ARCHIVE_PAUSE_SECONDS) -> int:
+    """One pass: batches until nothing old enough is left. Returns the number of bookings moved."""
+    before = cutoff(after_days)
+    moved = 0
+    while True:
+        async with session_factory() as db:
+            count = await archive_batch(db, before, batch_size)
+        moved += count
+        if count:
+            archive_watermark.bump(before)
+        if count < batch_size:
+            return moved
+        await asyncio.sleep(pause)
+
+
+class ArchiveWatermark:
+    """
+    Whether a listing reaching back to `lower` must read bookings_archive too. Nothing
+    newer than the cutoff is ever archived, so that bound needs no query; the archive's
+    newest start_time (cached) covers passes run with a shorter horizon.
+    """
+
+    def __init__(self, ttl_seconds: float = ARCHIVE_WATERMARK_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._newest: Optional[datetime] = None
+        self._loaded_at = 0.0
+
+    async def needed(self, db, lower: Optional[datetime]) -> bool:
+        if lower is None:
+            return True
+        if lower.tzinfo:
+            lower = lower.replace(tzinfo=None)
+        if lower < cutoff():
+            return True
+        if time.monotonic() - self._loaded_at >= self.ttl_seconds:
+            async with on_primary(db) as source: # Shared by all of this worker's reads
+                self._newest = await source.scalar(select(func.max(models.BookingArchive.start_time)))
+            self._loaded_at = time.monotonic()
+        return self._newest is not None and lower <= self._newest
+
+    def invalidate(self):
+        """Forget the cached newest start_time; the next check reads it again."""
+        self._newest = None
+        self._loaded_at = 0.0
+
+    def bump(self, before: datetime):
+        """This worker just archived bookings ending before `before`."""
+        self._newest = max(self._newest or before, before)
+
+
+class BookingArchiver:
+    """Runs an archive pass every ARCHIVE_INTERVAL_SECONDS in the background of each worker."""
+
+    def __init__(self, session_factory=AsyncSessionLocal, interval: float = ARCHIVE_INTERVAL_SECONDS):
+        self.session_factory = session_factory
+        self.interval = interval
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def run(self):
+        while True:
+            try:
+                started = time.perf_counter()
+                moved = await archive(self.session_factory)
+                if moved:
+                    print(f"Archived {moved} bookings in {time.perf_counter() - started:.1f}s")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Booking archiver error: {e}")
+            await asyncio.sleep(self.interval)
+
+
+# Singleton instances
+archive_watermark = ArchiveWatermark()
+booking_archiver = BookingArchiver()
@@ -1,9 +1,31 @@
+import asyncio
+import base64
+import contextlib
+import heapq
+import json
+import os
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import selectinload
 from typing import List
-from sqlalchemy import and_, or_
-from . import models, schemas
-from datetime import datetime, date
+from sqlalchemy import and_, or_, case, delete, exists, insert, literal, union_all, update
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from . import allocation, analytics, models, notifications, recurrence, schemas
+from .recurrence import recurrence_index
+from .archive import archive_watermark
+from .notifications import notification_dispatcher
+from .occupancy import occupancy_index, snapshot, MINUTES_PER_DAY, OCCUPANCY_LOOKBACK_HOURS
+from .events import schedule_hub
+from .response_cache import response_cache, bookings_scope, DOCKS
+from datetime import datetime, date, time, timedelta
+
+# Placements tried by auto-assign before giving up (each failed try means another writer won)
+AUTO_ASSIGN_ATTEMPTS = int(os.getenv("AUTO_ASSIGN_ATTEMPTS", "5"))
+# Day lookups (occupancy, utilization backfill) find the bookings running into a day by
+# start time, looking back this far; a longer booking would be missed by them
+MAX_BOOKING_DURATION = timedelta(hours=OCCUPANCY_LOOKBACK_HOURS)
 
 async def get_docks(db: AsyncSession, skip: int = 0, limit: int = 100):
     result = await db.execute(select(models.Dock).offset(skip).limit(limit))
@@ -14,71 +36,882 @@ async def create_dock(db: AsyncSession, dock: schemas.DockCreate):
     db.add(db_dock)
     await db.commit()
     await db.refresh(db_dock)
+    await response_cache.invalidate(DOCKS)
     return db_dock
 
-async def get_bookings(db: AsyncSession, skip: int = 0, limit: int = 100, dock_id: int = None, date_filter: date = None):
-    stmt = select(models.Booking)
+def encode_cursor(booking: models.Booking) -> str:
+    """Opaque keyset cursor for the (start_time, id) ordering."""
+    raw = json.dumps([booking.start_time.isoformat(), booking.id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    """Raises ValueError for anything that isn't a cursor we issued."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        start_time, booking_id = json.loads(raw)
+        return datetime.fromisoformat(start_time), int(booking_id)
+    except Exception as e:
+        raise ValueError("Invalid cursor") from e
+
+def _bookings_query(dock_id: int = None, date_filter: date = None, start_from: datetime = None,
+                    start_to: datetime = None, statuses: List[models.BookingStatus] = None, model=models.Booking):
+    """Listing query on `model`: models.Booking or models.BookingArchive (same columns)."""
+    stmt = select(model)
     
     constraints = []
     if dock_id:
-        constraints.append(models.Booking.dock_id == dock_id)
+        constraints.append(model.dock_id == dock_id)
         
     if date_filter:
         start_of_day = datetime.combine(date_filter, datetime.min.time())
         end_of_day = datetime.combine(date_filter, datetime.max.time())
-        constraints.append(models.Booking.start_time >= start_of_day)
-        constraints.append(models.Booking.start_time <= end_of_day)
+        constraints.append(model.start_time >= start_of_day)
+        constraints.append(model.start_time <= end_of_day)
+
+    # Range filters on start_time so the start_time index bounds the scan
+    if start_from:
+        constraints.append(model.start_time >= start_from)
+    if start_to:
+        constraints.append(model.start_time < start_to)
+    if statuses:
+        constraints.append(model.status.in_(statuses))
         
     if constraints:
         stmt = stmt.where(and_(*constraints))
-        
-    stmt = stmt.offset(skip).limit(limit)
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    return stmt.order_by(model.start_time, model.id)
+
+async def _listing_models(db: AsyncSession, date_filter: date = None, start_from: datetime = None,
+                          statuses: List[models.BookingStatus] = None):
+    """The tables a listing has to read: bookings_archive only when the range reaches back that far."""
+    if statuses and not set(statuses) & set(models.FINISHED_STATUSES):
+        return [models.Booking]
+    lower, _ = _listing_range(date_filter, start_from)
+    if await archive_watermark.needed(db, lower):
+        return [models.Booking, models.BookingArchive]
+    return [models.Booking]
+
+def _listing_range(date_filter: date = None, start_from: datetime = None, start_to: datetime = None):
+    """[lower, upper) on start_time implied by the listing filters; None where unbounded."""
+    lower = [bound for bound in (start_from, date_filter and datetime.combine(date_filter, time())) if bound]
+    upper = [bound for bound in (start_to, date_filter and datetime.combine(date_filter + timedelta(days=1), time())) if bound]
+    return max(lower) if lower else None, min(upper) if upper else None
+
+def _booking_order(booking):
+    return booking.start_time, booking.id
+
+async def _listed_occurrences(db: AsyncSession, dock_id: int = None, date_filter: date = None, start_from: datetime = None,
+                              start_to: datetime = None, statuses: List[models.BookingStatus] = None):
+    """Recurring occurrences matching the listing filters, as transient bookings in listing order."""
+    catalog = await recurrence_index.catalog(db)
+    if not catalog.series or (statuses and models.BookingStatus.CONFIRMED not in statuses):
+        return []
+    lower, upper = _listing_range(date_filter, start_from, start_to)
+    if lower is None:
+        lower = datetime.combine(catalog.first_date(), time())
+    if upper is None:
+        # Open-ended series never end; show a horizon of them
+        upper = datetime.combine(max(date.today(), lower.date()) + timedelta(days=recurrence.RECURRING_LIST_HORIZON_DAYS), time())
+    return [
+        occurrence.to_booking(catalog.series[occurrence.series_id])
+        for occurrence in catalog.between(_naive(lower), _naive(upper))
+        if not dock_id or occurrence.dock_id == dock_id
+    ]
+
+async def get_bookings(db: AsyncSession, skip: int = 0, limit: int = 100, dock_id: int = None, date_filter: date = None,
+                       start_from: datetime = None, start_to: datetime = None,
+                       statuses: List[models.BookingStatus] = None, cursor: str = None):
+    """
+    Bookings ordered by (start_time, id); limit=None returns every match.
+    With `cursor` (from encode_cursor on the last row of the previous page) the page is
+    fetched by keyset instead of offset, so deep pages cost the same as the first.
+    Occurrences of recurring bookings in the range are merged in (negative ids), and so
+    are archived bookings when the range reaches back to them (same ids as before).
+    """
+    sources = await _listing_models(db, date_filter, start_from, statuses)
+    stmts = [_bookings_query(dock_id, date_filter, start_from, start_to, statuses, model) for model in sources]
+    occurrences = await _listed_occurrences(db, dock_id, date_filter, start_from, start_to, statuses)
+    if cursor:
+        after_start, after_id = decode_cursor(cursor)
+        stmts = [
+            stmt.where(or_(
+                model.start_time > after_start,
+                and_(model.start_time == after_start, model.id > after_id)
+            ))
+            for stmt, model in zip(stmts, sources)
+        ]
+        occurrences = [occurrence for occurrence in occurrences if _booking_order(occurrence) > (after_start, after_id)]
+        skip = 0
+    elif not occurrences and len(stmts) == 1:
+        stmts = [stmts[0].offset(skip)]
+        skip = 0
+    elif limit is not None:
+        # The merged page can hold at most skip + limit rows from either side
+        limit += skip
+
+    pages = [(await db.execute(stmt.limit(limit))).scalars().all() for stmt in stmts]
+    if len(pages) == 1 and not occurrences:
+        return pages[0]
+    merged = list(heapq.merge(*pages, occurrences[:limit], key=_booking_order))
+    return merged[skip:limit]
+
+async def stream_bookings(db: AsyncSession, dock_id: int = None, start_from: datetime = None,
+                          start_to: datetime = None, statuses: List[models.BookingStatus] = None,
+                          batch_size: int = 1000):
+    """
+    Yields matching bookings from server-side cursors, batch_size rows in memory at a
+    time. Archived bookings in the range are merged in, in the same order.
+    """
+    streams = []
+    for model in await _listing_models(db, None, start_from, statuses):
+        stmt = _bookings_query(dock_id, None, start_from, start_to, statuses, model)
+        streams.append((await db.stream_scalars(stmt.execution_options(yield_per=batch_size))).__aiter__())
+
+    # Merge by (start_time, id): keep the head of each stream
+    heads = []
+    for index, stream in enumerate(streams):
+        booking = await anext(stream, None)
+        if booking is not None:
+            heapq.heappush(heads, (_booking_order(booking), index, booking))
+    while heads:
+        _, index, booking = heapq.heappop(heads)
+        yield booking
+        following = await anext(streams[index], None)
+        if following is not None:
+            heapq.heappush(heads, (_booking_order(following), index, following))
+
+# SQLite has no exclusion constraints, so booking writers in this process take turns.
+# (Across processes the conditional INSERT is still a single atomic statement.)
+_sqlite_booking_lock = asyncio.Lock()
+
+def _booking_write_lock(db: AsyncSession):
+    if db.bind.dialect.name == "sqlite":
+        return _sqlite_booking_lock
+    return contextlib.nullcontext()
+
+def _range_error(start_time: datetime, end_time: datetime):
+    """Why [start_time, end_time) can't be booked, or None."""
+    if end_time <= start_time:
+        # Postgres' tsrange() in bookings_no_overlap would reject it with a DataError
+        return "end_time must be after start_time"
+    if end_time - start_time > MAX_BOOKING_DURATION:
+        return f"A booking can last at most {OCCUPANCY_LOOKBACK_HOURS:g} hours"
+    return None
+
+def _naive(value: datetime) -> datetime:
+    return value.replace(tzinfo=None) if value.tzinfo else value
+
+async def _conflicts_with_occurrence(db: AsyncSession, dock_id: int, start_time: datetime, end_time: datetime,
+                                     ignore_occurrence: int = None) -> bool:
+    catalog = await recurrence_index.catalog(db, fresh=True)
+    return bool(catalog.series) and any(
+        occurrence.id != ignore_occurrence
+        for occurrence in catalog.overlapping(_naive(start_time), _naive(end_time), dock_id)
+    )
 
 async def create_booking(db: AsyncSession, booking: schemas.BookingCreate):
-    # Overlap Check
+    """
+    Returns the new booking, or None when the slot is taken.
+    Raises ValueError for an empty, inverted or too long time range.
+    """
+    error = _range_error(booking.start_time, booking.end_time)
+    if error:
+        raise ValueError(error)
+    # Overlap Check and INSERT in one statement:
+    # INSERT INTO bookings (...) SELECT :values WHERE NOT EXISTS (overlapping booking) RETURNING *
     # (StartA < EndB) and (EndA > StartB)
-    stmt = select(models.Booking).where(
+    overlapping = select(models.Booking.id).where(
         and_(
             models.Booking.dock_id == booking.dock_id,
             models.Booking.start_time < booking.end_time,
             models.Booking.end_time > booking.start_time,
-            models.Booking.status != models.BookingStatus.CANCELLED
+            models.not_cancelled()
         )
     )
-    result = await db.execute(stmt)
-    overlapping = result.scalars().first()
-    
-    if overlapping:
-        return None # Indicate failure
+    values = {**booking.model_dump(), "status": models.BookingStatus.CONFIRMED}
+    columns = models.Booking.__table__.c
+    candidate = select(
+        *[literal(value, type_=columns[name].type).label(name) for name, value in values.items()]
+    ).where(~exists(overlapping))
+    stmt = insert(models.Booking).from_select(list(values), candidate).returning(models.Booking)
 
-    db_booking = models.Booking(**booking.model_dump(), status=models.BookingStatus.CONFIRMED)
-    db.add(db_booking)
-    await db.commit()
-    db.add(db_booking)
-    await db.commit()
-    await db.refresh(db_booking)
+    async with _booking_write_lock(db):
+        # Standing appointments aren't rows, so they are checked first (from the expansion,
+        # revalidated against the series version); under the lock, like create_recurring_booking
+        if await _conflicts_with_occurrence(db, booking.dock_id, booking.start_time, booking.end_time):
+            return None
+        try:
+            result = await db.execute(stmt)
+            db_booking = result.scalars().first()
+            if db_booking is None:
+                await db.rollback()
+                return None # Indicate failure
+            await _record_driver_visit(db, db_booking)
+            await _record_utilization(db, [(None, analytics.fact(db_booking))])
+            await notifications.enqueue(db, [db_booking], "booking.confirmed")
+            await db.commit()
+        except IntegrityError:
+            # Postgres: the bookings_no_overlap exclusion constraint rejected a concurrent insert
+            await db.rollback()
+            return None
+
+    occupancy_index.apply(db_booking.id, None, snapshot(db_booking))
+    notification_dispatcher.wake()
+    await response_cache.invalidate(DOCKS, bookings_scope(db_booking.start_time.date()))
+    await schedule_hub.publish_booking("booking.created", db_booking)
     return db_booking
 
+def _sweep(existing, rows):
+    """
+    Sweep-line over one dock's intervals.
+    existing: (start, end) of booked intervals; rows: (start, end, row) candidates.
+    Candidates are taken in start order, so within a batch the earlier booking wins.
+    Returns {row: None if accepted else reason}.
+    """
+    existing = sorted(existing)
+    outcome = {}
+    busy_existing = busy_batch = None
+    next_existing = 0
+    for start, end, row in sorted(rows):
+        while next_existing < len(existing) and existing[next_existing][0] <= start:
+            if busy_existing is None or existing[next_existing][1] > busy_existing:
+                busy_existing = existing[next_existing][1]
+            next_existing += 1
+        if (busy_existing is not None and start < busy_existing) or \
+                (next_existing < len(existing) and existing[next_existing][0] < end):
+            outcome[row] = "Time slot already booked"
+        elif busy_batch is not None and start < busy_batch:
+            outcome[row] = "Overlaps another booking in this batch"
+        else:
+            outcome[row] = None
+            busy_batch = end
+    return outcome
+
+async def create_bookings_bulk(db: AsyncSession, bookings: List[schemas.BookingCreate], attempts: int = 3):
+    """
+    Creates many bookings at once: one range query for the existing bookings of the
+    affected docks, an in-memory sweep for overlaps (against the database and within
+    the batch), then one multi-row INSERT ... RETURNING for the accepted rows.
+    Returns {index: (booking, None) | (None, reason)} for every input row.
+    """
+    results = {}
+    candidates = {}
+    for index, booking in enumerate(bookings):
+        error = _range_error(booking.start_time, booking.end_time)
+        if error:
+            results[index] = (None, error)
+        else:
+            candidates[index] = booking
+    if not candidates:
+        return results
+
+    dock_ids = {booking.dock_id for booking in candidates.values()}
+    known = set((await db.execute(select(models.Dock.id).where(models.Dock.id.in_(dock_ids)))).scalars().all())
+    for index, booking in list(candidates.items()):
+        if booking.dock_id not in known:
+            results[index] = (None, "Dock not found")
+            del candidates[index]
+    if not candidates:
+        return results
+
+    first_start = min(booking.start_time for booking in candidates.values())
+    last_end = max(booking.end_time for booking in candidates.values())
+    for attempt in range(attempts):
+        async with _booking_write_lock(db):
+            existing = {}
+            rows = await db.execute(
+                select(models.Booking.dock_id, models.Booking.start_time, models.Booking.end_time).where(
+                    and_(
+                        models.Booking.dock_id.in_({booking.dock_id for booking in candidates.values()}),
+                        models.Booking.start_time < last_end,
+                        models.Booking.end_time > first_start,
+                        models.not_cancelled()
+                    )
+                )
+            )
+            for dock_id, start_time, end_time in rows.all():
+                existing.setdefault(dock_id, []).append((start_time, end_time))
+            catalog = await recurrence_index.catalog(db, fresh=True)
+            for occurrence in catalog.overlapping(_naive(first_start), _naive(last_end)):
+                existing.setdefault(occurrence.dock_id, []).append((occurrence.start_time, occurrence.end_time))
+
+            per_dock = {}
+            for index, booking in candidates.items():
+                per_dock.setdefault(booking.dock_id, []).append((booking.start_time, booking.end_time, index))
+            rejected = {}
+            for dock_id, dock_rows in per_dock.items():
+                for index, reason in _sweep(existing.get(dock_id, []), dock_rows).items():
+                    if reason:
+                        rejected[index] = reason
+
+            accepted = [index for index in candidates if index not in rejected]
+            if not accepted:
+                await db.rollback()
+                created = []
+                break
+            values = [
+                {**candidates[index].model_dump(), "status": models.BookingStatus.CONFIRMED}
+                for index in accepted
+            ]
+            try:
+                # Multi-row VALUES batches; sort_by_parameter_order returns the rows in input order
+                result = await db.execute(
+                    insert(models.Booking).returning(models.Booking, sort_by_parameter_order=True), values
+                )
+                created = result.scalars().all()
+                await _record_driver_visits(db, created)
+                await _record_utilization(db, [(None, analytics.fact(db_booking)) for db_booking in created])
+                await notifications.enqueue(db, created, "booking.confirmed")
+                await db.commit()
+                break
+            except IntegrityError:
+                # Postgres: a concurrent writer took one of the slots; re-check and try again
+                await db.rollback()
+                if attempt == attempts - 1:
+                    rejected = {index: "Time slot already booked" for index in candidates}
+                    created, accepted = [], []
+
+    for index, reason in rejected.items():
+        results[index] = (None, reason)
+    for index, db_booking in zip(accepted, created):
+        results[index] = (db_booking, None)
+        occupancy_index.apply(db_booking.id, None, snapshot(db_booking))
+    if created:
+        notification_dispatcher.wake()
+        await response_cache.invalidate(DOCKS, *{bookings_scope(db_booking.start_time.date()) for db_booking in created})
+    for db_booking in created:
+        await schedule_hub.publish_booking("booking.created", db_booking)
+    return results
+
+async def get_availability(db: AsyncSession, day: date, capability: str = None, slot_minutes: int = 60,
+                           day_start: time = time(8, 0), day_end: time = time(17, 0), step_minutes: int = None):
+    """
+    Free slots for a day, answered from the in-memory occupancy index.
+    Only slots with at least one capable, active dock free are returned.
+    """
+    result = await db.execute(select(models.Dock).where(models.Dock.is_active == True).order_by(models.Dock.id))
+    docks = [
+        dock for dock in result.scalars().all()
+        if not capability or capability in (dock.capabilities or [])
+    ]
+    occupancy = await occupancy_index.get_day(db, day)
+
+    step = step_minutes or slot_minutes
+    first = day_start.hour * 60 + day_start.minute
+    last = min(day_end.hour * 60 + day_end.minute, MINUTES_PER_DAY)
+    if day == date.today():
+        # Slots that already started can't be booked
+        now = datetime.now()
+        passed = now.hour * 60 + now.minute
+        while first < passed:
+            first += step
+
+    slots = []
+    for start_min in range(first, last - slot_minutes + 1, step):
+        end_min = start_min + slot_minutes
+        free = [dock.id for dock in docks if occupancy.is_free(dock.id, start_min, end_min)]
+        if free:
+            slots.append({
+                "start": time(start_min // 60, start_min % 60),
+                "end": time(end_min // 60 % 24, end_min % 60),
+                "free_docks": len(free),
+                "dock_id": free[0],
+            })
+
+    return {
+        "date": day,
+        "capability": capability,
+        "slot_minutes": slot_minutes,
+        "capable_docks": len(docks),
+        "slots": slots,
+    }
+
+class InvalidWindow(ValueError):
+    """An auto-assign window that can never fit a booking; the message is meant for the caller."""
+
+async def auto_assign_booking(db: AsyncSession, request: schemas.AutoBookingRequest):
+    """
+    Picks a capable, active dock and start time inside the request window with the
+    chosen allocation strategy and reserves it through create_booking.
+    Returns None when nothing fits (including a window that is already over).
+    Raises InvalidWindow for an invalid window.
+    """
+    day = request.window_start.date()
+    day_start = datetime.combine(day, time())
+    if request.window_end <= request.window_start:
+        raise InvalidWindow("window_end must be after window_start")
+    if request.window_end > day_start + timedelta(days=1):
+        raise InvalidWindow("The window must not span midnight")
+    if timedelta(minutes=request.duration_minutes) > MAX_BOOKING_DURATION:
+        raise InvalidWindow(f"A booking can last at most {OCCUPANCY_LOOKBACK_HOURS:g} hours")
+
+    result = await db.execute(select(models.Dock.id, models.Dock.capabilities).where(models.Dock.is_active == True))
+    dock_ids = [
+        dock_id for dock_id, capabilities in result.all()
+        if not request.capability or request.capability in (capabilities or [])
+    ]
+    if not dock_ids:
+        return None
+
+    start_min = -int(-(request.window_start - day_start).total_seconds() // 60)
+    end_min = int((request.window_end - day_start).total_seconds() // 60)
+    if day == date.today():
+        now = datetime.now()
+        start_min = max(start_min, now.hour * 60 + now.minute + 1)
+    if start_min + request.duration_minutes > end_min:
+        # Too short for the booking, or (today) too little of it left
+        return None
+
+    fields = request.model_dump(include={"carrier_name", "po_number", "odoo_order_id", "driver_phone"})
+    for attempt in range(AUTO_ASSIGN_ATTEMPTS):
+        occupancy = await occupancy_index.get_day(db, day)
+        placements = allocation.rank(
+            occupancy, dock_ids, start_min, end_min, request.duration_minutes,
+            step=request.step_minutes, strategy=request.strategy, limit=1,
+        )
+        if not placements:
+            return None
+        dock_id, start = placements[0]
+        start_time = day_start + timedelta(minutes=start)
+        db_booking = await create_booking(db, schemas.BookingCreate(
+            dock_id=dock_id,
+            start_time=start_time,
+            end_time=start_time + timedelta(minutes=request.duration_minutes),
+            **fields,
+        ))
+        if db_booking:
+            return db_booking
+        # Another worker booked it and our copy of the day is stale: reload before the next pick
+        occupancy_index.invalidate(day)
+    return None
+
+class StatusConflict(Exception):
+    """The booking's status changed (e.g. by the status sweeper) after it was read for an update."""
+
 async def update_booking(db: AsyncSession, booking_id: int, booking_update: schemas.BookingUpdate):
+    """
+    Returns the updated booking, or None when there is no such booking.
+    Raises ValueError when the new time range is inverted or too long, or the slot is taken,
+    and StatusConflict when someone else changed the status in the meantime.
+    """
+    if booking_id < 0:
+        return await _update_occurrence(db, booking_id, booking_update)
     result = await db.execute(select(models.Booking).where(models.Booking.id == booking_id))
     db_booking = result.scalars().first()
     if db_booking:
+        previous = snapshot(db_booking)
+        previous_fact = analytics.fact(db_booking)
         # Update fields if provided
         if booking_update.status:
             db_booking.status = booking_update.status
+            _stamp_status(db_booking, previous[3])
         if booking_update.dock_id:
             db_booking.dock_id = booking_update.dock_id
         if booking_update.start_time:
             db_booking.start_time = booking_update.start_time
         if booking_update.end_time:
             db_booking.end_time = booking_update.end_time
-            
+        error = _range_error(db_booking.start_time, db_booking.end_time)
+        if error:
+            await db.rollback()
+            raise ValueError(error)
+
+        # The write only goes through if the status is still the one read above: mark_overdue
+        # may have moved it since, and the rollup deltas below start from previous_fact.
+        # First, before anything autoflushes the pending status (Postgres: locks the row).
+        with db.no_autoflush:
+            claimed = await db.execute(
+                update(models.Booking)
+                .where(models.Booking.id == booking_id, models.Booking.status == previous[3])
+                .values(status=db_booking.status)
+                .execution_options(synchronize_session=False)
+            )
+        if claimed.rowcount == 0:
+            await db.rollback()
+            raise StatusConflict(f"The booking is no longer {previous[3].value}")
+
+        # Same non-overlap rule as create_booking when the booking takes up a new slot
+        # (moved, or no longer cancelled)
+        occupies = db_booking.status != models.BookingStatus.CANCELLED
+        moved = snapshot(db_booking)[:3] != previous[:3] or previous[3] == models.BookingStatus.CANCELLED
+        check_overlap = occupies and moved
+        async with _booking_write_lock(db) if check_overlap else contextlib.nullcontext():
+            if check_overlap and await _slot_taken(db, db_booking):
+                await db.rollback()
+                raise ValueError("Time slot already booked")
+            try:
+                if db_booking.start_time != previous[1] and db_booking.driver_phone:
+                    # Moving a visit can change the driver's last_visit
+                    await db.flush()
+                    await _refresh_driver_stats(db, db_booking.driver_phone)
+                await _record_utilization(db, [(previous_fact, analytics.fact(db_booking))])
+                status_changed = db_booking.status != previous[3]
+                if status_changed:
+                    await notifications.enqueue(db, [db_booking], "booking.status_changed", previous_status=previous[3])
+
+                await db.commit()
+            except IntegrityError:
+                # Postgres: the bookings_no_overlap exclusion constraint rejected the move
+                await db.rollback()
+                raise ValueError("Time slot already booked")
+        await db.refresh(db_booking)
+        current = snapshot(db_booking)
+        occupancy_index.apply(db_booking.id, previous, current)
+        if status_changed:
+            notification_dispatcher.wake()
+        await response_cache.invalidate(DOCKS, bookings_scope(previous[1].date()), bookings_scope(current[1].date()))
+        kind = "booking.status_changed" if previous[:3] == current[:3] else "booking.updated"
+        await schedule_hub.publish_booking(kind, db_booking, previous=previous)
+    return db_booking
+
+async def _slot_taken(db: AsyncSession, db_booking: models.Booking, ignore_occurrence: int = None) -> bool:
+    """
+    Whether another booking (or a standing appointment other than `ignore_occurrence`,
+    the one db_booking replaces) overlaps db_booking's slot.
+    """
+    if await _conflicts_with_occurrence(db, db_booking.dock_id, db_booking.start_time, db_booking.end_time, ignore_occurrence):
+        return True
+    constraints = [
+        models.Booking.dock_id == db_booking.dock_id,
+        models.Booking.start_time < db_booking.end_time,
+        models.Booking.end_time > db_booking.start_time,
+        models.not_cancelled(),
+    ]
+    if db_booking.id is not None:
+        constraints.append(models.Booking.id != db_booking.id)
+    overlapping = select(models.Booking.id).where(and_(*constraints))
+    # No autoflush: the pending change to db_booking must not be written before the check
+    with db.no_autoflush:
+        return await db.scalar(select(exists(overlapping)))
+
+def _stamp_status(booking: models.Booking, previous_status: models.BookingStatus):
+    """Arrival/completion times for turnaround; the first transition counts."""
+    if booking.status == previous_status:
+        return
+    now = datetime.now()
+    if booking.status == models.BookingStatus.ARRIVED and booking.arrived_at is None:
+        booking.arrived_at = now
+    elif booking.status == models.BookingStatus.COMPLETED and booking.completed_at is None:
+        booking.completed_at = now
+
+async def mark_overdue(db: AsyncSession, source: models.BookingStatus, target: models.BookingStatus,
+                       overdue, batch_size: int = 1000) -> List[models.Booking]:
+    """
+    One status sweeper step: up to batch_size `source` bookings matching `overdue` (a
+    condition on start_time/end_time) become `target` in a single UPDATE. Rollups,
+    notifications and the transition log are written in the same transaction, like
+    update_booking; caches and schedule listeners hear about it after the commit.
+    Returns the updated bookings.
+    """
+    booking = models.Booking
+    # Literal status so the planner matches ix_bookings_awaiting_start (see not_cancelled())
+    source_literal = literal(source, booking.status.type, literal_execute=True)
+    candidates = (
+        select(booking.id)
+        .where(models.awaiting(), booking.status == source_literal, overdue)
+        .order_by(booking.start_time)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True) # Postgres: rows a writer holds wait for the next sweep
+    )
+    stmt = (
+        update(booking)
+        .where(booking.id.in_(candidates), booking.status == source_literal)
+        .values(status=target)
+        .returning(booking)
+        .execution_options(synchronize_session=False)
+    )
+    bookings = (await db.execute(stmt)).scalars().all()
+    if not bookings:
+        await db.rollback()
+        return []
+
+    changes = []
+    for db_booking in bookings:
+        current = analytics.fact(db_booking)
+        changes.append((current._replace(status=source) if current else None, current))
+    await _record_utilization(db, changes)
+    await notifications.enqueue(db, bookings, "booking.status_changed", previous_status=source)
+    now = datetime.now()
+    await db.execute(insert(models.BookingStatusTransition), [
+        {"booking_id": db_booking.id, "from_status": source, "to_status": target, "changed_at": now}
+        for db_booking in bookings
+    ])
+    await db.commit()
+
+    notification_dispatcher.wake()
+    await response_cache.invalidate(DOCKS, *{bookings_scope(db_booking.start_time.date()) for db_booking in bookings})
+    for db_booking in bookings:
+        previous = snapshot(db_booking)[:3] + (source,)
+        await schedule_hub.publish_booking("booking.status_changed", db_booking, previous=previous)
+    return bookings
+
+async def _recurring_changed():
+    """Series or exceptions changed: every expanded day, occupancy day and cached listing may be stale."""
+    recurrence_index.invalidate()
+    occupancy_index.clear()
+    await response_cache.invalidate_all()
+
+async def _touch_series(db: AsyncSession, series_id: int):
+    """Bumps the series' revision, so other workers' catalogs notice the change (see RecurrenceIndex)."""
+    await db.execute(
+        update(models.RecurringBooking).where(models.RecurringBooking.id == series_id)
+        .values(revision=models.RecurringBooking.revision + 1)
+    )
+
+async def _get_exception(db: AsyncSession, series_id: int, day: date):
+    result = await db.execute(select(models.RecurringException).where(
+        models.RecurringException.recurring_booking_id == series_id,
+        models.RecurringException.occurrence_date == day,
+    ))
+    return result.scalars().first()
+
+async def _update_occurrence(db: AsyncSession, booking_id: int, booking_update: schemas.BookingUpdate):
+    """
+    Updating an occurrence of a recurring booking: cancelling it only records a skip;
+    any other change turns it into a real booking row (and skips the occurrence).
+    """
+    try:
+        series_id, day = recurrence.parse_occurrence_id(booking_id)
+    except ValueError:
+        return None
+    catalog = await recurrence_index.catalog(db, fresh=True)
+    occurrence = catalog.occurrence(series_id, day)
+    if occurrence is None:
+        return None
+    occurrence_booking = occurrence.to_booking(catalog.series[series_id])
+    previous = snapshot(occurrence_booking)
+
+    exception = await _get_exception(db, series_id, day)
+    if exception is None:
+        exception = models.RecurringException(recurring_booking_id=series_id, occurrence_date=day)
+        db.add(exception)
+    exception.kind = "skip"
+    exception.new_dock_id = exception.new_start = exception.new_end = None
+    await _touch_series(db, series_id)
+
+    changes_slot = booking_update.dock_id or booking_update.start_time or booking_update.end_time
+    if booking_update.status == models.BookingStatus.CANCELLED and not changes_slot:
+        occurrence_booking.status = models.BookingStatus.CANCELLED
+        await notifications.enqueue(db, [occurrence_booking], "booking.status_changed", previous_status=previous[3])
         await db.commit()
+        db_booking = None
+    else:
+        db_booking = models.Booking(
+            dock_id=booking_update.dock_id or occurrence.dock_id,
+            start_time=booking_update.start_time or occurrence.start_time,
+            end_time=booking_update.end_time or occurrence.end_time,
+            carrier_name=occurrence_booking.carrier_name,
+            po_number=occurrence_booking.po_number,
+            odoo_order_id=occurrence_booking.odoo_order_id,
+            driver_phone=occurrence_booking.driver_phone,
+            status=booking_update.status or models.BookingStatus.CONFIRMED,
+        )
+        error = _range_error(db_booking.start_time, db_booking.end_time)
+        if error:
+            await db.rollback()
+            raise ValueError(error)
+        _stamp_status(db_booking, models.BookingStatus.CONFIRMED)
+        # Same non-overlap rule as update_booking; the occurrence being replaced doesn't count
+        check_overlap = db_booking.status != models.BookingStatus.CANCELLED
+        async with _booking_write_lock(db) if check_overlap else contextlib.nullcontext():
+            if check_overlap and await _slot_taken(db, db_booking, ignore_occurrence=occurrence.id):
+                await db.rollback()
+                # The check may have loaded the catalog with the skip this rollback undid
+                recurrence_index.invalidate()
+                raise ValueError("Time slot already booked")
+            try:
+                db.add(db_booking)
+                await db.flush()
+                exception.booking_id = db_booking.id
+                await _record_driver_visit(db, db_booking)
+                await _record_utilization(db, [(None, analytics.fact(db_booking))])
+                if db_booking.status != previous[3]:
+                    await notifications.enqueue(db, [db_booking], "booking.status_changed", previous_status=previous[3])
+                await db.commit()
+            except IntegrityError:
+                # Postgres: the bookings_no_overlap exclusion constraint rejected the new row
+                await db.rollback()
+                recurrence_index.invalidate()
+                raise ValueError("Time slot already booked")
         await db.refresh(db_booking)
+        # Viewers drop the occurrence and pick up the row that replaced it
+        occurrence_booking.status = models.BookingStatus.CANCELLED
+
+    await _recurring_changed()
+    notification_dispatcher.wake()
+    await schedule_hub.publish_booking("booking.status_changed", occurrence_booking, previous=previous)
+    if db_booking is None:
+        return occurrence_booking
+    await schedule_hub.publish_booking("booking.created", db_booking)
     return db_booking
 
+async def _recurring_conflicts(db: AsyncSession, dock_id: int, rule: recurrence.Rule, starts_on: date, ends_on,
+                               start_time: time, duration_minutes: int, skip_dates=(), ignore_series: int = None):
+    """Dates on which the series would overlap a booking or another series' occurrence on the dock."""
+    duration = timedelta(minutes=duration_minutes)
+
+    def occurrence_on(day):
+        if day < starts_on or (ends_on and day > ends_on) or day in skip_dates or not recurrence._matches(rule, starts_on, day):
+            return None
+        start = datetime.combine(day, start_time)
+        return start, start + duration
+
+    conflicts = set()
+    # Bookings: every future booking on the dock (an open-ended series never stops)
+    constraints = [
+        models.Booking.dock_id == dock_id,
+        models.Booking.end_time > datetime.combine(starts_on, time()),
+        models.not_cancelled(),
+    ]
+    if ends_on:
+        constraints.append(models.Booking.start_time < datetime.combine(ends_on + timedelta(days=2), time()))
+    rows = await db.execute(select(models.Booking.start_time, models.Booking.end_time).where(and_(*constraints)))
+    for booking_start, booking_end in rows.all():
+        day = booking_start.date() - timedelta(days=1)
+        while day <= booking_end.date():
+            span = occurrence_on(day)
+            if span and span[0] < booking_end and span[1] > booking_start:
+                conflicts.add(day)
+            day += timedelta(days=1)
+
+    # Other series: checked over a bounded window
+    catalog = await recurrence_index.catalog(db, fresh=True)
+    last = min(ends_on or date.max, starts_on + timedelta(days=recurrence.RECURRING_CHECK_DAYS))
+    day = starts_on
+    while catalog.series and day <= last:
+        span = occurrence_on(day)
+        if span and any(o.series_id != ignore_series for o in catalog.overlapping(span[0], span[1], dock_id)):
+            conflicts.add(day)
+        day += timedelta(days=1)
+    return sorted(conflicts)
+
+def _conflict_error(conflicts) -> ValueError:
+    shown = ", ".join(day.isoformat() for day in conflicts[:10])
+    more = f" and {len(conflicts) - 10} more" if len(conflicts) > 10 else ""
+    return ValueError(f"Conflicts with existing bookings on {shown}{more} (pass them as skip_dates to leave them out)")
+
+async def get_recurring_booking(db: AsyncSession, series_id: int):
+    result = await db.execute(
+        select(models.RecurringBooking).options(selectinload(models.RecurringBooking.exceptions))
+        .where(models.RecurringBooking.id == series_id)
+    )
+    return result.scalars().first()
+
+async def get_recurring_bookings(db: AsyncSession, skip: int = 0, limit: int = 100, active_only: bool = True):
+    stmt = select(models.RecurringBooking).options(selectinload(models.RecurringBooking.exceptions))
+    if active_only:
+        stmt = stmt.where(models.RecurringBooking.is_active == True)
+    result = await db.execute(stmt.order_by(models.RecurringBooking.id).offset(skip).limit(limit))
+    return result.scalars().all()
+
+async def create_recurring_booking(db: AsyncSession, request: schemas.RecurringBookingCreate):
+    """Raises ValueError for an invalid rule, unknown dock or conflicting dates."""
+    rule = recurrence.parse_rule(request.rule)
+    if await db.get(models.Dock, request.dock_id) is None:
+        raise ValueError("Dock not found")
+    ends_on = recurrence.last_date(rule, request.starts_on, request.ends_on)
+    if ends_on and ends_on < request.starts_on:
+        raise ValueError("The series ends before it starts")
+    skip_dates = set(request.skip_dates)
+    # Check and commit under the lock create_booking checks occurrences under
+    async with _booking_write_lock(db):
+        conflicts = await _recurring_conflicts(
+            db, request.dock_id, rule, request.starts_on, ends_on, request.start_time, request.duration_minutes, skip_dates,
+        )
+        if conflicts:
+            raise _conflict_error(conflicts)
+
+        series = models.RecurringBooking(
+            **request.model_dump(exclude={"skip_dates", "ends_on"}), ends_on=ends_on, is_active=True,
+            exceptions=[models.RecurringException(occurrence_date=day, kind="skip") for day in sorted(skip_dates)],
+        )
+        db.add(series)
+        await db.commit()
+        await _recurring_changed()
+    return await get_recurring_booking(db, series.id)
+
+async def end_recurring_booking(db: AsyncSession, series_id: int):
+    """Stops a series from today on; past occurrences stay in the history."""
+    series = await get_recurring_booking(db, series_id)
+    if series:
+        yesterday = date.today() - timedelta(days=1)
+        if series.starts_on > yesterday:
+            series.is_active = False
+        else:
+            series.ends_on = min(series.ends_on or yesterday, yesterday)
+        await _touch_series(db, series_id)
+        await db.commit()
+        await _recurring_changed()
+    return series
+
+async def set_recurring_exception(db: AsyncSession, series_id: int, day: date, update: schemas.RecurringExceptionUpdate):
+    """Skips or moves one occurrence. Returns None for an unknown series; raises ValueError otherwise."""
+    series = await get_recurring_booking(db, series_id)
+    if series is None:
+        return None
+    rule = recurrence.parse_rule(series.rule)
+    if not series.is_active or day < series.starts_on or (series.ends_on and day > series.ends_on) \
+            or not recurrence._matches(rule, series.starts_on, day):
+        raise ValueError("The series has no occurrence on that date")
+    exception = await _get_exception(db, series_id, day)
+    if exception is not None and exception.booking_id:
+        raise ValueError(f"That occurrence is now booking {exception.booking_id}; update the booking instead")
+
+    if update.skip:
+        values = {"kind": "skip", "new_dock_id": None, "new_start": None, "new_end": None}
+    else:
+        if not update.new_start or not update.new_end or update.new_end <= update.new_start:
+            raise ValueError("A move needs new_start before new_end")
+        if update.new_end - update.new_start > timedelta(days=1):
+            raise ValueError("An occurrence can last at most a day")
+        new_start, new_end = _naive(update.new_start), _naive(update.new_end)
+        values = {"kind": "move", "new_dock_id": update.new_dock_id, "new_start": new_start, "new_end": new_end}
+
+    async with _booking_write_lock(db):
+        if not update.skip:
+            dock_id = update.new_dock_id or series.dock_id
+            overlapping = await db.execute(select(models.Booking.id).where(and_(
+                models.Booking.dock_id == dock_id,
+                models.Booking.start_time < new_end,
+                models.Booking.end_time > new_start,
+                models.not_cancelled(),
+            )).limit(1))
+            catalog = await recurrence_index.catalog(db, fresh=True)
+            own_id = recurrence.occurrence_id(series_id, day)
+            if overlapping.first() or any(o.id != own_id for o in catalog.overlapping(new_start, new_end, dock_id)):
+                raise ValueError("The new time overlaps another booking")
+
+        if exception is None:
+            exception = models.RecurringException(recurring_booking_id=series_id, occurrence_date=day)
+            db.add(exception)
+        for name, value in values.items():
+            setattr(exception, name, value)
+        await _touch_series(db, series_id)
+        await db.commit()
+        await _recurring_changed()
+    return exception
+
+async def delete_recurring_exception(db: AsyncSession, series_id: int, day: date):
+    """Restores the occurrence as the rule has it. Returns False if there was no exception."""
+    exception = await _get_exception(db, series_id, day)
+    if exception is None:
+        return False
+    if exception.booking_id:
+        raise ValueError(f"That occurrence is now booking {exception.booking_id}; cancel the booking instead")
+    await db.delete(exception)
+    await _touch_series(db, series_id)
+    await db.commit()
+    await _recurring_changed()
+    return True
+
+async def get_occurrences(db: AsyncSession, series_id: int, start: date, end: date):
+    """Occurrences of one series starting in [start, end], as transient bookings."""
+    catalog = await recurrence_index.catalog(db)
+    series = catalog.series.get(series_id)
+    if series is None:
+        return []
+    occurrences = catalog.between(datetime.combine(start, time()), datetime.combine(end + timedelta(days=1), time()))
+    return [occurrence.to_booking(series) for occurrence in occurrences if occurrence.series_id == series_id]
+
 async def update_dock(db: AsyncSession, dock_id: int, dock_update: schemas.DockCreate):
     result = await db.execute(select(models.Dock).where(models.Dock.id == dock_id))
     db_dock = result.scalars().first()
@@ -88,6 +921,7 @@ async def update_dock(db: AsyncSession, dock_id: int, dock_update: schemas.DockC
         db_dock.is_active = dock_update.is_active
         await db.commit()
         await db.refresh(db_dock)
+        await response_cache.invalidate(DOCKS)
     return db_dock
 
 async def delete_dock(db: AsyncSession, dock_id: int):
@@ -96,56 +930,339 @@ async def delete_dock(db: AsyncSession, dock_id: int):
     if db_dock:
         await db.delete(db_dock)
         await db.commit()
+        await response_cache.invalidate(DOCKS)
     return db_dock
 
 from sqlalchemy import func
 
 
 async def get_dock_metrics(db: AsyncSession, dock_id: int):
+    metrics = await get_docks_metrics(db, [dock_id])
+    return metrics[dock_id]
+
+async def get_docks_metrics(db: AsyncSession, dock_ids: List[int]):
+    """
+    Metrics for many docks at once: one grouped count for today's bookings and one
+    windowed query for the next booking per dock, joined in memory.
+    Returns {dock_id: {"today_booking_count", "utilization_percent", "next_booking_info"}}.
+    """
+    metrics = {
+        dock_id: {"today_booking_count": 0, "utilization_percent": 0, "next_booking_info": None}
+        for dock_id in dock_ids
+    }
+    if not dock_ids:
+        return metrics
+
     today = date.today()
-    # Count Bookings Today
-    # Note: SQLite date comparisons can be tricky, but usually standard comparison works if stored as ISO string/datetime.
-    # We'll filter by start_time >= today midnight.
-    
-    # Construct start of today
     start_of_day = datetime.combine(today, datetime.min.time())
     end_of_day = datetime.combine(today, datetime.max.time())
 
-    # Count
-    stmt_count = select(func.count(models.Booking.id)).where(
-        and_(
-            models.Booking.dock_id == dock_id,
-            models.Booking.start_time >= start_of_day,
-            models.Booking.start_time <= end_of_day,
-            models.Booking.status != models.BookingStatus.CANCELLED
+    # Count Bookings Today, grouped per dock
+    stmt_count = (
+        select(models.Booking.dock_id, func.count(models.Booking.id))
+        .where(
+            and_(
+                models.Booking.dock_id.in_(dock_ids),
+                models.Booking.start_time >= start_of_day,
+                models.Booking.start_time <= end_of_day,
+                models.not_cancelled()
+            )
         )
+        .group_by(models.Booking.dock_id)
     )
     result_count = await db.execute(stmt_count)
-    count = result_count.scalar() or 0
+    for dock_id, count in result_count.all():
+        metrics[dock_id]["today_booking_count"] = count
 
-    # Utilization (Mock formula: Count / 8 slots * 100) -> Cap at 100
-    utilization = min(int((count / 8) * 100), 100)
+    # Utilization: today's booked minutes from the daily rollup over the working day
+    daily = models.UtilizationDaily
+    result_booked = await db.execute(
+        select(daily.dock_id, daily.booked_minutes)
+        .where(daily.bucket_start == start_of_day, daily.dock_id.in_(dock_ids))
+    )
+    for dock_id, booked_minutes in result_booked.all():
+        metrics[dock_id]["utilization_percent"] = min(int(booked_minutes * 100 / analytics.OPERATING_MINUTES_PER_DAY), 100)
 
-    # Next Booking
+    # Next Booking per dock: rank upcoming bookings within each dock and keep the first
     now = datetime.now()
-    stmt_next = select(models.Booking).where(
-        and_(
-            models.Booking.dock_id == dock_id,
-            models.Booking.start_time >= now,
-            models.Booking.status != models.BookingStatus.CANCELLED
+    ranked = (
+        select(
+            models.Booking.dock_id,
+            models.Booking.start_time,
+            models.Booking.carrier_name,
+            func.row_number().over(
+                partition_by=models.Booking.dock_id,
+                order_by=(models.Booking.start_time, models.Booking.id)
+            ).label("rank")
         )
-    ).order_by(models.Booking.start_time).limit(1)
-    
+        .where(
+            and_(
+                models.Booking.dock_id.in_(dock_ids),
+                models.Booking.start_time >= now,
+                models.not_cancelled()
+            )
+        )
+        .subquery()
+    )
+    stmt_next = select(ranked.c.dock_id, ranked.c.start_time, ranked.c.carrier_name).where(ranked.c.rank == 1)
     result_next = await db.execute(stmt_next)
-    next_booking = result_next.scalars().first()
-    
-    next_info = None
-    if next_booking:
+    for dock_id, start_time, carrier_name in result_next.all():
         # Format: "HH:MM - Carrier"
-        next_info = f"{next_booking.start_time.strftime('%H:%M')} - {next_booking.carrier_name}"
+        metrics[dock_id]["next_booking_info"] = f"{start_time.strftime('%H:%M')} - {carrier_name}"
+
+    return metrics
+
+def _dialect_insert(db: AsyncSession):
+    """INSERT construct with ON CONFLICT support for the session's database."""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql_insert
+    return sqlite_insert
+
+def _has_driver(booking) -> bool:
+    # Same rule as the old GROUP BY registry: blank phones are not drivers
+    return bool(booking.driver_phone)
+
+async def _record_driver_visit(db: AsyncSession, booking: models.Booking):
+    """Add one visit to the driver's stats row (same transaction as the booking)."""
+    await _record_driver_visits(db, [booking])
+
+async def _record_driver_visits(db: AsyncSession, bookings, chunk_size: int = 1000):
+    """Add visits for many bookings, one upsert row per driver."""
+    visits = {}
+    for booking in bookings:
+        if not _has_driver(booking):
+            continue
+        row = visits.get(booking.driver_phone)
+        if row is None:
+            visits[booking.driver_phone] = {
+                "driver_phone": booking.driver_phone,
+                "carrier_name": booking.carrier_name,
+                "total_visits": 1,
+                "last_visit": booking.start_time,
+            }
+        else:
+            row["total_visits"] += 1
+            row["carrier_name"] = max(row["carrier_name"], booking.carrier_name)
+            row["last_visit"] = max(row["last_visit"], booking.start_time)
+
+    stats = models.DriverStats
+    rows = list(visits.values())
+    for offset in range(0, len(rows), chunk_size):
+        stmt = _dialect_insert(db)(stats).values(rows[offset:offset + chunk_size])
+        new = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[stats.driver_phone],
+            set_={
+                "total_visits": stats.total_visits + new.total_visits,
+                "carrier_name": case(
+                    (or_(stats.carrier_name.is_(None), new.carrier_name > stats.carrier_name), new.carrier_name),
+                    else_=stats.carrier_name,
+                ),
+                "last_visit": case(
+                    (or_(stats.last_visit.is_(None), new.last_visit > stats.last_visit), new.last_visit),
+                    else_=stats.last_visit,
+                ),
+            },
+        )
+        await db.execute(stmt)
+
+def _driver_aggregate(driver_phone: str = None):
+    """Visits per driver, over bookings and bookings_archive (archiving doesn't change the stats)."""
+    visits = union_all(*[
+        select(model.driver_phone, model.carrier_name, model.start_time).where(
+            model.driver_phone.isnot(None),
+            model.driver_phone != "",
+            *([model.driver_phone == driver_phone] if driver_phone else []),
+        )
+        for model in (models.Booking, models.BookingArchive)
+    ]).subquery()
+    return select(
+        visits.c.driver_phone,
+        func.max(visits.c.carrier_name).label("carrier_name"),
+        func.count().label("total_visits"),
+        func.max(visits.c.start_time).label("last_visit")
+    ).group_by(visits.c.driver_phone)
+
+async def _refresh_driver_stats(db: AsyncSession, driver_phone: str):
+    """Recompute one driver's row from their bookings (driver_phone indexes on both tables)."""
+    row = (await db.execute(_driver_aggregate(driver_phone))).first()
+    if row is None:
+        await db.execute(delete(models.DriverStats).where(models.DriverStats.driver_phone == driver_phone))
+        return
+    await db.execute(
+        update(models.DriverStats)
+        .where(models.DriverStats.driver_phone == driver_phone)
+        .values(carrier_name=row.carrier_name, total_visits=row.total_visits, last_visit=row.last_visit)
+    )
+
+async def rebuild_driver_stats(db: AsyncSession):
+    """Backfill: recompute the whole driver_stats table from bookings in one INSERT ... SELECT."""
+    await db.execute(delete(models.DriverStats))
+    aggregate = _driver_aggregate()
+    await db.execute(
+        insert(models.DriverStats).from_select(
+            ["driver_phone", "carrier_name", "total_visits", "last_visit"], aggregate
+        )
+    )
+    await db.commit()
+
+async def get_driver_stats(db: AsyncSession, skip: int = 0, limit: int = 100, search: str = None):
+    stmt = select(models.DriverStats)
+    if search:
+        pattern = f"%{search}%"
+        stmt = stmt.where(or_(
+            models.DriverStats.driver_phone.ilike(pattern),
+            models.DriverStats.carrier_name.ilike(pattern)
+        ))
+    stmt = stmt.order_by(models.DriverStats.last_visit.desc(), models.DriverStats.driver_phone).offset(skip).limit(limit)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+ROLLUPS = ((analytics.HOUR, models.UtilizationHourly), (analytics.DAY, models.UtilizationDaily))
+
+async def _record_utilization(db: AsyncSession, changes):
+    """Add the rollup deltas of booking writes, (old fact, new fact) pairs, in the caller's transaction."""
+    for granularity, table in ROLLUPS:
+        await _add_rollup_rows(db, table, analytics.deltas(changes, granularity))
+
+async def _add_rollup_rows(db: AsyncSession, table, rows):
+    if not rows:
+        return
+    # One cached statement run executemany (a multi-row VALUES would be compiled per call).
+    # Rows come sorted by (bucket, dock), so concurrent writers lock them in the same order.
+    stmt = _dialect_insert(db)(table)
+    new = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.bucket_start, table.dock_id],
+        set_={name: getattr(table, name) + getattr(new, name) for name in analytics.MEASURES},
+    )
+    await db.execute(stmt, rows)
+
+async def backfill_utilization(db: AsyncSession, start: date, end: date, batch_size: int = 5000):
+    """
+    Rebuild the rollups for the days [start, end] from bookings. Bookings that started up to
+    OCCUPANCY_LOOKBACK_HOURS earlier are read for the minutes they run into the range.
+    Writes made while it runs may be lost for the range: run it before starting workers,
+    or re-run it for the affected days. Returns the number of bookings read.
+    """
+    range_start, range_end = analytics.day_range(start, end)
+    lookback = timedelta(hours=OCCUPANCY_LOOKBACK_HOURS)
+    totals = {granularity: {} for granularity, _ in ROLLUPS}
+    read = 0
+    async for partition in _stream_partitions(db, range_start - lookback, range_end, batch_size):
+        changes = [(None, analytics.fact(booking)) for booking in partition]
+        read += len(partition)
+        for granularity, _ in ROLLUPS:
+            # Merge batch deltas so each (bucket, dock) is inserted once
+            merged = totals[granularity]
+            for row in analytics.deltas(changes, granularity, range_start, range_end):
+                key = (row["bucket_start"], row["dock_id"])
+                if key in merged:
+                    for name in analytics.MEASURES:
+                        merged[key][name] += row[name]
+                else:
+                    merged[key] = row
+
+    for granularity, table in ROLLUPS:
+        await db.execute(delete(table).where(table.bucket_start >= range_start, table.bucket_start < range_end))
+        rows = [totals[granularity][key] for key in sorted(totals[granularity], key=lambda key: (key[0], key[1] or 0))]
+        for offset in range(0, len(rows), batch_size):
+            await db.execute(insert(table), rows[offset:offset + batch_size])
+    await db.commit()
+    await response_cache.invalidate(DOCKS)
+    return read
+
+async def _stream_partitions(db: AsyncSession, start_from: datetime, start_to: datetime, batch_size: int):
+    """Bookings starting in [start_from, start_to), live and archived, batch_size at a time."""
+    for model in await _listing_models(db, start_from=start_from):
+        stmt = (
+            select(model)
+            .where(model.start_time >= start_from, model.start_time < start_to)
+            .execution_options(yield_per=batch_size)
+        )
+        async for partition in (await db.stream_scalars(stmt)).partitions():
+            yield partition
+
+async def get_utilization(db: AsyncSession, start: date, end: date, granularity: str = analytics.DAY,
+                          group_by: str = "dock", dock_id: int = None, capability: str = None):
+    """
+    Utilization per bucket over the days [start, end], read from the rollup tables only.
+    group_by: dock | capability (a dock counts towards each of its capabilities) | total.
+    Every bucket is listed, empty ones as fully idle. Raises ValueError for a bad range.
+    """
+    if granularity not in analytics.GRANULARITIES:
+        raise ValueError("granularity must be 'hour' or 'day'")
+    if group_by not in ("dock", "capability", "total"):
+        raise ValueError("group_by must be 'dock', 'capability' or 'total'")
+    if end < start:
+        raise ValueError("'to' must not be before 'from'")
+    if (end - start).days + 1 > analytics.MAX_RANGE_DAYS[granularity]:
+        raise ValueError(f"At most {analytics.MAX_RANGE_DAYS[granularity]} days per request with granularity={granularity}")
+    range_start, range_end = analytics.day_range(start, end)
+
+    result = await db.execute(select(models.Dock.id, models.Dock.capabilities, models.Dock.is_active))
+    docks = {
+        row_dock_id: (capabilities or [], is_active) for row_dock_id, capabilities, is_active in result.all()
+        if (dock_id is None or row_dock_id == dock_id) and (not capability or capability in (capabilities or []))
+    }
+
+    table = dict(ROLLUPS)[granularity]
+    measures = [getattr(table, name) for name in analytics.MEASURES]
+    filters = [table.bucket_start >= range_start, table.bucket_start < range_end]
+    if dock_id is not None or capability:
+        filters.append(table.dock_id.in_(list(docks)))
+    # Which docks had rows: their capacity counts even if they are inactive now
+    with_rows = set((await db.execute(select(table.dock_id).where(*filters).distinct())).scalars().all())
+
+    if group_by == "capability":
+        groups = {}
+        for item_id, (capabilities, _) in docks.items():
+            for name in capabilities:
+                if not capability or name == capability:
+                    groups.setdefault(name, []).append(item_id)
+    else:
+        groups = {None: list(docks)} if group_by == "total" else {item_id: [item_id] for item_id in docks}
+
+    sums = {}
+    if group_by == "dock":
+        stmt = select(table.dock_id, table.bucket_start, *measures).where(*filters)
+        for row in (await db.execute(stmt)).all():
+            sums[(row[0], row[1])] = dict(zip(analytics.MEASURES, row[2:]))
+    else:
+        # Summed in SQL per bucket, one query per group (all docks, or one capability's docks)
+        for group, group_docks in groups.items():
+            stmt = select(table.bucket_start, *[func.sum(measure) for measure in measures]).where(*filters)
+            if group_by == "capability":
+                stmt = stmt.where(table.dock_id.in_(group_docks))
+            for row in (await db.execute(stmt.group_by(table.bucket_start))).all():
+                sums[(group, row[0])] = dict(zip(analytics.MEASURES, row[1:]))
+
+    members = {
+        group: {item_id for item_id in group_docks if docks[item_id][1] or item_id in with_rows}
+        for group, group_docks in groups.items()
+    }
+    members = {group: items for group, items in members.items() if items}
+
+    bucket_starts = analytics.buckets(range_start, range_end, granularity)
+    capacity = analytics.CAPACITY_MINUTES[granularity]
+    key_name = {"dock": "dock_id", "capability": "capability", "total": None}[group_by]
+    series, totals = [], []
+    for group in (sorted(members) if group_by != "total" else list(members)):
+        docks_in_group = len(members[group])
+        label = {key_name: group} if key_name else {}
+        total = dict.fromkeys(analytics.MEASURES, 0)
+        for bucket_start in bucket_starts:
+            values = sums.get((group, bucket_start)) or dict.fromkeys(analytics.MEASURES, 0)
+            for name in analytics.MEASURES:
+                total[name] += values[name]
+            series.append({"bucket_start": bucket_start, **label, **analytics.summarize(dict(values), capacity * docks_in_group)})
+        totals.append({"bucket_start": range_start, **label, **analytics.summarize(total, capacity * docks_in_group * len(bucket_starts))})
 
     return {
-        "today_booking_count": count,
-        "utilization_percent": utilization,
-        "next_booking_info": next_info
+        "start": start,
+        "end": end,
+        "granularity": granularity,
+        "group_by": group_by,
+        "rows": series,
+        "totals": totals,
     }
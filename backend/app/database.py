@@ -1,7 +1,15 @@
+import contextlib
+import itertools
 import os
+import time
 from dotenv import load_dotenv, find_dotenv
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from fastapi import Request
+from . import metrics
+from .cache import TTLCache
 
 # Load .env file (looks in current dir and upwards)
 load_dotenv(find_dotenv())
@@ -13,7 +21,144 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     DATABASE_URL = "sqlite+aiosqlite:///./simpledock.db"
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+# Optional read replicas, comma-separated URLs (same driver as DATABASE_URL). GET routes
+# read from them; writes, and reads by a client that just wrote, stay on the primary.
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a client's reads stay on the primary after it wrote (should exceed replica lag)
+READ_YOUR_WRITES_SECONDS = float(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+# Reverse proxies whose X-Forwarded-For is believed when telling clients apart
+# (comma-separated addresses, "*" for any peer). Empty: the header is ignored.
+TRUSTED_PROXIES = {address.strip() for address in os.getenv("TRUSTED_PROXIES", "").split(",") if address.strip()}
+
+def _env_bool(name: str, default: bool) -> bool:
+    return os.getenv(name, str(default)).strip().lower() in ("1", "true", "yes", "on")
+
+# Engine settings (all overridable from the environment)
+DB_ECHO = _env_bool("DB_ECHO", False) # Log every SQL statement; for debugging only
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30")) # Seconds to wait for a free connection
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800")) # Seconds before a connection is replaced
+DB_POOL_PRE_PING = _env_bool("DB_POOL_PRE_PING", True)
+# Postgres only
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DB_PREPARED_STATEMENT_CACHE_SIZE", "100")) # 0 behind pgbouncer
+# SQLite only
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+
+class PoolStats:
+    """How long requests waited for a pooled connection."""
+
+    def __init__(self):
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record_wait(self, seconds: float):
+        self.waits += 1
+        self.total_wait += seconds
+        self.max_wait = max(self.max_wait, seconds)
+
+    def as_dict(self):
+        return {
+            "count": self.waits,
+            "avg_ms": round(self.total_wait / self.waits * 1000, 3) if self.waits else 0.0,
+            "max_ms": round(self.max_wait * 1000, 3),
+        }
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_stats.record_wait(time.perf_counter() - started)
+
+
+pool_stats = PoolStats()
+
+
+def _engine_options(url: str, timed: bool = True) -> dict:
+    options = {"echo": DB_ECHO}
+    if ":memory:" in url or "mode=memory" in url:
+        # In-memory SQLite lives in a single connection; keep the dialect's static pool
+        return options
+
+    options.update(
+        # Checkout waits (pool_stats) are the main engine's; replicas use the plain pool
+        poolclass=TimedQueuePool if timed else AsyncAdaptedQueuePool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    if url.startswith("postgresql+asyncpg"):
+        options["connect_args"] = {
+            "prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE,
+            "server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)},
+        }
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def create_engine(url: str, timed: bool = True):
+    """Async engine with the pool and per-connection settings above applied."""
+    new_engine = create_async_engine(url, **_engine_options(url, timed))
+    if new_engine.dialect.name == "sqlite":
+        event.listen(new_engine.sync_engine, "connect", _set_sqlite_pragmas)
+    metrics.instrument_engine(new_engine)
+    return new_engine
+
+
+def pool_status(target_engine=None) -> dict:
+    """Live pool numbers for /health/db."""
+    pool = (target_engine or engine).pool
+    status = {"class": type(pool).__name__}
+    for name, attr in (("size", "size"), ("checked_in", "checkedin"), ("checked_out", "checkedout")):
+        if hasattr(pool, attr):
+            status[name] = getattr(pool, attr)()
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        # QueuePool counts overflow from -pool_size; only connections beyond the pool are overflow
+        status["overflow"] = max(pool.overflow(), 0)
+        status["max_overflow"] = pool._max_overflow
+        status["timeout_s"] = pool.timeout()
+    if isinstance(pool, TimedQueuePool):
+        status["wait"] = pool_stats.as_dict()
+    return status
+
+
+def _pool_connections():
+    status = pool_status()
+    return {(state,): status[state] for state in ("checked_out", "checked_in", "overflow") if state in status}
+
+
+def _pool_saturation():
+    # Share of the most connections the pool will ever hand out that are in use
+    status = pool_status()
+    capacity = status.get("size", 0) + status.get("max_overflow", 0)
+    return status.get("checked_out", 0) / capacity if capacity else 0.0
+
+
+metrics.Gauge("simpledock_db_pool_connections", "Main engine connections by state.", ("state",), collect=_pool_connections)
+metrics.Gauge("simpledock_db_pool_saturation", "Checked-out connections / (pool size + max overflow).", collect=_pool_saturation)
+metrics.Counter("simpledock_db_pool_checkouts_total", "Connection checkouts.", collect=lambda: pool_stats.waits)
+metrics.Counter("simpledock_db_pool_checkout_wait_seconds_total", "Time spent waiting for a pooled connection.", collect=lambda: pool_stats.total_wait)
+
+engine = create_engine(DATABASE_URL)
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
@@ -22,6 +167,89 @@ AsyncSessionLocal = sessionmaker(
 
 Base = declarative_base()
 
-async def get_db():
+replica_engines = [create_engine(url, timed=False) for url in DATABASE_REPLICA_URLS]
+ReplicaSessions = [
+    sessionmaker(bind=replica_engine, class_=AsyncSession, expire_on_commit=False, info={"replica": True})
+    for replica_engine in replica_engines
+]
+
+_SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class ReadRouter:
+    """
+    Picks the session factory for a read: the replicas in turn, or the primary for a
+    client that wrote in the last READ_YOUR_WRITES_SECONDS (so an admin sees their own
+    update). Clients are told apart by their Authorization header, else their address
+    (from X-Forwarded-For only when the request came through one of TRUSTED_PROXIES,
+    since anyone can send that header).
+    The window is per worker; with several workers and replicas, route each client to
+    the same worker (sticky sessions) to keep the guarantee.
+    """
+
+    def __init__(self, replicas, window_seconds: float = READ_YOUR_WRITES_SECONDS, maxsize: int = 10000,
+                 trusted_proxies=TRUSTED_PROXIES):
+        self.replicas = replicas
+        self.recent_writers = TTLCache(maxsize=maxsize, ttl=window_seconds)
+        self.trusted_proxies = set(trusted_proxies)
+        self._turn = itertools.count()
+
+    def _trusted(self, address: str) -> bool:
+        return "*" in self.trusted_proxies or address in self.trusted_proxies
+
+    def client_key(self, request: Request) -> str:
+        authorization = request.headers.get("authorization")
+        if authorization:
+            return authorization
+        address = request.client.host if request.client else ""
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded and self._trusted(address):
+            # Each trusted proxy appended the address it saw; the client is the last hop
+            # that isn't one of them (anything to its left may be forged)
+            for hop in reversed([hop.strip() for hop in forwarded.split(",") if hop.strip()]):
+                address = hop
+                if not self._trusted(hop):
+                    break
+        return address
+
+    def wrote(self, request: Request):
+        if self.replicas:
+            self.recent_writers.set(self.client_key(request), True)
+
+    def session_factory(self, request: Request):
+        if not self.replicas or self.client_key(request) in self.recent_writers:
+            return AsyncSessionLocal
+        return self.replicas[next(self._turn) % len(self.replicas)]
+
+
+read_router = ReadRouter(ReplicaSessions)
+
+async def get_db(request: Request):
+    """Primary session, for writes (and reads that must see them)."""
+    if request.method not in _SAFE_METHODS:
+        read_router.wrote(request)
+    try:
+        async with AsyncSessionLocal() as session:
+            yield session
+    finally:
+        if request.method not in _SAFE_METHODS:
+            # The window starts again once the write is done
+            read_router.wrote(request)
+
+async def get_read_db(request: Request):
+    """Session for GET routes: a replica when configured, see ReadRouter."""
+    async with read_router.session_factory(request)() as session:
+        yield session
+
+@contextlib.asynccontextmanager
+async def on_primary(db: AsyncSession):
+    """
+    `db`, or a primary session when `db` reads from a replica. For loads that fill
+    process-wide caches (occupancy, recurrence catalog, cached responses): a lagging
+    replica would leave them stale after the write that invalidated them.
+    """
+    if not db.info.get("replica"):
+        yield db
+        return
     async with AsyncSessionLocal() as session:
         yield session
@@ -0,0 +1,200 @@
+import asyncio
+import itertools
+import json
+import os
+import uuid
+from collections import deque
+from datetime import timedelta
+from typing import Callable, Dict, Optional, Set
+
+from . import models, schemas
+
+# Deltas kept per date so reconnecting clients can catch up without a full reload
+SCHEDULE_BACKLOG = int(os.getenv("SCHEDULE_BACKLOG", "1000"))
+SCHEDULE_SUBSCRIBER_QUEUE = int(os.getenv("SCHEDULE_SUBSCRIBER_QUEUE", "1000"))
+# e.g. redis://localhost:6379/0 to fan deltas out across uvicorn workers
+SCHEDULE_BROKER_URL = os.getenv("SCHEDULE_BROKER_URL")
+
+
+class InProcessBroker:
+    """Default broker: sequence numbers and delivery stay inside this worker."""
+
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex
+        self._seq = itertools.count(1)
+        self._deliver = None
+
+    async def start(self, deliver: Callable[[dict], None]):
+        self._deliver = deliver
+
+    async def publish(self, delta: dict):
+        delta["seq"] = next(self._seq)
+        if self._deliver: # Not started (e.g. crud used outside the app): nobody is listening
+            self._deliver(delta)
+
+    async def stop(self):
+        pass
+
+
+class RedisBroker:
+    """
+    Shares one sequence (INCR) and one pub/sub channel between all workers.
+    Needs the optional `redis` package.
+    """
+
+    def __init__(self, url: str, channel: str = "simpledock:schedule"):
+        self.url = url
+        self.channel = channel
+        self.epoch = None
+        self._redis = None
+        self._listener = None
+
+    async def start(self, deliver: Callable[[dict], None]):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("SCHEDULE_BROKER_URL is set but the 'redis' package is not installed") from e
+
+        self._redis = redis.from_url(self.url)
+        # The epoch changes only when the sequence is lost (e.g. Redis flushed)
+        await self._redis.set(f"{self.channel}:epoch", uuid.uuid4().hex, nx=True)
+        self.epoch = (await self._redis.get(f"{self.channel}:epoch")).decode()
+
+        pubsub = self._redis.pubsub()
+        await pubsub.subscribe(self.channel)
+
+        async def listen():
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    deliver(json.loads(message["data"]))
+
+        self._listener = asyncio.create_task(listen())
+
+    async def publish(self, delta: dict):
+        delta["seq"] = await self._redis.incr(f"{self.channel}:seq")
+        await self._redis.publish(self.channel, json.dumps(delta))
+
+    async def stop(self):
+        if self._listener:
+            self._listener.cancel()
+        if self._redis:
+            await self._redis.aclose()
+
+
+class ScheduleHub:
+    """
+    Fans booking deltas out to clients watching a date.
+    Each delta carries a sequence number; clients that reconnect with `since`
+    get the deltas they missed, or a reset if the backlog no longer covers them.
+    """
+
+    def __init__(self, broker=None, backlog: int = SCHEDULE_BACKLOG):
+        self.broker = broker or InProcessBroker()
+        self.backlog = backlog
+        self.last_seq = 0
+        # First seq this worker received. Under a shared broker it may have started after
+        # other workers published, so it knows nothing about the deltas before this one.
+        self.first_seq: Optional[int] = None
+        self._history: Dict[str, deque] = {}
+        self._evicted_seq: Dict[str, int] = {} # newest seq dropped from each day's backlog
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    @property
+    def epoch(self) -> str:
+        return self.broker.epoch
+
+    async def start(self):
+        await self.broker.start(self._deliver)
+
+    async def stop(self):
+        await self.broker.stop()
+
+    async def publish_booking(self, kind: str, booking: models.Booking, previous=None):
+        """
+        kind: booking.created | booking.updated | booking.status_changed.
+        `previous` is the occupancy snapshot before the write; a booking moved to another
+        day is announced on both days so the old day's viewers can drop it.
+        """
+        dates = _dates(booking.start_time, booking.end_time)
+        if previous is not None:
+            dates |= _dates(previous[1], previous[2])
+        delta = {
+            "type": kind,
+            "dates": sorted(dates),
+            "booking": schemas.Booking.model_validate(booking).model_dump(mode="json"),
+        }
+        try:
+            await self.broker.publish(delta)
+        except Exception as e:
+            # Live updates are best effort; the booking itself is already committed
+            print(f"Schedule publish failed: {e}")
+
+    def _deliver(self, delta: dict):
+        if self.first_seq is None:
+            self.first_seq = delta["seq"]
+        self.last_seq = max(self.last_seq, delta["seq"])
+        for day in delta["dates"]:
+            history = self._history.get(day)
+            if history is None:
+                history = self._history[day] = deque(maxlen=self.backlog)
+            if len(history) == self.backlog:
+                self._evicted_seq[day] = history[0]["seq"]
+            history.append(delta)
+            for queue in list(self._subscribers.get(day, ())):
+                try:
+                    queue.put_nowait(delta)
+                except asyncio.QueueFull:
+                    # Slow consumer: drop its backlog and make it reload the day
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait({"type": "reset", "seq": delta["seq"]})
+
+    def subscribe(self, day: str, since: Optional[int] = None, epoch: Optional[str] = None):
+        """Returns (queue, missed deltas, needs_reset)."""
+        queue = asyncio.Queue(maxsize=SCHEDULE_SUBSCRIBER_QUEUE)
+        self._subscribers.setdefault(day, set()).add(queue)
+
+        if since is None:
+            return queue, [], False
+        if epoch != self.epoch:
+            return queue, [], True
+        if self._evicted_seq.get(day, 0) > since or since > self.last_seq:
+            # Deltas the client needs were already dropped (or it is ahead of us)
+            return queue, [], True
+        if self.first_seq is None or since < self.first_seq - 1:
+            # It last heard from a worker that was running before this one started
+            return queue, [], True
+        missed = [delta for delta in self._history.get(day, ()) if delta["seq"] > since]
+        return queue, missed, False
+
+    def unsubscribe(self, day: str, queue: asyncio.Queue):
+        subscribers = self._subscribers.get(day)
+        if subscribers:
+            subscribers.discard(queue)
+            if not subscribers:
+                del self._subscribers[day]
+
+
+def _dates(start_time, end_time) -> Set[str]:
+    days = set()
+    if not start_time:
+        return days
+    day = start_time.date()
+    last = day
+    if end_time and end_time > start_time:
+        # A booking ending exactly at midnight doesn't touch the next day
+        last = (end_time - timedelta(microseconds=1)).date()
+    while day <= last:
+        days.add(day.isoformat())
+        day += timedelta(days=1)
+    return days
+
+
+def _make_broker():
+    if SCHEDULE_BROKER_URL:
+        return RedisBroker(SCHEDULE_BROKER_URL)
+    return InProcessBroker()
+
+
+# Singleton instance
+schedule_hub = ScheduleHub(broker=_make_broker())
@@ -1,43 +1,55 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
-from .database import engine, Base
-from .routers import docks, bookings, drivers, auth
+from . import manage
+from .metrics import MetricsMiddleware
+from .routers import docks, bookings, drivers, auth, availability, health, schedule, metrics, recurring, analytics
+from .odoo_client import odoo_client
+from .events import schedule_hub
+from .response_cache import response_cache
+from .notifications import notification_dispatcher, NOTIFY_DISPATCHER_ENABLED
+from .archive import booking_archiver, ARCHIVE_ENABLED
+from .sweeper import status_sweeper, SWEEPER_ENABLED
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: Create tables
+    # Schema changes and seeding run separately (python -m app.manage setup), never here
     try:
-        async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
-            
-            # Auto-Migration for SQLite/Postgres: Add missing columns if table exists but column doesn't
-            # This is a lightweight "migration" for this specific update
-            from sqlalchemy import text
-            
-            # Check for odoo_order_id in bookings
-            # Note: This is a hacky check but works for both SQLite and PG for this specific case
-            try:
-                await conn.execute(text("SELECT odoo_order_id FROM bookings LIMIT 1"))
-            except Exception:
-                print("Migrating: Adding odoo_order_id to bookings")
-                await conn.execute(text("ALTER TABLE bookings ADD COLUMN odoo_order_id INTEGER"))
-            
-            # Seed Default Dock if empty
-            res = await conn.execute(text("SELECT count(*) FROM docks"))
-            if res.scalar() == 0:
-                print("Seeding default Dock 1")
-                # We use raw SQL for simplicity to avoid circular imports with models if possible, 
-                # but standard SQL 'INSERT' works for both.
-                # capabilities is JSON. '["General"]' is valid JSON.
-                # is_active=1 (True)
-                # Using text() to be safe across generic drivers
-                await conn.execute(text("INSERT INTO docks (name, capabilities, is_active) VALUES ('Dock 1', '[\"General\"]', 1)"))
-                
+        if not await manage.schema_is_current():
+            print("Database schema is not up to date: run `python -m app.manage setup`")
     except Exception as e:
-        print(f"Database Startup Error: {e}")
+        print(f"Could not check database schema version: {e}")
+
+    # Live schedule deltas (in-process, or shared through SCHEDULE_BROKER_URL)
+    await schedule_hub.start()
+
+    # Drains the notification outbox (every worker can run one; rows are leased)
+    if NOTIFY_DISPATCHER_ENABLED:
+        await notification_dispatcher.start()
+
+    # Moves old finished bookings to bookings_archive in small batches
+    if ARCHIVE_ENABLED:
+        await booking_archiver.start()
+
+    # Marks overdue bookings Late / No Show (one worker at a time, through a lease)
+    if SWEEPER_ENABLED:
+        await status_sweeper.start()
+
+    # Optional background job keeping confirmed POs in the validation cache
+    prefetch_task = None
+    if odoo_client.prefetch_interval > 0 and odoo_client.configured:
+        prefetch_task = asyncio.create_task(odoo_client.run_prefetch())
     yield
     # Shutdown
+    if prefetch_task:
+        prefetch_task.cancel()
+    await notification_dispatcher.stop()
+    await booking_archiver.stop()
+    await status_sweeper.stop()
+    await odoo_client.close()
+    await response_cache.close()
+    await schedule_hub.stop()
 
 app = FastAPI(title="SimpleDock API", version="0.1.0", lifespan=lifespan)
 
@@ -48,12 +60,21 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
+# Per-route latency and SQL counts for /metrics (and SLOW_REQUEST_MS logging)
+app.add_middleware(MetricsMiddleware)
 
 app.include_router(docks.router)
 app.include_router(bookings.router)
 app.include_router(drivers.router)
 app.include_router(auth.router)
+app.include_router(availability.router)
+app.include_router(health.router)
+app.include_router(schedule.router)
+app.include_router(recurring.router)
+app.include_router(analytics.router)
+app.include_router(metrics.router)
 
 @app.get("/")
 def read_root():
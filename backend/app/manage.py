@@ -0,0 +1,136 @@
+"""
+One-shot maintenance commands. Run them before starting the app workers, e.g. as
+the release step of a deploy; the app itself never changes the schema on startup.
+
+    python -m app.manage setup                  # migrate + seed (what deploys run)
+    python -m app.manage migrate [revision]     # alembic upgrade, default head
+    python -m app.manage downgrade <revision>
+    python -m app.manage seed                   # default dock when there are none
+    python -m app.manage rebuild-driver-stats
+    python -m app.manage backfill-utilization [--from DATE] [--to DATE]
+    python -m app.manage archive-bookings [--older-than-days N] [--batch-size N]
+    python -m app.manage sweep-statuses         # mark overdue bookings Late / No Show now
+"""
+import argparse
+import asyncio
+import os
+from datetime import date
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import func, select
+
+from . import archive, crud, models, sweeper
+from .database import AsyncSessionLocal, engine
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def alembic_config() -> Config:
+    return Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+
+
+def migrate(revision: str = "head"):
+    command.upgrade(alembic_config(), revision)
+
+
+def downgrade(revision: str):
+    command.downgrade(alembic_config(), revision)
+
+
+async def seed():
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(func.count(models.Dock.id))) == 0:
+            print("Seeding default Dock 1")
+            db.add(models.Dock(name="Dock 1", capabilities=["General"], is_active=True))
+            await db.commit()
+
+
+async def rebuild_driver_stats():
+    async with AsyncSessionLocal() as db:
+        await crud.rebuild_driver_stats(db)
+
+
+async def backfill_utilization(start: date = None, end: date = None):
+    """Rebuild the utilization rollups for [start, end] (default: every day with bookings)."""
+    async with AsyncSessionLocal() as db:
+        if start is None or end is None:
+            spans = [
+                (await db.execute(select(func.min(model.start_time), func.max(model.end_time)))).one()
+                for model in (models.Booking, models.BookingArchive)
+            ]
+            first = min((span[0] for span in spans if span[0]), default=None)
+            last = max((span[1] for span in spans if span[1]), default=None)
+            if first is None:
+                print("No bookings to roll up")
+                return
+            start, end = start or first.date(), end or last.date()
+        read = await crud.backfill_utilization(db, start, end)
+        print(f"Rolled up {read} bookings for {start} .. {end}")
+
+
+async def archive_bookings(after_days: float, batch_size: int):
+    moved = await archive.archive(after_days=after_days, batch_size=batch_size, pause=0)
+    print(f"Archived {moved} bookings that ended before {archive.cutoff(after_days):%Y-%m-%d %H:%M}")
+
+
+async def sweep_statuses():
+    moved = await sweeper.status_sweeper.sweep()
+    print(f"Marked {moved.get(models.BookingStatus.LATE, 0)} bookings Late and {moved.get(models.BookingStatus.NO_SHOW, 0)} No Show")
+
+
+async def schema_is_current() -> bool:
+    """True when the database is at the latest migration (one query, no DDL)."""
+    heads = set(ScriptDirectory.from_config(alembic_config()).get_heads())
+    async with engine.connect() as conn:
+        current = await conn.run_sync(lambda sync_conn: set(MigrationContext.configure(sync_conn).get_current_heads()))
+    return current == heads
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m app.manage", description="SimpleDock maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("setup", help="apply all migrations, then seed")
+    migrate_parser = commands.add_parser("migrate", help="apply migrations")
+    migrate_parser.add_argument("revision", nargs="?", default="head")
+    downgrade_parser = commands.add_parser("downgrade", help="revert migrations")
+    downgrade_parser.add_argument("revision")
+    commands.add_parser("seed", help="insert the default dock into an empty database")
+    commands.add_parser("rebuild-driver-stats", help="recompute driver_stats from bookings")
+    backfill_parser = commands.add_parser("backfill-utilization", help="rebuild the utilization rollups from bookings")
+    backfill_parser.add_argument("--from", dest="start", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+    backfill_parser.add_argument("--to", dest="end", type=date.fromisoformat, help="last day, inclusive")
+    archive_parser = commands.add_parser("archive-bookings", help="move old finished bookings to bookings_archive now")
+    archive_parser.add_argument("--older-than-days", type=float, default=archive.ARCHIVE_AFTER_DAYS)
+    archive_parser.add_argument("--batch-size", type=int, default=archive.ARCHIVE_BATCH_SIZE)
+    commands.add_parser("sweep-statuses", help="mark overdue bookings Late / No Show now")
+    args = parser.parse_args()
+
+    # Alembic runs its own event loop (migrations/env.py), so it goes first and outside ours
+    if args.command in ("setup", "migrate"):
+        migrate(getattr(args, "revision", "head"))
+    elif args.command == "downgrade":
+        downgrade(args.revision)
+
+    async def run():
+        try:
+            if args.command in ("setup", "seed"):
+                await seed()
+            elif args.command == "rebuild-driver-stats":
+                await rebuild_driver_stats()
+            elif args.command == "backfill-utilization":
+                await backfill_utilization(args.start, args.end)
+            elif args.command == "archive-bookings":
+                await archive_bookings(args.older_than_days, args.batch_size)
+            elif args.command == "sweep-statuses":
+                await sweep_statuses()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
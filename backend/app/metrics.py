@@ -0,0 +1,283 @@
+import abc
+import math
+import os
+import re
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+# Requests slower than this are printed with the SQL they ran (0 = off)
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))
+SLOW_REQUEST_MAX_STATEMENTS = int(os.getenv("SLOW_REQUEST_MAX_STATEMENTS", "50"))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(abc.ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels: dict) -> Tuple:
+        return tuple(labels.get(name, "") for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return lines
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        ...
+
+
+class Counter(Metric):
+    """
+    Incremented directly, or read at scrape time from `collect` (returning a number or
+    {label tuple: number}) for values another module already keeps.
+    """
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=(), collect: Optional[Callable] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+        self.collect = collect
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        values = self._values
+        if self.collect is not None:
+            try:
+                collected = self.collect()
+            except Exception as e:
+                print(f"Metric {self.name} failed: {e}")
+                return []
+            values = collected if isinstance(collected, dict) else {(): collected}
+        return [f"{self.name}{_labels(self.labelnames, key)} {_number(value)}" for key, value in sorted(values.items())]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Tuple, list] = {} # label tuple -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        lines = []
+        for key, series in sorted(self._series.items()):
+            for bound, count in zip(self.buckets + (math.inf,), series[:len(self.buckets)] + [series[-1]]):
+                le = 'le="%s"' % _number(float(bound))
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(series[-2])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# Singleton instance
+registry = Registry()
+
+http_requests = Counter("simpledock_http_requests_total", "HTTP requests by route and status.", ("method", "route", "status"))
+http_latency = Histogram("simpledock_http_request_duration_seconds", "Time until the response was sent.", ("method", "route"))
+http_in_progress = Gauge("simpledock_http_requests_in_progress", "Requests being handled.")
+request_queries = Histogram("simpledock_http_request_sql_queries", "SQL statements run per request.", ("method", "route"), buckets=QUERY_COUNT_BUCKETS)
+request_sql_time = Histogram("simpledock_http_request_sql_seconds", "Time spent in SQL per request.", ("method", "route"))
+background_in_progress = Gauge("simpledock_background_tasks_in_progress", "Responses sent whose background tasks are still running.")
+sql_queries = Counter("simpledock_sql_queries_total", "SQL statements executed.", ("operation",))
+sql_latency = Histogram("simpledock_sql_query_duration_seconds", "SQL statement latency.", ("operation",), buckets=SQL_LATENCY_BUCKETS)
+odoo_latency = Histogram("simpledock_odoo_request_duration_seconds", "Odoo XML-RPC call latency.", ("method", "outcome"))
+
+
+class RequestStats:
+    __slots__ = ("queries", "sql_seconds", "statements")
+
+    def __init__(self, capture: bool):
+        self.queries = 0
+        self.sql_seconds = 0.0
+        self.statements: Optional[List[Tuple[float, str]]] = [] if capture else None
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+_OPERATION = re.compile(r"\s*(\w+)")
+
+
+def _operation(statement: str) -> str:
+    match = _OPERATION.match(statement)
+    operation = match.group(1).lower() if match else ""
+    return operation if operation in ("select", "insert", "update", "delete", "with") else "other"
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    operation = _operation(statement)
+    sql_queries.inc(operation=operation)
+    sql_latency.observe(elapsed, operation=operation)
+    # The async engine runs this in a greenlet that shares the request's context
+    stats = _request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.sql_seconds += elapsed
+        if stats.statements is not None and len(stats.statements) < SLOW_REQUEST_MAX_STATEMENTS:
+            stats.statements.append((elapsed, statement))
+
+
+def _handle_error(exception_context):
+    started = exception_context.connection.info.get("query_started") if exception_context.connection else None
+    if started:
+        started.pop()
+
+
+def instrument_engine(engine):
+    """Count and time every statement run through `engine` (an AsyncEngine)."""
+    sync_engine = engine.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(sync_engine, "handle_error", _handle_error)
+
+
+def observe_odoo(method: str, seconds: float, ok: bool):
+    odoo_latency.observe(seconds, method=method, outcome="ok" if ok else "error")
+
+
+def _route(scope) -> str:
+    route = scope.get("route")
+    # Templates, not raw paths, so /bookings/{booking_id} is one series
+    return getattr(route, "path", None) or "unmatched"
+
+
+def _log_slow_request(scope, status: int, seconds: float, stats: RequestStats):
+    query = scope.get("query_string", b"").decode("latin-1")
+    path = scope["path"] + (f"?{query}" if query else "")
+    print(f"Slow request: {scope['method']} {path} -> {status} in {seconds * 1000:.1f} ms "
+          f"({stats.queries} queries, {stats.sql_seconds * 1000:.1f} ms SQL)")
+    for elapsed, statement in stats.statements:
+        print(f"    {elapsed * 1000:8.2f} ms  {' '.join(statement.split())[:300]}")
+    if stats.queries > len(stats.statements):
+        print(f"    ... {stats.queries - len(stats.statements)} more")
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware, so streaming and background tasks are
+    untouched). Latency is measured until the last body chunk is sent; whatever runs
+    after that is the request's background tasks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not METRICS_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(capture=SLOW_REQUEST_MS > 0)
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status = 500
+        sent_at = None
+
+        async def send_wrapper(message):
+            nonlocal status, sent_at
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body" and not message.get("more_body") and sent_at is None:
+                sent_at = time.perf_counter()
+                background_in_progress.inc()
+            await send(message)
+
+        http_in_progress.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_progress.dec()
+            if sent_at is not None:
+                background_in_progress.dec()
+            _request_stats.reset(token)
+
+            elapsed = (sent_at or time.perf_counter()) - started
+            method, route = scope["method"], _route(scope)
+            http_requests.inc(method=method, route=route, status=status)
+            http_latency.observe(elapsed, method=method, route=route)
+            request_queries.observe(stats.queries, method=method, route=route)
+            request_sql_time.observe(stats.sql_seconds, method=method, route=route)
+            if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS:
+                _log_slow_request(scope, status, elapsed, stats)
+
+
+def render() -> str:
+    return registry.render()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, JSON, Enum, func
+from sqlalchemy import Column, Integer, String, Boolean, Date, DateTime, ForeignKey, JSON, Enum, Index, Time, UniqueConstraint, func, literal, text
 from sqlalchemy.orm import relationship
 import enum
 from .database import Base
@@ -11,6 +11,7 @@ class BookingStatus(str, enum.Enum):
     COMPLETED = "Completed"
     LATE = "Late"
     RESCHEDULED = "Rescheduled"
+    NO_SHOW = "No Show"
 
 class Dock(Base):
     __tablename__ = "docks"
@@ -22,21 +23,126 @@ class Dock(Base):
 
     bookings = relationship("Booking", back_populates="dock")
 
+# Statuses a booking never leaves; such bookings are moved to bookings_archive once old
+FINISHED_STATUSES = (BookingStatus.CANCELLED, BookingStatus.COMPLETED, BookingStatus.NO_SHOW)
+FINISHED_SQL = "status IN ('CANCELLED', 'COMPLETED', 'NO_SHOW')"
+
+# Statuses of bookings still expected at the dock; the status sweeper marks them Late / No Show
+AWAITING_STATUSES = (BookingStatus.CONFIRMED, BookingStatus.LATE)
+AWAITING_SQL = "status IN ('CONFIRMED', 'LATE')"
+
 class Booking(Base):
     __tablename__ = "bookings"
 
     id = Column(Integer, primary_key=True, index=True)
     dock_id = Column(Integer, ForeignKey("docks.id"))
-    start_time = Column(DateTime, index=True)
-    end_time = Column(DateTime, index=True)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
     carrier_name = Column(String)
     po_number = Column(String, index=True)
     odoo_order_id = Column(Integer, nullable=True) # ID from Odoo Purchase Order
     status = Column(Enum(BookingStatus), default=BookingStatus.PENDING)
-    driver_phone = Column(String)
+    driver_phone = Column(String, index=True)
+    arrived_at = Column(DateTime, nullable=True) # Set by crud when the status becomes Arrived
+    completed_at = Column(DateTime, nullable=True) # ... and Completed (turnaround = the difference)
 
     dock = relationship("Dock", back_populates="bookings")
 
+    # Schema changes go through migrations/ as well (python -m app.manage migrate)
+    __table_args__ = (
+        # (start_time, id) is the listing/keyset order; also serves plain start_time ranges
+        Index("ix_bookings_start_id", "start_time", "id"),
+        Index("ix_bookings_dock_start_id", "dock_id", "start_time", "id"),
+        # Only bookings that occupy a dock; queries must spell the predicate as
+        # not_cancelled() for the planner to use them.
+        # Overlap checks: new bookings are in the future, so end_time > start only walks
+        # the dock's later bookings, however long its history is.
+        Index(
+            "ix_bookings_active_dock_end", "dock_id", "end_time", "start_time",
+            sqlite_where=text("status <> 'CANCELLED'"), postgresql_where=text("status <> 'CANCELLED'"),
+        ),
+        # Whole-day scans across docks (occupancy index)
+        Index(
+            "ix_bookings_active_time", "start_time", "end_time",
+            sqlite_where=text("status <> 'CANCELLED'"), postgresql_where=text("status <> 'CANCELLED'"),
+        ),
+        # The status sweeper's candidates (see awaiting()): only bookings not yet arrived,
+        # so a sweep costs the same however many bookings are in other states
+        Index(
+            "ix_bookings_awaiting_start", "start_time", "end_time",
+            sqlite_where=text(AWAITING_SQL), postgresql_where=text(AWAITING_SQL),
+        ),
+        # The archiver's candidates (see finished())
+        Index(
+            "ix_bookings_finished_end", "end_time",
+            sqlite_where=text(FINISHED_SQL), postgresql_where=text(FINISHED_SQL),
+        ),
+    )
+
+
+def not_cancelled():
+    """
+    status <> 'CANCELLED' with the value inlined in the SQL. A bound parameter would hide
+    it from the planner (SQLite, generic Postgres plans) and the partial indexes above
+    would never match.
+    """
+    return Booking.status != literal(BookingStatus.CANCELLED, Booking.status.type, literal_execute=True)
+
+def finished():
+    """FINISHED_SQL as an expression, spelled the same way so the partial index matches."""
+    return text(f"bookings.{FINISHED_SQL}")
+
+def awaiting():
+    """AWAITING_SQL as an expression, spelled the same way so the partial index matches."""
+    return text(f"bookings.{AWAITING_SQL}")
+
+class BookingArchive(Base):
+    """
+    Finished bookings older than ARCHIVE_AFTER_DAYS, moved out of `bookings` by
+    archive.BookingArchiver so the hot table only grows with current business.
+    Same columns and ids; crud reads it when a listing reaches back that far.
+    """
+    __tablename__ = "bookings_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    dock_id = Column(Integer) # No foreign key: docks may be deleted with history kept
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    carrier_name = Column(String)
+    po_number = Column(String)
+    odoo_order_id = Column(Integer, nullable=True)
+    status = Column(Enum(BookingStatus))
+    driver_phone = Column(String, index=True)
+    arrived_at = Column(DateTime, nullable=True)
+    completed_at = Column(DateTime, nullable=True)
+    archived_at = Column(DateTime, default=func.now())
+
+    __table_args__ = (
+        Index("ix_bookings_archive_start_id", "start_time", "id"),
+        Index("ix_bookings_archive_dock_start_id", "dock_id", "start_time", "id"),
+    )
+
+class BookingStatusTransition(Base):
+    """Status changes applied by sweeper.StatusSweeper (Confirmed -> Late -> No Show)."""
+    __tablename__ = "booking_status_transitions"
+
+    id = Column(Integer, primary_key=True)
+    booking_id = Column(Integer, index=True) # No foreign key: bookings may be archived
+    from_status = Column(Enum(BookingStatus))
+    to_status = Column(Enum(BookingStatus))
+    changed_at = Column(DateTime, default=func.now())
+
+class JobLease(Base):
+    """
+    Which worker runs a singleton background job (e.g. the status sweeper) until
+    expires_at; see sweeper.Lease.
+    """
+    __tablename__ = "job_leases"
+
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=True)
+    expires_at = Column(DateTime)
+
 class Driver(Base):
     __tablename__ = "drivers"
 
@@ -45,3 +151,110 @@ class Driver(Base):
     hashed_password = Column(String)
     name = Column(String)
     created_at = Column(DateTime, default=func.now())
+
+class DriverStats(Base):
+    """Per-driver aggregate of bookings, maintained by crud on every booking write."""
+    __tablename__ = "driver_stats"
+
+    driver_phone = Column(String, primary_key=True)
+    carrier_name = Column(String) # Highest carrier name seen, like max() over bookings
+    total_visits = Column(Integer, default=0)
+    last_visit = Column(DateTime, index=True)
+
+class UtilizationRollup:
+    """
+    Columns shared by the utilization rollups: per dock and time bucket, what its bookings
+    add up to (see analytics.contributions). crud adds the delta of every booking write in
+    the same transaction; `python -m app.manage backfill-utilization` rebuilds a range.
+    """
+    bucket_start = Column(DateTime, primary_key=True)
+    dock_id = Column(Integer, primary_key=True)
+    booked_minutes = Column(Integer, default=0, nullable=False) # Not cancelled, split across buckets
+    bookings = Column(Integer, default=0, nullable=False) # Counts are on the bucket the booking starts in
+    cancelled = Column(Integer, default=0, nullable=False)
+    completed = Column(Integer, default=0, nullable=False)
+    late = Column(Integer, default=0, nullable=False)
+    no_show = Column(Integer, default=0, nullable=False)
+    turnaround_minutes = Column(Integer, default=0, nullable=False) # Sum over completed bookings with both timestamps
+    turnarounds = Column(Integer, default=0, nullable=False)
+
+class UtilizationHourly(UtilizationRollup, Base):
+    __tablename__ = "utilization_hourly"
+
+class UtilizationDaily(UtilizationRollup, Base):
+    __tablename__ = "utilization_daily"
+
+class RecurringBooking(Base):
+    """
+    A standing appointment: the same dock, time and carrier on every date matched by
+    `rule` (RRULE subset, see recurrence.parse_rule). Occurrences are never stored;
+    recurrence.recurrence_index expands them for the dates being queried.
+    """
+    __tablename__ = "recurring_bookings"
+
+    id = Column(Integer, primary_key=True)
+    dock_id = Column(Integer, ForeignKey("docks.id"))
+    rule = Column(String) # e.g. FREQ=WEEKLY;BYDAY=MO,TH
+    starts_on = Column(Date)
+    ends_on = Column(Date, nullable=True) # Last possible date (UNTIL/COUNT resolved), None = open-ended
+    start_time = Column(Time)
+    duration_minutes = Column(Integer)
+    carrier_name = Column(String)
+    po_number = Column(String)
+    odoo_order_id = Column(Integer, nullable=True)
+    driver_phone = Column(String)
+    is_active = Column(Boolean, default=True)
+    created_at = Column(DateTime, default=func.now())
+    # Bumped by every change to the series or its exceptions (see recurrence.RecurrenceIndex)
+    revision = Column(Integer, nullable=False, default=1, server_default="1")
+
+    exceptions = relationship("RecurringException", back_populates="recurring_booking", cascade="all, delete-orphan")
+
+class RecurringException(Base):
+    """
+    One occurrence that differs from the rule: skipped, or moved to another time/dock.
+    An occurrence turned into a real booking (e.g. marked Arrived) is a skip whose
+    booking_id points at that row.
+    """
+    __tablename__ = "recurring_exceptions"
+
+    id = Column(Integer, primary_key=True)
+    recurring_booking_id = Column(Integer, ForeignKey("recurring_bookings.id", ondelete="CASCADE"))
+    occurrence_date = Column(Date) # The date the rule produced
+    kind = Column(String) # skip | move
+    new_dock_id = Column(Integer, nullable=True)
+    new_start = Column(DateTime, nullable=True)
+    new_end = Column(DateTime, nullable=True)
+    booking_id = Column(Integer, nullable=True)
+
+    recurring_booking = relationship("RecurringBooking", back_populates="exceptions")
+
+    __table_args__ = (
+        UniqueConstraint("recurring_booking_id", "occurrence_date", name="uq_recurring_exceptions_occurrence"),
+    )
+
+class NotificationOutbox(Base):
+    """
+    Notifications waiting to be sent, written in the same transaction as the booking
+    change that caused them and drained by notifications.NotificationDispatcher.
+    status: pending -> sending (leased by a dispatcher) -> sent | failed
+    """
+    __tablename__ = "notification_outbox"
+
+    id = Column(Integer, primary_key=True)
+    booking_id = Column(Integer, index=True) # No foreign key: bookings may be archived before this is sent
+    kind = Column(String) # booking.confirmed | booking.status_changed
+    recipient = Column(String) # Driver phone
+    payload = Column(JSON)
+    status = Column(String, default="pending")
+    attempts = Column(Integer, default=0)
+    next_attempt_at = Column(DateTime)
+    locked_until = Column(DateTime) # Lease of the dispatcher sending it; expired leases are retried
+    last_error = Column(String)
+    created_at = Column(DateTime, default=func.now())
+    sent_at = Column(DateTime)
+
+    __table_args__ = (
+        # The dispatcher's claim query: due rows by status, oldest first
+        Index("ix_notification_outbox_due", "status", "next_attempt_at"),
+    )
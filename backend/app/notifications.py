@@ -0,0 +1,320 @@
+import abc
+import asyncio
+import importlib
+import os
+import random
+import time
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import and_, func, insert, or_, select, update
+
+from . import metrics, models, recurrence
+from .database import AsyncSessionLocal
+
+# "log" prints (the old behaviour), "fake" records in memory, or "package.module:Class"
+NOTIFY_PROVIDER = os.getenv("NOTIFY_PROVIDER", "log")
+NOTIFY_DISPATCHER_ENABLED = os.getenv("NOTIFY_DISPATCHER_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "100"))
+NOTIFY_CONCURRENCY = int(os.getenv("NOTIFY_CONCURRENCY", "10")) # Sends in flight per worker
+NOTIFY_RATE_PER_SECOND = float(os.getenv("NOTIFY_RATE_PER_SECOND", "20")) # Per worker, 0 = unlimited
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "8"))
+NOTIFY_BACKOFF_SECONDS = float(os.getenv("NOTIFY_BACKOFF_SECONDS", "5")) # Doubles per failed attempt
+NOTIFY_BACKOFF_MAX_SECONDS = float(os.getenv("NOTIFY_BACKOFF_MAX_SECONDS", "3600"))
+NOTIFY_POLL_SECONDS = float(os.getenv("NOTIFY_POLL_SECONDS", "2"))
+NOTIFY_LEASE_SECONDS = float(os.getenv("NOTIFY_LEASE_SECONDS", "120"))
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+
+
+class RateLimited(Exception):
+    """Raised by a provider when it is throttled; the send is retried without counting an attempt."""
+
+    def __init__(self, retry_after: float = 30):
+        super().__init__(f"rate limited, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+class PermanentError(Exception):
+    """Raised by a provider when retrying can't help (e.g. invalid number)."""
+
+
+def render(notification: models.NotificationOutbox) -> str:
+    payload = notification.payload or {}
+    if notification.kind == "booking.status_changed":
+        return f"Booking {payload.get('ref')} is now {payload.get('status')} ({payload.get('start_time')})"
+    return f"Booking {payload.get('ref')} Confirmed for {payload.get('start_time')}"
+
+
+class NotificationProvider(abc.ABC):
+    """
+    Sends one notification. Return normally on success; raise RateLimited, PermanentError,
+    or anything else for a transient failure (retried with backoff).
+    """
+
+    @abc.abstractmethod
+    async def send(self, notification: models.NotificationOutbox):
+        ...
+
+    async def close(self):
+        pass
+
+
+class LogProvider(NotificationProvider):
+    """Default: prints the message (the mock WhatsApp notice)."""
+
+    async def send(self, notification):
+        print(f"XXX NOTICE: {render(notification)} [Sent via WhatsApp] XXX")
+
+
+class FakeProvider(NotificationProvider):
+    """
+    Keeps sent messages in memory, for local runs and tests.
+    latency: seconds per send; fail_rate: share of transient failures;
+    rate_limit_rate: share of sends answered with RateLimited(retry_after).
+    """
+
+    def __init__(self, latency: float = 0.0, fail_rate: float = 0.0, rate_limit_rate: float = 0.0, retry_after: float = 1.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.rate_limit_rate = rate_limit_rate
+        self.retry_after = retry_after
+        self.sent = []
+
+    async def send(self, notification):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        roll = random.random()
+        if roll < self.rate_limit_rate:
+            raise RateLimited(self.retry_after)
+        if roll < self.rate_limit_rate + self.fail_rate:
+            raise ConnectionError("fake provider failure")
+        self.sent.append((notification.recipient, render(notification)))
+
+
+class RateLimiter:
+    """Token bucket shared by a dispatcher's sends; `pause` honours a provider's retry-after."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                if self.rate <= 0:
+                    return
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def backoff(attempts: int) -> float:
+    """Exponential backoff with jitter, so failed sends don't all come back at once."""
+    delay = min(NOTIFY_BACKOFF_MAX_SECONDS, NOTIFY_BACKOFF_SECONDS * 2 ** max(attempts - 1, 0))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _make_provider() -> NotificationProvider:
+    if NOTIFY_PROVIDER == "log":
+        return LogProvider()
+    if NOTIFY_PROVIDER == "fake":
+        return FakeProvider()
+    module_name, _, class_name = NOTIFY_PROVIDER.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def booking_ref(booking: models.Booking) -> str:
+    if booking.id < 0:
+        # An occurrence of a recurring booking
+        series_id, day = recurrence.parse_occurrence_id(booking.id)
+        return f"RB-{series_id:04d}-{day:%Y%m%d}"
+    return f"BK-{booking.id:04d}"
+
+
+def booking_payload(booking: models.Booking, previous_status=None) -> dict:
+    payload = {
+        "ref": booking_ref(booking),
+        "dock_id": booking.dock_id,
+        "start_time": str(booking.start_time),
+        "status": booking.status.value if booking.status else None,
+    }
+    if previous_status is not None:
+        payload["previous_status"] = previous_status.value
+    return payload
+
+
+async def enqueue(db, bookings, kind: str, previous_status=None):
+    """
+    Adds outbox rows in the caller's transaction; they only exist if it commits.
+    Bookings without a driver phone have nobody to notify and are skipped.
+    """
+    now = datetime.now()
+    rows = [
+        {
+            "booking_id": booking.id,
+            "kind": kind,
+            "recipient": booking.driver_phone,
+            "payload": booking_payload(booking, previous_status),
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        }
+        for booking in bookings
+        if booking.driver_phone
+    ]
+    if rows:
+        await db.execute(insert(models.NotificationOutbox), rows)
+
+
+sent_total = metrics.Counter("simpledock_notifications_total", "Notification send outcomes.", ("outcome",))
+send_latency = metrics.Histogram("simpledock_notification_send_seconds", "Provider send latency.")
+outbox_depth = metrics.Gauge("simpledock_notification_outbox_depth", "Pending or in-flight outbox rows (as of the last batch).")
+
+
+class NotificationDispatcher:
+    """
+    Drains notification_outbox in the background of each worker. Rows are claimed in
+    batches with a lease (FOR UPDATE SKIP LOCKED on Postgres), so several workers can
+    share the outbox; a worker that dies mid-send leaves rows that are retried once
+    their lease expires, so delivery is at least once.
+    """
+
+    def __init__(self, provider: Optional[NotificationProvider] = None, session_factory=AsyncSessionLocal,
+                 batch_size: int = NOTIFY_BATCH_SIZE, concurrency: int = NOTIFY_CONCURRENCY,
+                 rate_per_second: float = NOTIFY_RATE_PER_SECOND):
+        self.provider = provider
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limiter = RateLimiter(rate_per_second)
+        self._wakeup = None
+        self._task = None
+
+    async def start(self):
+        if self.provider is None:
+            self.provider = _make_provider()
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self.provider:
+            await self.provider.close()
+
+    def wake(self):
+        """Called after a commit that enqueued rows, so they go out without waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run(self):
+        while True:
+            try:
+                handled = await self.dispatch_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Notification dispatcher error: {e}")
+                handled = 0
+            if handled < self.batch_size:
+                # Drained (or failing): sleep until woken or the next poll
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), NOTIFY_POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def dispatch_once(self) -> int:
+        """Claims one batch of due rows, sends them and records the outcomes. Returns the batch size."""
+        batch = await self._claim()
+        if not batch:
+            return 0
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def send(notification):
+            async with semaphore:
+                return notification.id, await self._send(notification)
+
+        outcomes = await asyncio.gather(*[send(notification) for notification in batch])
+        async with self.session_factory() as db:
+            await db.execute(update(models.NotificationOutbox), [{"id": row_id, **values} for row_id, values in outcomes])
+            outbox_depth.set(await db.scalar(
+                select(func.count(models.NotificationOutbox.id)).where(models.NotificationOutbox.status.in_((PENDING, SENDING)))
+            ))
+            await db.commit()
+        return len(batch)
+
+    async def _claim(self) -> List[models.NotificationOutbox]:
+        now = datetime.now()
+        outbox = models.NotificationOutbox
+        due = or_(
+            and_(outbox.status == PENDING, outbox.next_attempt_at <= now),
+            and_(outbox.status == SENDING, outbox.locked_until < now),
+        )
+        claimable = (
+            select(outbox.id).where(due).order_by(outbox.next_attempt_at, outbox.id)
+            .limit(self.batch_size).with_for_update(skip_locked=True)
+        )
+        stmt = (
+            update(outbox)
+            .where(outbox.id.in_(claimable), due)
+            .values(status=SENDING, locked_until=now + timedelta(seconds=NOTIFY_LEASE_SECONDS), attempts=outbox.attempts + 1)
+            .returning(outbox)
+            .execution_options(synchronize_session=False)
+        )
+        async with self.session_factory() as db:
+            batch = (await db.execute(stmt)).scalars().all()
+            await db.commit()
+        return batch
+
+    async def _send(self, notification) -> dict:
+        await self.limiter.acquire()
+        started = time.perf_counter()
+        values = {"locked_until": None, "last_error": None, "sent_at": None}
+        try:
+            await self.provider.send(notification)
+            sent_total.inc(outcome="sent")
+            return {**values, "status": SENT, "sent_at": datetime.now(), "attempts": notification.attempts,
+                    "next_attempt_at": notification.next_attempt_at}
+        except RateLimited as e:
+            # The provider's limit, not this message's fault: pause everyone and keep the attempt
+            self.limiter.pause(e.retry_after)
+            sent_total.inc(outcome="rate_limited")
+            return {**values, "status": PENDING, "attempts": notification.attempts - 1, "last_error": str(e),
+                    "next_attempt_at": datetime.now() + timedelta(seconds=e.retry_after)}
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"[:500]
+            if isinstance(e, PermanentError) or notification.attempts >= NOTIFY_MAX_ATTEMPTS:
+                print(f"Notification {notification.id} failed permanently: {error}")
+                sent_total.inc(outcome="failed")
+                return {**values, "status": FAILED, "attempts": notification.attempts, "last_error": error,
+                        "next_attempt_at": notification.next_attempt_at}
+            sent_total.inc(outcome="retry")
+            return {**values, "status": PENDING, "attempts": notification.attempts, "last_error": error,
+                    "next_attempt_at": datetime.now() + timedelta(seconds=backoff(notification.attempts))}
+        finally:
+            send_latency.observe(time.perf_counter() - started)
+
+
+# Singleton instance
+notification_dispatcher = NotificationDispatcher()
@@ -0,0 +1,245 @@
+import os
+import time
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import models
+from .database import on_primary
+from .recurrence import recurrence_index
+
+MINUTES_PER_DAY = 24 * 60
+
+# How many days are kept in memory, and how long before a day is rebuilt from the
+# database (picks up writes made by other workers).
+OCCUPANCY_MAX_DAYS = int(os.getenv("OCCUPANCY_MAX_DAYS", "90"))
+OCCUPANCY_TTL_SECONDS = float(os.getenv("OCCUPANCY_TTL_SECONDS", "60"))
+# Bookings are looked up by start time: one starting more than this many hours before a
+# day can't still run into it, since crud caps every booking at this length.
+OCCUPANCY_LOOKBACK_HOURS = float(os.getenv("OCCUPANCY_LOOKBACK_HOURS", "24"))
+# Distinct allocation queries (window, duration, strategy) whose per-dock results are kept per day
+PLACEMENT_CACHE_QUERIES = int(os.getenv("PLACEMENT_CACHE_QUERIES", "64"))
+
+# (dock_id, start_time, end_time, status) - enough to place a booking in the index
+BookingSnapshot = Tuple[int, datetime, datetime, models.BookingStatus]
+
+
+def snapshot(booking: models.Booking) -> BookingSnapshot:
+    return (booking.dock_id, booking.start_time, booking.end_time, booking.status)
+
+
+def _day_span(day: date):
+    start = datetime.combine(day, datetime.min.time())
+    return start, start + timedelta(days=1)
+
+
+def _minute_range(day: date, start_time: datetime, end_time: datetime):
+    """Clip a booking to `day` and return it as [start_minute, end_minute) or None."""
+    day_start, day_end = _day_span(day)
+    start = max(start_time, day_start)
+    end = min(end_time, day_end)
+    if end <= start:
+        return None
+    start_min = int((start - day_start).total_seconds() // 60)
+    # Round partial minutes up so a booking ending at 09:00:30 still blocks 09:00
+    end_min = -int(-(end - day_start).total_seconds() // 60)
+    return start_min, end_min
+
+
+def _span_mask(start_min: int, end_min: int) -> int:
+    return ((1 << (end_min - start_min)) - 1) << start_min
+
+
+class DayOccupancy:
+    """
+    Booked minutes of one day, per dock.
+    Each dock keeps its intervals (by booking id) and a 1440-bit mask where bit m is set
+    when minute m is taken, so "is this dock free for [s, e)" is a single AND.
+    """
+
+    def __init__(self, day: date):
+        self.day = day
+        self.built_at = time.monotonic()
+        self.intervals: Dict[int, Dict[int, Tuple[int, int]]] = {}
+        self.masks: Dict[int, int] = {}
+        self._owner: Dict[int, int] = {}
+        self._placements: "OrderedDict[Hashable, Dict[int, Any]]" = OrderedDict()
+        # While the day is loading, writes are queued and replayed on top of the query result
+        self.loading = True
+        self.pending: List[Tuple[int, Optional[BookingSnapshot]]] = []
+
+    def place(self, booking_id: int, booking: Optional[BookingSnapshot]):
+        """Put a booking at its current position, or drop it if it is gone/cancelled."""
+        old_dock = self._owner.pop(booking_id, None)
+        if old_dock is not None:
+            self.intervals[old_dock].pop(booking_id, None)
+            self._rebuild_mask(old_dock)
+            self._forget_placements(old_dock)
+
+        if booking is None:
+            return
+        dock_id, start_time, end_time, status = booking
+        self._forget_placements(dock_id)
+        if status == models.BookingStatus.CANCELLED or not start_time or not end_time:
+            return
+        span = _minute_range(self.day, start_time, end_time)
+        if span is None:
+            return
+        self.intervals.setdefault(dock_id, {})[booking_id] = span
+        self._owner[booking_id] = dock_id
+        self.masks[dock_id] = self.masks.get(dock_id, 0) | _span_mask(*span)
+
+    def _forget_placements(self, dock_id: int):
+        for cache in self._placements.values():
+            cache.pop(dock_id, None)
+
+    def _rebuild_mask(self, dock_id: int):
+        mask = 0
+        for span in self.intervals.get(dock_id, {}).values():
+            mask |= _span_mask(*span)
+        self.masks[dock_id] = mask
+
+    def is_free(self, dock_id: int, start_min: int, end_min: int) -> bool:
+        return not (self.masks.get(dock_id, 0) & _span_mask(start_min, end_min))
+
+    def booked_minutes(self, dock_id: int) -> int:
+        return self.masks.get(dock_id, 0).bit_count()
+
+    def start_mask(self, dock_id: int, start_min: int, end_min: int, duration: int) -> int:
+        """Bit s is set when [s, s + duration) is free and inside [start_min, end_min)."""
+        if end_min - start_min < duration:
+            return 0
+        # Work on the window only (small ints are cheaper), then shift back
+        starts = ~(self.masks.get(dock_id, 0) >> start_min) & ((1 << (end_min - start_min)) - 1)
+        length = 1
+        while length < duration and starts:
+            # After this, bit s means "the next length + shift minutes are free"
+            shift = min(length, duration - length)
+            starts &= starts >> shift
+            length += shift
+        return starts << start_min
+
+    def placement_cache(self, key: Hashable) -> Dict[int, Any]:
+        """
+        Per-dock results of an allocation query (see allocation.rank), kept until the
+        dock's bookings change.
+        """
+        cache = self._placements.get(key)
+        if cache is None:
+            cache = self._placements[key] = {}
+            while len(self._placements) > PLACEMENT_CACHE_QUERIES:
+                self._placements.popitem(last=False)
+        else:
+            self._placements.move_to_end(key)
+        return cache
+
+    def free_runs(self, dock_id: int, start_min: int, end_min: int) -> List[Tuple[int, int]]:
+        """Maximal free intervals [s, e) of a dock inside [start_min, end_min)."""
+        free = ~self.masks.get(dock_id, 0) & _span_mask(start_min, end_min)
+        runs = []
+        while free:
+            start = (free & -free).bit_length() - 1
+            shifted = free >> start
+            # Lowest zero bit of the shifted value = length of the run starting at bit 0
+            length = ((shifted + 1) & ~shifted).bit_length() - 1
+            runs.append((start, start + length))
+            free &= ~_span_mask(start, start + length)
+        return runs
+
+
+class OccupancyIndex:
+    """
+    LRU of DayOccupancy objects, built lazily from the bookings table and kept current
+    by crud.create_booking / crud.update_booking through `apply`.
+    """
+
+    def __init__(self, max_days: int = OCCUPANCY_MAX_DAYS, ttl_seconds: float = OCCUPANCY_TTL_SECONDS):
+        self.max_days = max_days
+        self.ttl_seconds = ttl_seconds
+        self._days: "OrderedDict[date, DayOccupancy]" = OrderedDict()
+
+    async def get_day(self, db: AsyncSession, day: date) -> DayOccupancy:
+        occupancy = self._days.get(day)
+        if occupancy is not None and not occupancy.loading:
+            if time.monotonic() - occupancy.built_at < self.ttl_seconds:
+                self._days.move_to_end(day)
+                return occupancy
+
+        occupancy = DayOccupancy(day)
+        self._days[day] = occupancy
+        self._days.move_to_end(day)
+        try:
+            day_start, day_end = _day_span(day)
+            stmt = select(
+                models.Booking.id,
+                models.Booking.dock_id,
+                models.Booking.start_time,
+                models.Booking.end_time,
+                models.Booking.status,
+            ).where(
+                and_(
+                    # Both bounds on start_time keep this a short index range
+                    models.Booking.start_time >= day_start - timedelta(hours=OCCUPANCY_LOOKBACK_HOURS),
+                    models.Booking.start_time < day_end,
+                    models.Booking.end_time > day_start,
+                    models.not_cancelled()
+                )
+            )
+            # Kept for the whole worker, so never built from a (possibly lagging) replica
+            async with on_primary(db) as source:
+                rows = (await source.execute(stmt)).all()
+            for booking_id, dock_id, start_time, end_time, status in rows:
+                occupancy.place(booking_id, (dock_id, start_time, end_time, status))
+            # Occurrences of recurring bookings have no rows; their (negative) ids can't clash
+            for occurrence in (await recurrence_index.catalog(db)).overlapping(day_start, day_end):
+                occupancy.place(occurrence.id, (occurrence.dock_id, occurrence.start_time, occurrence.end_time,
+                                                models.BookingStatus.CONFIRMED))
+        except Exception:
+            if self._days.get(day) is occupancy:
+                del self._days[day]
+            raise
+
+        for booking_id, booking in occupancy.pending:
+            occupancy.place(booking_id, booking)
+        occupancy.pending = []
+        occupancy.loading = False
+
+        while len(self._days) > self.max_days:
+            self._days.popitem(last=False)
+        return occupancy
+
+    def apply(self, booking_id: int, old: Optional[BookingSnapshot], new: Optional[BookingSnapshot]):
+        """Record a committed write. Only days already in memory are touched."""
+        days = set()
+        for booking in (old, new):
+            if booking and booking[1] and booking[2]:
+                day = booking[1].date()
+                while day <= booking[2].date():
+                    days.add(day)
+                    day += timedelta(days=1)
+
+        for day in days:
+            occupancy = self._days.get(day)
+            if occupancy is None:
+                continue
+            if occupancy.loading:
+                occupancy.pending.append((booking_id, new))
+            else:
+                occupancy.place(booking_id, new)
+
+    def invalidate(self, day: date):
+        """Force `day` to be rebuilt from the database on next use."""
+        occupancy = self._days.get(day)
+        if occupancy is not None and not occupancy.loading:
+            del self._days[day]
+
+    def clear(self):
+        self._days.clear()
+
+
+# Singleton instance
+occupancy_index = OccupancyIndex()
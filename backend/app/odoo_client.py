@@ -1,37 +1,122 @@
+import asyncio
+import time
 import xmlrpc.client
 import os
+import httpx
+from typing import Dict, List, Optional
 from dotenv import load_dotenv
+from . import metrics
+from .cache import TTLCache
 
 load_dotenv()
 
+# Cached "not found" answers, distinct from a cache miss
+_NOT_FOUND = object()
+
 class OdooClient:
+    """
+    Async XML-RPC client for Odoo.
+    One pooled HTTP connection set is shared by all requests; validated POs are cached
+    (negative results for a shorter time) and concurrent lookups of the same PO share
+    a single upstream call.
+    """
+
     def __init__(self):
         self.url = os.getenv("ODOO_URL")
         self.db = os.getenv("ODOO_DB")
         self.username = os.getenv("ODOO_USER")
         self.password = os.getenv("ODOO_PASSWORD")
         self.uid = None
-        self.models = None
 
-    def connect(self):
-        if not all([self.url, self.db, self.username, self.password]):
-            print("Odoo credentials missing")
-            return False
-            
+        self.timeout = float(os.getenv("ODOO_TIMEOUT", "10"))
+        self.max_connections = int(os.getenv("ODOO_MAX_CONNECTIONS", "20"))
+        self.negative_ttl = float(os.getenv("ODOO_NEGATIVE_CACHE_TTL", "30"))
+        self.cache = TTLCache(
+            maxsize=int(os.getenv("ODOO_CACHE_SIZE", "4096")),
+            ttl=float(os.getenv("ODOO_CACHE_TTL", "300")),
+        )
+        self.upstream_calls = 0
+        # Max PO numbers per 'in' query, and seconds between background prefetches (0 = off)
+        self.batch_size = int(os.getenv("ODOO_BATCH_SIZE", "200"))
+        self.prefetch_interval = float(os.getenv("ODOO_PREFETCH_INTERVAL", "0"))
+
+        self._http = None
+        self._auth_lock = None
+        self._inflight = {}
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                headers={"Content-Type": "text/xml"},
+            )
+        return self._http
+
+    async def _call(self, service: str, method: str, *params):
+        body = xmlrpc.client.dumps(params, method, allow_none=True)
+        self.upstream_calls += 1
+        started = time.perf_counter()
+        ok = False
         try:
-            common = xmlrpc.client.ServerProxy('{}/xmlrpc/2/common'.format(self.url))
-            self.uid = common.authenticate(self.db, self.username, self.password, {})
-            self.models = xmlrpc.client.ServerProxy('{}/xmlrpc/2/object'.format(self.url))
-            return True
-        except Exception as e:
-            print(f"Odoo connection failed: {e}")
+            response = await self._client().post(f"{self.url}/xmlrpc/2/{service}", content=body)
+            response.raise_for_status()
+            # Raises xmlrpc.client.Fault for server-side errors
+            (result,), _ = xmlrpc.client.loads(response.content, use_builtin_types=True)
+            ok = True
+            return result
+        finally:
+            metrics.observe_odoo(method, time.perf_counter() - started, ok)
+
+    async def connect(self):
+        if not self.configured:
+            print("Odoo credentials missing")
             return False
 
-    def validate_po(self, po_number: str):
+        if self._auth_lock is None:
+            self._auth_lock = asyncio.Lock()
+        async with self._auth_lock:
+            if self.uid:
+                return True
+            try:
+                self.uid = await self._call("common", "authenticate", self.db, self.username, self.password, {})
+                return bool(self.uid)
+            except Exception as e:
+                print(f"Odoo connection failed: {e}")
+                return False
+
+    async def execute_kw(self, model: str, method: str, args: list, kwargs: dict = None):
         if not self.uid:
-            if not self.connect():
-                return None
+            if not await self.connect():
+                raise ConnectionError("Odoo authentication failed")
+        try:
+            return await self._call("object", "execute_kw", self.db, self.uid, self.password, model, method, args, kwargs or {})
+        except xmlrpc.client.Fault as e:
+            if "AccessDenied" not in e.faultString and "Access Denied" not in e.faultString:
+                raise
+            # Session/credentials rotated on the Odoo side: authenticate once more and retry
+            self.uid = None
+            if not await self.connect():
+                raise
+            return await self._call("object", "execute_kw", self.db, self.uid, self.password, model, method, args, kwargs or {})
+
+    async def validate_po(self, po_number: str):
+        cached = self.cache.get(po_number)
+        if cached is not None:
+            return None if cached is _NOT_FOUND else cached
 
+        # Coalesce: concurrent checks for the same PO wait on the same upstream call
+        task = self._inflight.get(po_number)
+        if task is None:
+            task = asyncio.ensure_future(self._fetch_po(po_number))
+            self._inflight[po_number] = task
+            task.add_done_callback(lambda _: self._inflight.pop(po_number, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_po(self, po_number: str):
         try:
             # Search for confirmed POs matching the name
             # We case-insensitive search for flexibility? Odoo names are usually case sensitive/strict.
@@ -43,29 +128,131 @@ class OdooClient:
             ]
             
             # Fetch fields: id, partner_id (supplier)
-            orders = self.models.execute_kw(
-                self.db, self.uid, self.password,
+            orders = await self.execute_kw(
                 'purchase.order', 'search_read',
                 [domain],
                 {'fields': ['id', 'partner_id'], 'limit': 1}
             )
 
             if orders:
-                order = orders[0]
-                # partner_id returns [id, "Name"]
-                partner_name = order['partner_id'][1] if order['partner_id'] else "Unknown Supplier"
-                
-                return {
-                    "valid": True,
-                    "id": order['id'],
-                    "partner": partner_name
-                }
+                result = self._order_result(orders[0])
+                self.cache.set(po_number, result)
+                return result
             
+            self.cache.set(po_number, _NOT_FOUND, ttl=self.negative_ttl)
             return None
 
         except Exception as e:
+            # Errors are not cached, the next check retries upstream
             print(f"Odoo validation error: {e}")
             return None
 
+    @staticmethod
+    def _order_result(order: dict):
+        # partner_id returns [id, "Name"]
+        partner_name = order['partner_id'][1] if order['partner_id'] else "Unknown Supplier"
+        return {
+            "valid": True,
+            "id": order['id'],
+            "partner": partner_name
+        }
+
+    async def validate_pos(self, po_numbers: List[str]) -> Dict[str, Optional[dict]]:
+        """
+        Validate many POs at once: cache hits and in-flight lookups are reused and
+        the rest are fetched with one ['name', 'in', [...]] search_read per chunk.
+        Returns {po_number: result or None}.
+        """
+        pending = {}
+        missing = []
+        results = {}
+        for po_number in dict.fromkeys(po_numbers):
+            cached = self.cache.get(po_number)
+            if cached is not None:
+                results[po_number] = None if cached is _NOT_FOUND else cached
+            elif po_number in self._inflight:
+                pending[po_number] = self._inflight[po_number]
+            else:
+                missing.append(po_number)
+
+        for offset in range(0, len(missing), self.batch_size):
+            chunk = missing[offset:offset + self.batch_size]
+            batch = asyncio.ensure_future(self._fetch_pos(chunk))
+            for po_number in chunk:
+                # Single lookups arriving meanwhile wait on the batch instead of querying again
+                task = asyncio.ensure_future(self._pick(batch, po_number))
+                self._inflight[po_number] = task
+                task.add_done_callback(lambda _, po_number=po_number: self._inflight.pop(po_number, None))
+                pending[po_number] = task
+
+        for po_number, task in pending.items():
+            results[po_number] = await asyncio.shield(task)
+        return {po_number: results[po_number] for po_number in dict.fromkeys(po_numbers)}
+
+    @staticmethod
+    async def _pick(batch: "asyncio.Future", po_number: str):
+        return (await batch).get(po_number)
+
+    async def _fetch_pos(self, po_numbers: List[str]) -> Dict[str, Optional[dict]]:
+        try:
+            domain = [
+                ['name', 'in', po_numbers],
+                ['state', 'in', ['purchase', 'done']]
+            ]
+            orders = await self.execute_kw(
+                'purchase.order', 'search_read',
+                [domain],
+                {'fields': ['id', 'name', 'partner_id']}
+            )
+        except Exception as e:
+            print(f"Odoo batch validation error: {e}")
+            return {}
+
+        found = {order['name']: self._order_result(order) for order in orders}
+        for po_number in po_numbers:
+            if po_number in found:
+                self.cache.set(po_number, found[po_number])
+            else:
+                self.cache.set(po_number, _NOT_FOUND, ttl=self.negative_ttl)
+        return found
+
+    async def prefetch(self, page_size: int = 1000) -> int:
+        """Load every PO in 'purchase'/'done' state into the cache. Returns how many were cached."""
+        # Entries must outlive the interval between two prefetch runs
+        ttl = max(self.cache.ttl, self.prefetch_interval * 2)
+        loaded = 0
+        offset = 0
+        while True:
+            orders = await self.execute_kw(
+                'purchase.order', 'search_read',
+                [[['state', 'in', ['purchase', 'done']]]],
+                {'fields': ['id', 'name', 'partner_id'], 'order': 'id', 'offset': offset, 'limit': page_size}
+            )
+            for order in orders:
+                self.cache.set(order['name'], self._order_result(order), ttl=ttl)
+            loaded += len(orders)
+            if len(orders) < page_size:
+                return loaded
+            offset += page_size
+
+    async def run_prefetch(self):
+        """Background job: refresh the PO cache every ODOO_PREFETCH_INTERVAL seconds."""
+        while True:
+            try:
+                loaded = await self.prefetch()
+                print(f"Odoo prefetch: cached {loaded} purchase orders")
+            except Exception as e:
+                print(f"Odoo prefetch failed: {e}")
+            await asyncio.sleep(self.prefetch_interval)
+
+    @property
+    def configured(self) -> bool:
+        return all([self.url, self.db, self.username, self.password])
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
 # Singleton instance
 odoo_client = OdooClient()
@@ -0,0 +1,314 @@
+import calendar
+import os
+import time as _time
+from datetime import date, datetime, timedelta
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from . import models
+from .cache import TTLCache
+from .database import on_primary
+
+# Series and exceptions are reloaded after this long (picks up other workers' changes)
+RECURRING_TTL_SECONDS = float(os.getenv("RECURRING_TTL_SECONDS", "60"))
+# Expanded days kept in memory
+RECURRING_CACHE_DAYS = int(os.getenv("RECURRING_CACHE_DAYS", "1024"))
+# Open-ended listings (no upper bound on start time) show occurrences this far ahead
+RECURRING_LIST_HORIZON_DAYS = int(os.getenv("RECURRING_LIST_HORIZON_DAYS", "90"))
+# A new series is checked against existing series for this many days
+RECURRING_CHECK_DAYS = int(os.getenv("RECURRING_CHECK_DAYS", "366"))
+# Largest COUNT accepted in a rule
+RECURRING_MAX_COUNT = int(os.getenv("RECURRING_MAX_COUNT", "1000"))
+
+WEEKDAYS = ("MO", "TU", "WE", "TH", "FR", "SA", "SU")
+FREQUENCIES = ("DAILY", "WEEKLY", "MONTHLY")
+
+# Occurrences get negative ids: -(series_id << 20 | days since ID_EPOCH)
+ID_EPOCH = date(2000, 1, 1)
+_DAY_BITS = 20
+
+
+class Rule(NamedTuple):
+    freq: str
+    interval: int = 1
+    byday: Tuple[int, ...] = () # Weekday numbers, Monday = 0
+    bymonthday: Tuple[int, ...] = ()
+    count: Optional[int] = None
+    until: Optional[date] = None
+
+
+def parse_rule(text: str) -> Rule:
+    """
+    RRULE subset: FREQ=DAILY|WEEKLY|MONTHLY, INTERVAL, BYDAY (weekly), BYMONTHDAY (monthly),
+    COUNT, UNTIL=YYYYMMDD. An optional "RRULE:" prefix is accepted. Raises ValueError.
+    """
+    parts = {}
+    body = text.strip()
+    if body.upper().startswith("RRULE:"):
+        body = body[6:]
+    for part in filter(None, body.split(";")):
+        key, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"Invalid rule part '{part}'")
+        parts[key.strip().upper()] = value.strip().upper()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"FREQ must be one of {', '.join(FREQUENCIES)}")
+    try:
+        interval = int(parts.pop("INTERVAL", "1"))
+        count = int(parts.pop("COUNT")) if "COUNT" in parts else None
+        until = datetime.strptime(parts.pop("UNTIL")[:8], "%Y%m%d").date() if "UNTIL" in parts else None
+        byday = tuple(sorted({WEEKDAYS.index(day) for day in parts.pop("BYDAY").split(",")})) if "BYDAY" in parts else ()
+        bymonthday = tuple(sorted({int(day) for day in parts.pop("BYMONTHDAY").split(",")})) if "BYMONTHDAY" in parts else ()
+    except ValueError as e:
+        raise ValueError(f"Invalid rule: {e}") from e
+    if parts:
+        raise ValueError(f"Unsupported rule parts: {', '.join(sorted(parts))}")
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError("INTERVAL and COUNT must be positive")
+    if count is not None and count > RECURRING_MAX_COUNT:
+        raise ValueError(f"COUNT must be at most {RECURRING_MAX_COUNT}")
+    if count is not None and until is not None:
+        raise ValueError("Use COUNT or UNTIL, not both")
+    if byday and freq != "WEEKLY":
+        raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+    if bymonthday and (freq != "MONTHLY" or not all(1 <= day <= 31 for day in bymonthday)):
+        raise ValueError("BYMONTHDAY (1-31) is only supported with FREQ=MONTHLY")
+    return Rule(freq, interval, byday, bymonthday, count, until)
+
+
+def _matches(rule: Rule, starts_on: date, day: date) -> bool:
+    """Whether the rule produces `day`, ignoring COUNT/UNTIL."""
+    if day < starts_on:
+        return False
+    if rule.freq == "DAILY":
+        return (day - starts_on).days % rule.interval == 0
+    if rule.freq == "WEEKLY":
+        if day.weekday() not in (rule.byday or (starts_on.weekday(),)):
+            return False
+        first_monday = starts_on - timedelta(days=starts_on.weekday())
+        return ((day - first_monday).days // 7) % rule.interval == 0
+    months = (day.year - starts_on.year) * 12 + day.month - starts_on.month
+    return day.day in (rule.bymonthday or (starts_on.day,)) and months % rule.interval == 0
+
+
+def _dates(rule: Rule, starts_on: date):
+    """
+    The dates the rule produces from starts_on on, in order (COUNT/UNTIL ignored), one
+    period at a time. Raises ValueError when it can never produce one (a monthly rule
+    whose days don't exist in any month it lands on, e.g. BYMONTHDAY=31;INTERVAL=12 from April).
+    """
+    try:
+        if rule.freq == "DAILY":
+            day = starts_on
+            while True:
+                yield day
+                day += timedelta(days=rule.interval)
+        if rule.freq == "WEEKLY":
+            week = starts_on - timedelta(days=starts_on.weekday())
+            while True:
+                for weekday in rule.byday or (starts_on.weekday(),):
+                    day = week + timedelta(days=weekday)
+                    if day >= starts_on:
+                        yield day
+                week += timedelta(weeks=rule.interval)
+    except OverflowError: # Past date.max
+        return
+    # The months a monthly rule lands on repeat after at most 12 periods
+    month, empty = starts_on.year * 12 + starts_on.month - 1, 0
+    while month // 12 <= date.max.year:
+        year, month_of_year = divmod(month, 12)
+        last_day = calendar.monthrange(year, month_of_year + 1)[1]
+        days = [
+            date(year, month_of_year + 1, monthday) for monthday in rule.bymonthday or (starts_on.day,)
+            if monthday <= last_day and date(year, month_of_year + 1, monthday) >= starts_on
+        ]
+        yield from days
+        empty = 0 if days else empty + 1
+        if empty > 12:
+            raise ValueError("The rule never produces a date")
+        month += rule.interval
+
+
+def last_date(rule: Rule, starts_on: date, ends_on: Optional[date] = None) -> Optional[date]:
+    """
+    The series' last possible date: the earliest of ends_on, UNTIL and the COUNT-th occurrence.
+    Raises ValueError when the rule produces no date before that.
+    """
+    bounds = [bound for bound in (ends_on, rule.until) if bound]
+    limit = min(bounds) if bounds else None
+    seen = 0
+    for day in _dates(rule, starts_on):
+        if limit is not None and day > limit:
+            break
+        seen += 1
+        if seen == (rule.count or 1):
+            if rule.count:
+                bounds.append(day)
+            break
+    if not seen:
+        raise ValueError("The rule produces no dates before the series ends")
+    return min(bounds) if bounds else None
+
+
+def occurrence_id(series_id: int, day: date) -> int:
+    return -((series_id << _DAY_BITS) | (day - ID_EPOCH).days)
+
+
+def parse_occurrence_id(booking_id: int) -> Tuple[int, date]:
+    """(series id, occurrence date) for a negative booking id. Raises ValueError."""
+    if booking_id >= 0:
+        raise ValueError("Not an occurrence id")
+    packed = -booking_id
+    return packed >> _DAY_BITS, ID_EPOCH + timedelta(days=packed & ((1 << _DAY_BITS) - 1))
+
+
+class Occurrence(NamedTuple):
+    id: int
+    series_id: int
+    occurrence_date: date # The date the rule produced (before any move)
+    dock_id: int
+    start_time: datetime
+    end_time: datetime
+
+    def to_booking(self, series) -> models.Booking:
+        """Transient Booking (never added to a session) for responses and merging."""
+        return models.Booking(
+            id=self.id, dock_id=self.dock_id, start_time=self.start_time, end_time=self.end_time,
+            carrier_name=series.carrier_name, po_number=series.po_number, odoo_order_id=series.odoo_order_id,
+            driver_phone=series.driver_phone, status=models.BookingStatus.CONFIRMED,
+        )
+
+
+class Catalog:
+    """All active series and their exceptions, with per-day expansions cached."""
+
+    def __init__(self, series, exceptions, version=None):
+        self.loaded_at = _time.monotonic()
+        self.version = version
+        self.series = {item.id: item for item in series}
+        self.rules = {item.id: parse_rule(item.rule) for item in series}
+        self.exceptions = {}
+        self.moved_to = {}
+        for exception in exceptions:
+            if exception.recurring_booking_id not in self.series:
+                continue
+            self.exceptions[(exception.recurring_booking_id, exception.occurrence_date)] = exception
+            if exception.kind == "move" and exception.new_start:
+                self.moved_to.setdefault(exception.new_start.date(), []).append(exception)
+        self.days = TTLCache(maxsize=RECURRING_CACHE_DAYS, ttl=RECURRING_TTL_SECONDS)
+
+    def produces(self, series, day: date) -> bool:
+        if not series.is_active or day < series.starts_on or (series.ends_on and day > series.ends_on):
+            return False
+        return _matches(self.rules[series.id], series.starts_on, day)
+
+    def _base(self, series, day: date) -> Occurrence:
+        start = datetime.combine(day, series.start_time)
+        return Occurrence(
+            occurrence_id(series.id, day), series.id, day, series.dock_id,
+            start, start + timedelta(minutes=series.duration_minutes),
+        )
+
+    def _moved(self, exception) -> Occurrence:
+        series = self.series[exception.recurring_booking_id]
+        return Occurrence(
+            occurrence_id(series.id, exception.occurrence_date), series.id, exception.occurrence_date,
+            exception.new_dock_id or series.dock_id, exception.new_start, exception.new_end,
+        )
+
+    def occurrence(self, series_id: int, day: date) -> Optional[Occurrence]:
+        """The occurrence the rule produced on `day` (moved if it was), or None if there is none/skipped."""
+        series = self.series.get(series_id)
+        if series is None:
+            return None
+        exception = self.exceptions.get((series_id, day))
+        if exception is not None:
+            return self._moved(exception) if exception.kind == "move" else None
+        return self._base(series, day) if self.produces(series, day) else None
+
+    def starting_on(self, day: date) -> List[Occurrence]:
+        """Occurrences whose start time falls on `day`, moves applied, ordered like bookings."""
+        cached = self.days.get(day)
+        if cached is not None:
+            return cached
+        occurrences = [
+            self._base(series, day) for series in self.series.values()
+            if self.produces(series, day) and (series.id, day) not in self.exceptions
+        ]
+        occurrences.extend(self._moved(exception) for exception in self.moved_to.get(day, ()))
+        occurrences.sort(key=lambda occurrence: (occurrence.start_time, occurrence.id))
+        self.days.set(day, occurrences)
+        return occurrences
+
+    def between(self, start: datetime, end: datetime) -> List[Occurrence]:
+        """Occurrences starting in [start, end)."""
+        found = []
+        day = start.date()
+        while day <= end.date():
+            found.extend(o for o in self.starting_on(day) if start <= o.start_time < end)
+            day += timedelta(days=1)
+        return found
+
+    def overlapping(self, start: datetime, end: datetime, dock_id: Optional[int] = None) -> List[Occurrence]:
+        """Occurrences overlapping [start, end); they last at most a day, so one day back is enough."""
+        found = []
+        day = start.date() - timedelta(days=1)
+        while day <= end.date():
+            found.extend(
+                o for o in self.starting_on(day)
+                if o.start_time < end and o.end_time > start and (dock_id is None or o.dock_id == dock_id)
+            )
+            day += timedelta(days=1)
+        return found
+
+    def first_date(self) -> Optional[date]:
+        return min((series.starts_on for series in self.series.values()), default=None)
+
+
+class RecurrenceIndex:
+    """
+    Lazily loaded Catalog, rebuilt after RECURRING_TTL_SECONDS or when crud changes a
+    series or exception (invalidate). Reads can live with that lag; write paths pass
+    fresh=True, which first compares the catalog's version (series count and summed
+    revisions, see models.RecurringBooking.revision) with the database's, so a series
+    another worker just added or changed is never missed by an overlap check.
+    """
+
+    def __init__(self, ttl_seconds: float = RECURRING_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._catalog: Optional[Catalog] = None
+
+    async def catalog(self, db: AsyncSession, fresh: bool = False) -> Catalog:
+        catalog = self._catalog
+        if catalog is not None and not fresh and _time.monotonic() - catalog.loaded_at < self.ttl_seconds:
+            return catalog
+        # Plain rows, not ORM objects: the catalog outlives the session (and its rollbacks)
+        series_table = models.RecurringBooking.__table__
+        exceptions_table = models.RecurringException.__table__
+        async with on_primary(db) as source: # Not from a replica that may predate the last change
+            # Read before the rows: a change committed in between only makes the next check reload again
+            version = tuple((await source.execute(
+                select(func.count(), func.coalesce(func.sum(series_table.c.revision), 0)).select_from(series_table)
+            )).one())
+            if catalog is not None and catalog.version == version:
+                catalog.loaded_at = _time.monotonic()
+                return catalog
+            series = (await source.execute(select(*series_table.c).where(series_table.c.is_active == True))).all()
+            exceptions = (await source.execute(
+                select(*exceptions_table.c).where(exceptions_table.c.recurring_booking_id.in_([item.id for item in series]))
+            )).all() if series else []
+        catalog = Catalog(series, exceptions, version)
+        self._catalog = catalog
+        return catalog
+
+    def invalidate(self):
+        self._catalog = None
+
+
+# Singleton instance
+recurrence_index = RecurrenceIndex()
@@ -0,0 +1,218 @@
+import hashlib
+import json
+import os
+import time
+from datetime import date
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from . import metrics
+from .cache import TTLCache
+
+# Rendered GET responses, per resource scope ("docks", "bookings:<date>")
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "512"))
+# Upper bound on staleness for values derived from the clock (e.g. a dock's next booking),
+# and for writes made by other workers when the cache is per process
+RESPONSE_CACHE_TTL_SECONDS = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30"))
+# e.g. redis://localhost:6379/1 to share entries and invalidations between workers
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+
+DOCKS = "docks"
+
+# (etag, extra headers, body)
+Entry = Tuple[str, Dict[str, str], bytes]
+
+lookups = metrics.Counter("simpledock_response_cache_total", "Cached GET lookups by result.", ("scope", "result"))
+
+
+def bookings_scope(day: date) -> str:
+    return f"bookings:{day.isoformat()}"
+
+
+class MemoryBackend:
+    """
+    Default: a per-process LRU. Every scope has a generation that invalidation bumps;
+    entries remember the generation they were rendered under, so a response built
+    from data read before a write can't be stored as current after it.
+    """
+
+    def __init__(self, maxsize: int = RESPONSE_CACHE_SIZE, ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.generations: Dict[str, int] = {}
+        # Bumped by invalidate_all; part of every generation
+        self.epoch = 0
+
+    def _generation(self, scope: str) -> Tuple[int, int]:
+        return self.epoch, self.generations.get(scope, 0)
+
+    async def get(self, scope: str, variant: str) -> Tuple[Tuple[int, int], Optional[Entry]]:
+        generation = self._generation(scope)
+        cached = self.entries.get((scope, variant))
+        if cached is None or cached[0] != generation:
+            return generation, None
+        return generation, cached[1]
+
+    async def set(self, scope: str, variant: str, generation, entry: Entry):
+        if self._generation(scope) == generation:
+            self.entries.set((scope, variant), (generation, entry))
+
+    async def invalidate(self, scopes: Iterable[str]):
+        for scope in scopes:
+            self.generations[scope] = self.generations.get(scope, 0) + 1
+
+    async def invalidate_all(self):
+        self.epoch += 1
+        self.entries.clear()
+
+    async def close(self):
+        pass
+
+
+class RedisBackend:
+    """
+    One hash per scope: a "gen" field plus one field per variant, read together with
+    HMGET (one round trip). Needs the optional `redis` package.
+    """
+
+    def __init__(self, url: str, prefix: str = "simpledock:responses", ttl: float = RESPONSE_CACHE_TTL_SECONDS):
+        self.url = url
+        self.prefix = prefix
+        self.ttl = ttl
+        self._redis = None
+
+    def _client(self):
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis
+            except ImportError as e:
+                raise RuntimeError("RESPONSE_CACHE_URL is set but the 'redis' package is not installed") from e
+            self._redis = redis.from_url(self.url)
+        return self._redis
+
+    async def get(self, scope, variant):
+        generation, raw = await self._client().hmget(f"{self.prefix}:{scope}", "gen", variant)
+        generation = int(generation or 0)
+        if raw is None:
+            return generation, None
+        cached = json.loads(raw)
+        if cached["gen"] != generation or cached["expires_at"] <= time.time():
+            return generation, None
+        return generation, (cached["etag"], cached["headers"], cached["body"].encode())
+
+    async def set(self, scope, variant, generation, entry):
+        etag, headers, body = entry
+        value = json.dumps({
+            "gen": generation, "expires_at": time.time() + self.ttl,
+            "etag": etag, "headers": headers, "body": body.decode(),
+        })
+        key = f"{self.prefix}:{scope}"
+        async with self._client().pipeline(transaction=False) as pipe:
+            pipe.hset(key, variant, value)
+            # Idle scopes disappear on their own (the generation with them, which is fine:
+            # so do all entries rendered under it)
+            pipe.expire(key, int(self.ttl * 4) + 1)
+            await pipe.execute()
+
+    async def invalidate(self, scopes):
+        async with self._client().pipeline(transaction=False) as pipe:
+            for scope in scopes:
+                pipe.hincrby(f"{self.prefix}:{scope}", "gen", 1)
+                pipe.expire(f"{self.prefix}:{scope}", int(self.ttl * 4) + 1)
+            await pipe.execute()
+
+    async def invalidate_all(self):
+        client = self._client()
+        async for key in client.scan_iter(match=f"{self.prefix}:*", count=500):
+            await client.hincrby(key, "gen", 1)
+
+    async def close(self):
+        if self._redis:
+            await self._redis.aclose()
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        # If-None-Match uses the weak comparison, so W/"x" matches "x"
+        if tag == "*" or tag.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def _respond(request: Request, entry: Entry) -> Response:
+    etag, headers, body = entry
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class ResponseCache:
+    def __init__(self, backend=None):
+        self.backend = backend or MemoryBackend()
+
+    async def respond(self, request: Request, scope: str, render: Callable[[], Awaitable[Tuple[bytes, Dict[str, str]]]]) -> Response:
+        """
+        Serves the cached rendering of this request (keyed by scope + query string), or
+        renders and stores it. `render` returns (JSON body, extra headers).
+        Either way the response has a strong ETag, and a matching If-None-Match gets a 304.
+        """
+        variant = "&".join(sorted(request.url.query.split("&")))
+        label = scope.split(":", 1)[0]
+        generation, entry = (0, None)
+        if RESPONSE_CACHE_ENABLED:
+            try:
+                generation, entry = await self.backend.get(scope, variant)
+            except Exception as e:
+                # A cache outage only costs the database work
+                print(f"Response cache read failed: {e}")
+
+        if entry is None:
+            lookups.inc(scope=label, result="miss")
+            body, headers = await render()
+            entry = (etag_for(body), headers, body)
+            if RESPONSE_CACHE_ENABLED:
+                try:
+                    await self.backend.set(scope, variant, generation, entry)
+                except Exception as e:
+                    print(f"Response cache write failed: {e}")
+        else:
+            lookups.inc(scope=label, result="hit")
+        return _respond(request, entry)
+
+    async def invalidate(self, *scopes: str):
+        """Called by crud after committing a write that changes these scopes."""
+        if not scopes:
+            return
+        try:
+            await self.backend.invalidate(set(scopes))
+        except Exception as e:
+            print(f"Response cache invalidation failed: {e}")
+
+    async def invalidate_all(self):
+        """For writes that can touch any scope (e.g. a recurring booking series)."""
+        try:
+            await self.backend.invalidate_all()
+        except Exception as e:
+            print(f"Response cache invalidation failed: {e}")
+
+    async def close(self):
+        await self.backend.close()
+
+
+def _make_backend():
+    if RESPONSE_CACHE_URL:
+        return RedisBackend(RESPONSE_CACHE_URL)
+    return MemoryBackend()
+
+
+# Singleton instance
+response_cache = ResponseCache(backend=_make_backend())
@@ -0,0 +1,33 @@
+from datetime import date, timedelta
+from typing import Literal, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud, database, schemas
+
+router = APIRouter(
+    prefix="/analytics",
+    tags=["analytics"],
+)
+
+@router.get("/utilization", response_model=schemas.UtilizationReport, response_model_exclude_none=True)
+async def read_utilization(
+    start: Optional[date] = Query(None, alias="from"),
+    end: Optional[date] = Query(None, alias="to"),
+    granularity: Literal["hour", "day"] = "day",
+    group_by: Literal["dock", "capability", "total"] = "dock",
+    dock_id: Optional[int] = None,
+    capability: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_read_db),
+):
+    """
+    Booked/idle minutes, late, no-show and turnaround per dock (or capability, or in total)
+    for the days from..to (default: the last 30 days), from the hourly/daily rollup tables.
+    """
+    end = end or date.today()
+    start = start or end - timedelta(days=29)
+    try:
+        return await crud.get_utilization(
+            db, start, end, granularity=granularity, group_by=group_by, dock_id=dock_id, capability=capability,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
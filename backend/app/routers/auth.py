@@ -21,7 +21,7 @@ async def signup_driver(driver: schemas.DriverCreate, db: AsyncSession = Depends
     if existing_driver:
         raise HTTPException(status_code=400, detail="Phone number already registered")
     
-    hashed_password = security.get_password_hash(driver.password)
+    hashed_password = await security.hash_password_async(driver.password)
     new_driver = models.Driver(
         phone=driver.phone,
         name=driver.name,
@@ -30,6 +30,7 @@ async def signup_driver(driver: schemas.DriverCreate, db: AsyncSession = Depends
     db.add(new_driver)
     await db.commit()
     await db.refresh(new_driver)
+    security.forget_driver(new_driver.phone)
     return new_driver
 
 @router.post("/driver/login", response_model=schemas.Token)
@@ -38,16 +39,28 @@ async def login_driver(form_data: Annotated[OAuth2PasswordRequestForm, Depends()
     result = await db.execute(select(models.Driver).where(models.Driver.phone == form_data.username))
     driver = result.scalars().first()
     
-    if not driver or not security.verify_password(form_data.password, driver.hashed_password):
+    valid, new_hash = False, None
+    if driver:
+        valid, new_hash = await security.verify_and_update_password_async(form_data.password, driver.hashed_password)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect phone or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+    if new_hash:
+        # Hash parameters changed since this password was stored: upgrade it transparently
+        driver.hashed_password = new_hash
+        await db.commit()
+        security.forget_driver(driver.phone)
     
+    claims = {"sub": driver.phone}
+    if security.AUTH_STATELESS:
+        claims.update(id=driver.id, name=driver.name, created_at=driver.created_at.isoformat())
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(
-        data={"sub": driver.phone}, expires_delta=access_token_expires
+        data=claims, expires_delta=access_token_expires
     )
     return {"access_token": access_token, "token_type": "bearer"}
 
@@ -58,18 +71,32 @@ async def get_current_driver(token: Annotated[str, Depends(oauth2_scheme)], db:
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM])
+        payload = security.decode_access_token(token)
         phone: str = payload.get("sub")
         if phone is None:
             raise credentials_exception
         token_data = schemas.TokenData(phone=phone)
     except security.JWTError:
         raise credentials_exception
-        
+
+    if security.AUTH_STATELESS and "id" in payload:
+        # Everything /me needs is in the signed claims
+        return schemas.DriverResponse(
+            id=payload["id"], phone=phone, name=payload["name"], created_at=payload["created_at"]
+        )
+
+    driver = security.driver_cache.get(token_data.phone)
+    if driver is not None:
+        return driver
+
     result = await db.execute(select(models.Driver).where(models.Driver.phone == token_data.phone))
     driver = result.scalars().first()
     if driver is None:
         raise credentials_exception
+    # Cache a detached snapshot, not the ORM object bound to this request's session
+    driver = schemas.DriverResponse.model_validate(driver)
+    if security.AUTH_CACHE_TTL_SECONDS > 0:
+        security.driver_cache.set(token_data.phone, driver)
     return driver
 
 @router.get("/driver/me", response_model=schemas.DriverResponse)
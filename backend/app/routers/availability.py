@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import date, time
+from typing import Optional
+from .. import crud, schemas, database
+
+router = APIRouter(
+    prefix="/availability",
+    tags=["availability"],
+)
+
+@router.get("", response_model=schemas.Availability)
+async def read_availability(
+    date: date,
+    capability: Optional[str] = None,
+    slot_minutes: int = Query(60, ge=5, le=24 * 60),
+    step_minutes: Optional[int] = Query(None, ge=5, le=24 * 60),
+    day_start: time = time(8, 0),
+    day_end: time = time(17, 0),
+    db: AsyncSession = Depends(database.get_read_db),
+):
+    """
+    Free slots for a date and load type, with the number of capable docks free in each.
+    Replaces downloading the whole day's bookings and checking slots client-side.
+    """
+    if day_end <= day_start:
+        raise HTTPException(status_code=400, detail="day_end must be after day_start")
+    return await crud.get_availability(
+        db, date, capability=capability, slot_minutes=slot_minutes,
+        day_start=day_start, day_end=day_end, step_minutes=step_minutes,
+    )
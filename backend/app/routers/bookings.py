@@ -1,52 +1,232 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
+import csv
+import io
+import json
+import os
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from .. import crud, schemas, database
+from .. import crud, schemas, database, serialization
+from ..models import BookingStatus
+from pydantic import ValidationError
+from ..response_cache import response_cache, bookings_scope
+
+# Largest batch accepted by POST /bookings/bulk
+BULK_MAX_ROWS = int(os.getenv("BULK_MAX_ROWS", "5000"))
 
 router = APIRouter(
     prefix="/bookings",
     tags=["bookings"],
 )
 
-def send_notification(booking_ref: str, time_str: str):
-    # Mock Notification
-    print(f"XXX NOTICE: Booking {booking_ref} Confirmed for {time_str} [Sent via WhatsApp] XXX")
-
 from ..odoo_client import odoo_client
 
 @router.get("/validate-po")
-def validate_po(po: str):
+async def validate_po(po: str):
     """
-    Validates a PO against Odoo ERP.
+    Validates a PO against Odoo ERP (cached, see OdooClient).
     Returns {valid: true, id: int, partner: str} or 404.
     """
-    result = odoo_client.validate_po(po)
+    result = await odoo_client.validate_po(po)
     if not result:
         raise HTTPException(status_code=404, detail="PO not found in Odoo (must be in 'Purchase' or 'Done' state)")
     return result
 
+@router.post("/validate-po/batch", response_model=schemas.POBatchValidation)
+async def validate_po_batch(request: schemas.POBatchValidationRequest):
+    """
+    Validates many POs with one Odoo query (cache hits are answered locally).
+    Unknown POs come back as {valid: false}.
+    """
+    results = await odoo_client.validate_pos(request.po_numbers)
+    return {"results": {po: result or {"valid": False} for po, result in results.items()}}
+
 @router.post("/", response_model=schemas.Booking)
-async def create_booking(booking: schemas.BookingCreate, background_tasks: BackgroundTasks, db: AsyncSession = Depends(database.get_db)):
-    db_booking = await crud.create_booking(db=db, booking=booking)
+async def create_booking(booking: schemas.BookingCreate, db: AsyncSession = Depends(database.get_db)):
+    # The confirmation goes out through the notification outbox (see app.notifications)
+    try:
+        db_booking = await crud.create_booking(db=db, booking=booking)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not db_booking:
         raise HTTPException(status_code=400, detail="Time slot already booked")
-    
-    # Generate booking ref (Simple ID based for MVP)
-    booking_ref = f"BK-{db_booking.id:04d}"
-    background_tasks.add_task(send_notification, booking_ref, str(db_booking.start_time))
-    
     return db_booking
 
-from datetime import date
+def _bulk_rows(body: bytes, content_type: str) -> list:
+    """Raw rows from a JSON array ({"bookings": [...]} also accepted) or a CSV file with a header."""
+    try:
+        if "csv" in content_type:
+            text = body.decode("utf-8-sig")
+            # Empty cells are missing values; extra columns (e.g. id/status from /export) are ignored
+            return [
+                {key: value for key, value in row.items() if key and value not in ("", None)}
+                for row in csv.DictReader(io.StringIO(text))
+            ]
+        data = json.loads(body)
+    except (UnicodeDecodeError, ValueError, csv.Error) as e:
+        raise HTTPException(status_code=400, detail=f"Could not parse request body: {e}")
+    if isinstance(data, dict):
+        data = data.get("bookings")
+    if not isinstance(data, list):
+        raise HTTPException(status_code=400, detail="Expected a JSON array of bookings")
+    return data
+
+@router.post("/bulk", response_model=schemas.BulkBookingResult)
+async def create_bookings_bulk(request: Request, db: AsyncSession = Depends(database.get_db)):
+    """
+    Creates up to BULK_MAX_ROWS bookings from a JSON array or a CSV upload
+    (Content-Type: text/csv, same columns as /bookings/export).
+    Every row gets an outcome: created, rejected (overlap/unknown dock) or invalid.
+    """
+    raw_rows = _bulk_rows(await request.body(), request.headers.get("content-type", ""))
+    if len(raw_rows) > BULK_MAX_ROWS:
+        raise HTTPException(status_code=400, detail=f"At most {BULK_MAX_ROWS} bookings per request")
+
+    results = [None] * len(raw_rows)
+    bookings, positions = [], []
+    for row, raw in enumerate(raw_rows):
+        try:
+            bookings.append(schemas.BookingCreate.model_validate(raw))
+            positions.append(row)
+        except ValidationError as e:
+            error = "; ".join(f"{'.'.join(str(loc) for loc in err['loc'])}: {err['msg']}" for err in e.errors())
+            results[row] = {"row": row, "status": "invalid", "error": error}
+
+    outcomes = await crud.create_bookings_bulk(db, bookings)
+    for index, (db_booking, error) in outcomes.items():
+        row = positions[index]
+        if db_booking:
+            results[row] = {"row": row, "status": "created", "booking": db_booking}
+        else:
+            results[row] = {"row": row, "status": "rejected", "error": error}
+
+    counts = {status: sum(1 for result in results if result["status"] == status) for status in ("created", "rejected", "invalid")}
+    return {**counts, "results": results}
+
+@router.post("/auto", response_model=schemas.Booking)
+async def auto_assign_booking(request: schemas.AutoBookingRequest, db: AsyncSession = Depends(database.get_db)):
+    """
+    Books the best capable dock inside [window_start, window_end) with the chosen
+    strategy (best_fit, least_utilized or min_fragmentation).
+    """
+    try:
+        db_booking = await crud.auto_assign_booking(db, request)
+    except crud.InvalidWindow as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not db_booking:
+        raise HTTPException(status_code=400, detail="No capable dock is free in the requested window")
+    return db_booking
+
+from datetime import date, datetime
 from typing import Optional
 
 @router.get("/", response_model=List[schemas.Booking])
-async def read_bookings(skip: int = 0, limit: int = 100, dock_id: Optional[int] = None, date: Optional[date] = None, db: AsyncSession = Depends(database.get_db)):
-    return await crud.get_bookings(db, skip=skip, limit=limit, dock_id=dock_id, date_filter=date)
+async def read_bookings(
+    request: Request,
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    dock_id: Optional[int] = None,
+    date: Optional[date] = None,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    status: Optional[List[BookingStatus]] = Query(None),
+    cursor: Optional[str] = None,
+    format: str = Query("rows", pattern="^(rows|columnar)$"),
+    db: AsyncSession = Depends(database.get_read_db),
+):
+    """
+    Bookings ordered by start time. When a page is full, the X-Next-Cursor header holds
+    an opaque cursor; pass it back as ?cursor= for the next page (skip is then ignored).
+    Day schedules (?date=) come from the response cache, with ETag / If-None-Match.
+    ?format=columnar (with ?date=) returns the compact day schedule instead
+    (parallel arrays, see serialization.day_schedule): always the whole day, in one
+    response, so skip / limit / cursor don't apply to it.
+    """
+    columnar = format == "columnar"
+    if columnar and date is None:
+        raise HTTPException(status_code=400, detail="format=columnar needs a date")
+
+    async def fetch(db):
+        try:
+            return await crud.get_bookings(
+                db, skip=0 if columnar else skip, limit=None if columnar else limit, dock_id=dock_id, date_filter=date,
+                start_from=start_from, start_to=start_to, statuses=status, cursor=None if columnar else cursor,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    def next_cursor(bookings) -> dict:
+        return {"X-Next-Cursor": crud.encode_cursor(bookings[-1])} if len(bookings) == limit else {}
+
+    # Rows are serialized straight to JSON bytes: the response_model above only documents them
+    if date is not None:
+        async def render():
+            # Cached for everyone, so never read from a lagging replica
+            async with database.on_primary(db) as source:
+                bookings = await fetch(source)
+            if columnar:
+                return serialization.dumps(serialization.day_schedule(date, bookings)), {}
+            return serialization.dumps(serialization.booking_rows(bookings)), next_cursor(bookings)
+        return await response_cache.respond(request, bookings_scope(date), render)
+
+    bookings = await fetch(db)
+    body = serialization.dumps(serialization.booking_rows(bookings))
+    return Response(content=body, media_type="application/json", headers=next_cursor(bookings))
+
+EXPORT_FIELDS = ["id", "dock_id", "start_time", "end_time", "carrier_name", "po_number", "odoo_order_id", "status", "driver_phone"]
+
+def _export_row(booking) -> dict:
+    row = {field: getattr(booking, field) for field in EXPORT_FIELDS}
+    row["start_time"] = booking.start_time.isoformat() if booking.start_time else None
+    row["end_time"] = booking.end_time.isoformat() if booking.end_time else None
+    row["status"] = booking.status.value if booking.status else None
+    return row
+
+@router.get("/export")
+async def export_bookings(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    dock_id: Optional[int] = None,
+    start_from: Optional[datetime] = None,
+    start_to: Optional[datetime] = None,
+    status: Optional[List[BookingStatus]] = Query(None),
+):
+    """
+    Streams every matching booking as NDJSON or CSV, straight off a server-side cursor,
+    so large date ranges export in constant memory.
+    """
+    async def rows():
+        # Own session: the stream outlives the request's dependency scope
+        async with database.read_router.session_factory(request)() as db:
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+                writer.writeheader()
+            async for booking in crud.stream_bookings(db, dock_id=dock_id, start_from=start_from, start_to=start_to, statuses=status):
+                if format == "csv":
+                    writer.writerow(_export_row(booking))
+                    if buffer.tell() > 64 * 1024:
+                        yield buffer.getvalue()
+                        buffer.seek(0)
+                        buffer.truncate()
+                else:
+                    yield json.dumps(_export_row(booking)) + "\n"
+            if format == "csv":
+                yield buffer.getvalue()
+
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(rows(), media_type=media_type, headers={
+        "Content-Disposition": f'attachment; filename="bookings.{format}"'
+    })
 
 @router.put("/{booking_id}", response_model=schemas.Booking)
 async def update_booking(booking_id: int, booking_update: schemas.BookingUpdate, db: AsyncSession = Depends(database.get_db)):
-    db_booking = await crud.update_booking(db, booking_id, booking_update)
+    try:
+        db_booking = await crud.update_booking(db, booking_id, booking_update)
+    except crud.StatusConflict as e:
+        raise HTTPException(status_code=409, detail=f"{e}; reload it and try again")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     if not db_booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     return db_booking
@@ -1,7 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
-from .. import crud, schemas, database
+from .. import crud, schemas, database, serialization
+from ..response_cache import response_cache, DOCKS
 
 router = APIRouter(
     prefix="/docks",
@@ -13,23 +14,17 @@ async def create_dock(dock: schemas.DockCreate, db: AsyncSession = Depends(datab
     return await crud.create_dock(db=db, dock=dock)
 
 @router.get("/", response_model=List[schemas.Dock])
-async def read_docks(skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_db)):
-    docks = await crud.get_docks(db, skip=skip, limit=limit)
-    results = []
-    
-    for dock in docks:
-        # Convert ORM to Pydantic-compatible dict/obj
-        dock_data = schemas.Dock.model_validate(dock)
-        
-        # Real Metrics
-        metrics = await crud.get_dock_metrics(db, dock.id)
-        dock_data.today_booking_count = metrics["today_booking_count"]
-        dock_data.utilization_percent = metrics["utilization_percent"]
-        dock_data.next_booking_info = metrics["next_booking_info"]
-        
-        results.append(dock_data)
-        
-    return results
+async def read_docks(request: Request, skip: int = 0, limit: int = 100, db: AsyncSession = Depends(database.get_read_db)):
+    """Served from the response cache (ETag / If-None-Match supported); dock and booking writes invalidate it."""
+    async def render():
+        # The rendering is cached for everyone, so it is never read from a lagging replica
+        async with database.on_primary(db) as source:
+            docks = await crud.get_docks(source, skip=skip, limit=limit)
+            # Real metrics, computed for all docks in one pass
+            metrics = await crud.get_docks_metrics(source, [dock.id for dock in docks])
+        return serialization.dumps([serialization.dock_row(dock, metrics[dock.id]) for dock in docks]), {}
+
+    return await response_cache.respond(request, DOCKS, render)
 
 @router.put("/{dock_id}", response_model=schemas.Dock)
 async def update_dock(dock_id: int, dock: schemas.DockCreate, db: AsyncSession = Depends(database.get_db)):
@@ -38,12 +33,8 @@ async def update_dock(dock_id: int, dock: schemas.DockCreate, db: AsyncSession =
         raise HTTPException(status_code=404, detail="Dock not found")
     
     # We need to return the dock with metrics (even if 0) to match schema
-    dock_data = schemas.Dock.model_validate(db_dock)
     metrics = await crud.get_dock_metrics(db, dock_id)
-    dock_data.today_booking_count = metrics["today_booking_count"]
-    dock_data.utilization_percent = metrics["utilization_percent"]
-    dock_data.next_booking_info = metrics["next_booking_info"]
-    return dock_data
+    return serialization.dock_row(db_dock, metrics)
 
 @router.delete("/{dock_id}", response_model=schemas.Dock)
 async def delete_dock(dock_id: int, db: AsyncSession = Depends(database.get_db)):
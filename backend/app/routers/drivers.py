@@ -1,8 +1,7 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func, desc
-from typing import List
-from .. import database, models, schemas
+from typing import List, Optional
+from .. import crud, database, schemas
 
 router = APIRouter(
     prefix="/drivers",
@@ -10,25 +9,17 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[schemas.DriverSummary])
-async def get_drivers(db: AsyncSession = Depends(database.get_db)):
+async def get_drivers(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=1000),
+    q: Optional[str] = None,
+    db: AsyncSession = Depends(database.get_read_db),
+):
     """
-    Aggregate bookings by driver_phone to create a registry of drivers.
+    Registry of drivers, most recent visit first, read from the driver_stats table
+    that booking writes keep up to date. `q` matches phone or carrier name.
     """
-    stmt = (
-        select(
-            models.Booking.driver_phone,
-            func.max(models.Booking.carrier_name).label("carrier_name"),
-            func.count(models.Booking.id).label("total_visits"),
-            func.max(models.Booking.start_time).label("last_visit")
-        )
-        .where(models.Booking.driver_phone.isnot(None))
-        .where(models.Booking.driver_phone != "")
-        .group_by(models.Booking.driver_phone)
-        .order_by(desc("last_visit"))
-    )
-
-    result = await db.execute(stmt)
-    rows = result.all()
+    rows = await crud.get_driver_stats(db, skip=skip, limit=limit, search=q)
 
     drivers = []
     for row in rows:
@@ -0,0 +1,43 @@
+import time
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import database
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+@router.get("/db")
+async def db_health(db: AsyncSession = Depends(database.get_db)):
+    """
+    Database round-trip check plus live connection pool statistics
+    (checked-out connections, overflow and checkout wait times), for the primary and
+    each read replica. The status code reflects the primary only.
+    """
+    state, latency_ms = await _ping(db)
+    replicas = []
+    for replica_engine, session_factory in zip(database.replica_engines, database.ReplicaSessions):
+        async with session_factory() as replica_db:
+            replica_state, replica_latency_ms = await _ping(replica_db)
+        replicas.append({"status": replica_state, "latency_ms": replica_latency_ms, "pool": database.pool_status(replica_engine)})
+
+    return JSONResponse(status_code=200 if state == "ok" else 503, content={
+        "status": state,
+        "dialect": database.engine.dialect.name,
+        "latency_ms": latency_ms,
+        "pool": database.pool_status(),
+        "replicas": replicas,
+    })
+
+async def _ping(db: AsyncSession):
+    started = time.perf_counter()
+    try:
+        await db.execute(text("SELECT 1"))
+        state = "ok"
+    except Exception as e:
+        print(f"Database health check failed: {e}")
+        state = "unavailable"
+    return state, round((time.perf_counter() - started) * 1000, 3)
@@ -0,0 +1,10 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from .. import metrics
+
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Prometheus text format. Numbers are per worker process."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
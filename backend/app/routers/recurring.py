@@ -0,0 +1,70 @@
+from datetime import date, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from .. import crud, schemas, database
+
+router = APIRouter(
+    prefix="/recurring-bookings",
+    tags=["recurring-bookings"],
+)
+
+@router.post("/", response_model=schemas.RecurringBooking)
+async def create_recurring_booking(request: schemas.RecurringBookingCreate, db: AsyncSession = Depends(database.get_db)):
+    """Occurrences are expanded on read; they appear in /bookings/ with negative ids."""
+    try:
+        return await crud.create_recurring_booking(db, request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/", response_model=List[schemas.RecurringBooking])
+async def read_recurring_bookings(skip: int = 0, limit: int = 100, active_only: bool = True, db: AsyncSession = Depends(database.get_read_db)):
+    return await crud.get_recurring_bookings(db, skip=skip, limit=limit, active_only=active_only)
+
+@router.get("/{series_id}", response_model=schemas.RecurringBooking)
+async def read_recurring_booking(series_id: int, db: AsyncSession = Depends(database.get_read_db)):
+    series = await crud.get_recurring_booking(db, series_id)
+    if series is None:
+        raise HTTPException(status_code=404, detail="Recurring booking not found")
+    return series
+
+@router.delete("/{series_id}", response_model=schemas.RecurringBooking)
+async def end_recurring_booking(series_id: int, db: AsyncSession = Depends(database.get_db)):
+    """Ends the series as of today; past occurrences and materialized bookings are kept."""
+    series = await crud.end_recurring_booking(db, series_id)
+    if series is None:
+        raise HTTPException(status_code=404, detail="Recurring booking not found")
+    return series
+
+@router.get("/{series_id}/occurrences", response_model=List[schemas.Booking])
+async def read_occurrences(series_id: int, start: Optional[date] = None, end: Optional[date] = None,
+                           db: AsyncSession = Depends(database.get_read_db)):
+    """Occurrences starting between `start` and `end` (default: the next 30 days)."""
+    start = start or date.today()
+    end = end or start + timedelta(days=30)
+    if end < start or (end - start).days > 366:
+        raise HTTPException(status_code=400, detail="end must be after start and at most a year later")
+    if await crud.get_recurring_booking(db, series_id) is None:
+        raise HTTPException(status_code=404, detail="Recurring booking not found")
+    return await crud.get_occurrences(db, series_id, start, end)
+
+@router.put("/{series_id}/exceptions/{occurrence_date}", response_model=schemas.RecurringException)
+async def set_exception(series_id: int, occurrence_date: date, update: schemas.RecurringExceptionUpdate,
+                        db: AsyncSession = Depends(database.get_db)):
+    """Skip one occurrence, or move it to another time and/or dock."""
+    try:
+        exception = await crud.set_recurring_exception(db, series_id, occurrence_date, update)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if exception is None:
+        raise HTTPException(status_code=404, detail="Recurring booking not found")
+    return exception
+
+@router.delete("/{series_id}/exceptions/{occurrence_date}", status_code=204)
+async def delete_exception(series_id: int, occurrence_date: date, db: AsyncSession = Depends(database.get_db)):
+    try:
+        deleted = await crud.delete_recurring_exception(db, series_id, occurrence_date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not deleted:
+        raise HTTPException(status_code=404, detail="No exception for that date")
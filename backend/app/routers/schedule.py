@@ -0,0 +1,50 @@
+import asyncio
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from ..events import schedule_hub
+
+router = APIRouter(
+    tags=["schedule"],
+)
+
+async def _wait_for_disconnect(websocket: WebSocket):
+    # Clients don't send anything; this just notices when they go away
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+@router.websocket("/ws/schedule")
+async def schedule_updates(websocket: WebSocket, date: date, since: Optional[int] = None, epoch: Optional[str] = None):
+    """
+    Streams booking deltas for one day as JSON messages:
+      {"type": "hello", "epoch", "seq"} on connect,
+      {"type": "booking.created" | "booking.updated" | "booking.status_changed", "seq", "dates", "booking"},
+      {"type": "reset"} when the client must reload the day.
+    Reconnect with ?since=<last seq>&epoch=<epoch> to resume where you left off.
+    """
+    await websocket.accept()
+    day = date.isoformat()
+    queue, missed, reset = schedule_hub.subscribe(day, since, epoch)
+    disconnected = asyncio.create_task(_wait_for_disconnect(websocket))
+    try:
+        await websocket.send_json({"type": "hello", "epoch": schedule_hub.epoch, "seq": schedule_hub.last_seq})
+        if reset:
+            await websocket.send_json({"type": "reset", "seq": schedule_hub.last_seq})
+        for delta in missed:
+            await websocket.send_json(delta)
+
+        while True:
+            next_delta = asyncio.create_task(queue.get())
+            done, _ = await asyncio.wait({next_delta, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+            if disconnected in done:
+                next_delta.cancel()
+                break
+            await websocket.send_json(next_delta.result())
+    except WebSocketDisconnect:
+        pass
+    finally:
+        disconnected.cancel()
+        schedule_hub.unsubscribe(day, queue)
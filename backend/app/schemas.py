@@ -1,6 +1,6 @@
-from pydantic import BaseModel, ConfigDict, Field, validator
-from typing import List, Optional
-from datetime import datetime, timedelta
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Dict, List, Literal, Optional
+from datetime import datetime, date, time
 from .models import BookingStatus
 
 class DockBase(BaseModel):
@@ -27,26 +27,33 @@ class BookingBase(BaseModel):
     odoo_order_id: Optional[int] = None
     driver_phone: Optional[str] = None
 
-
-    
-    @validator('end_time')
-    def validate_duration(cls, v, values):
-        if 'start_time' in values:
-            duration = v - values['start_time']
-            if duration != timedelta(minutes=60):
-                 # For MVP strict 60 mins, or maybe just warn? 
-                 # User Request said: "Enforce slot duration (default 60 mins)"
-                 # Let's enforce strictly for now or allow multiple of 60? 
-                 # "default 60 mins" usually implies it can be changed. 
-                 # But "Constraint: Enforce slot duration" suggests strictness.
-                 # I'll stick to strict 60 mins or maybe just ensure end > start.
-                 # Let's enforce strict 60m for simplicity as per "Enforce slot duration".
-                 pass
-        return v
-
 class BookingCreate(BookingBase):
     pass
 
+class AutoBookingRequest(BaseModel):
+    capability: Optional[str] = None
+    window_start: datetime
+    window_end: datetime
+    duration_minutes: int = Field(60, ge=1, le=24 * 60)
+    step_minutes: int = Field(15, ge=1, le=24 * 60) # Start times are multiples of this from midnight
+    strategy: Literal["best_fit", "least_utilized", "min_fragmentation"] = "best_fit"
+    carrier_name: str
+    po_number: str
+    odoo_order_id: Optional[int] = None
+    driver_phone: Optional[str] = None
+
+class BulkBookingRow(BaseModel):
+    row: int # Position in the request (0-based, header excluded for CSV)
+    status: Literal["created", "rejected", "invalid"]
+    booking: Optional["Booking"] = None
+    error: Optional[str] = None
+
+class BulkBookingResult(BaseModel):
+    created: int
+    rejected: int
+    invalid: int
+    results: List[BulkBookingRow]
+
 class BookingUpdate(BaseModel):
     status: Optional[BookingStatus] = None
     dock_id: Optional[int] = None
@@ -58,6 +65,91 @@ class Booking(BookingBase):
     status: BookingStatus
     model_config = ConfigDict(from_attributes=True)
 
+BulkBookingRow.model_rebuild()
+
+class RecurringBookingBase(BaseModel):
+    dock_id: int
+    rule: str # RRULE subset, e.g. FREQ=WEEKLY;BYDAY=MO,TH (see recurrence.parse_rule)
+    starts_on: date
+    ends_on: Optional[date] = None
+    start_time: time
+    duration_minutes: int = Field(60, ge=1, le=24 * 60)
+    carrier_name: str
+    po_number: str
+    odoo_order_id: Optional[int] = None
+    driver_phone: Optional[str] = None
+
+class RecurringBookingCreate(RecurringBookingBase):
+    skip_dates: List[date] = [] # Occurrences to leave out from the start (e.g. holidays)
+
+class RecurringException(BaseModel):
+    occurrence_date: date
+    kind: Literal["skip", "move"]
+    new_dock_id: Optional[int] = None
+    new_start: Optional[datetime] = None
+    new_end: Optional[datetime] = None
+    booking_id: Optional[int] = None # Set when the occurrence became a real booking
+    model_config = ConfigDict(from_attributes=True)
+
+class RecurringExceptionUpdate(BaseModel):
+    """Skip the occurrence, or move it (new_start/new_end, optionally another dock)."""
+    skip: bool = False
+    new_dock_id: Optional[int] = None
+    new_start: Optional[datetime] = None
+    new_end: Optional[datetime] = None
+
+class RecurringBooking(RecurringBookingBase):
+    id: int
+    is_active: bool
+    exceptions: List[RecurringException] = []
+    model_config = ConfigDict(from_attributes=True)
+
+class POValidation(BaseModel):
+    valid: bool
+    id: Optional[int] = None
+    partner: Optional[str] = None
+
+class POBatchValidationRequest(BaseModel):
+    po_numbers: List[str] = Field(..., min_length=1, max_length=1000)
+
+class POBatchValidation(BaseModel):
+    results: Dict[str, POValidation]
+
+class AvailabilitySlot(BaseModel):
+    start: time
+    end: time
+    free_docks: int
+    dock_id: int # First free capable dock, suggested for the booking
+
+class Availability(BaseModel):
+    date: date
+    capability: Optional[str] = None
+    slot_minutes: int
+    capable_docks: int
+    slots: List[AvailabilitySlot] = []
+
+class UtilizationRow(BaseModel):
+    bucket_start: datetime
+    dock_id: Optional[int] = None # group_by=dock
+    capability: Optional[str] = None # group_by=capability
+    booked_minutes: int
+    idle_minutes: int
+    utilization_percent: float
+    bookings: int
+    cancelled: int
+    completed: int
+    late: int
+    no_show: int
+    avg_turnaround_minutes: Optional[float] = None # Arrived -> Completed
+
+class UtilizationReport(BaseModel):
+    start: date
+    end: date
+    granularity: Literal["hour", "day"]
+    group_by: Literal["dock", "capability", "total"]
+    rows: List[UtilizationRow] = []
+    totals: List[UtilizationRow] = [] # One per group, over the whole range
+
 class DriverSummary(BaseModel):
     driver_phone: str
     carrier_name: str
@@ -1,9 +1,14 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 import os
 from dotenv import load_dotenv
+from . import metrics
+from .cache import TTLCache
 
 load_dotenv()
 
@@ -12,7 +17,29 @@ SECRET_KEY = os.getenv("SECRET_KEY", "09d25e094faa6ca2556c818166b7a9563b93f7099f
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 300 # Longer expiry for simple usage
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Decoded tokens and driver rows are cached briefly so authenticated requests skip
+# the signature check and the drivers lookup. 0 disables the cache.
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# Embed the driver's id/name/created_at in new tokens and trust them instead of
+# reading the drivers table. Changes to a driver only show up in tokens issued afterwards.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").strip().lower() in ("1", "true", "yes", "on")
+
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+driver_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL_SECONDS)
+
+# Bcrypt cost factor. Changing it is safe: existing hashes keep working and are
+# re-hashed with the new cost on the driver's next successful login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Max hashes/verifications running at once; further calls queue for a free worker
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=BCRYPT_ROUNDS)
+
+# bcrypt releases the GIL, so a small thread pool hashes in parallel without blocking the event loop
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+metrics.Gauge("simpledock_password_hash_queue_depth", "Hash/verify jobs waiting for a password worker.",
+              collect=lambda: _password_executor._work_queue.qsize())
 
 def verify_password(plain_password, hashed_password):
     return pwd_context.verify(plain_password, hashed_password)
@@ -20,6 +47,18 @@ def verify_password(plain_password, hashed_password):
 def get_password_hash(password):
     return pwd_context.hash(password)
 
+async def hash_password_async(password: str) -> str:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, pwd_context.hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Returns (valid, new_hash). new_hash is set when the stored hash uses outdated
+    parameters (e.g. BCRYPT_ROUNDS changed) and should replace it.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_password_executor, pwd_context.verify_and_update, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -29,3 +68,20 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode.update({"exp": expire})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
+
+def decode_access_token(token: str) -> dict:
+    """jwt.decode with a short-lived cache. Raises JWTError for invalid or expired tokens."""
+    payload = token_cache.get(token)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if AUTH_CACHE_TTL_SECONDS > 0:
+        # Never keep a token past its own expiry
+        ttl = min(AUTH_CACHE_TTL_SECONDS, payload.get("exp", 0) - time.time()) if "exp" in payload else AUTH_CACHE_TTL_SECONDS
+        if ttl > 0:
+            token_cache.set(token, payload, ttl=ttl)
+    return payload
+
+def forget_driver(phone: str):
+    """Drop a driver's cached row after it changes."""
+    driver_cache.pop(phone)
@@ -0,0 +1,87 @@
+"""
+Lean JSON for the big read endpoints: ORM rows go straight to dicts and then to bytes,
+without building (and re-validating) a Pydantic model per row. The output is the same
+JSON the schemas.Booking / schemas.Dock response models produce.
+"""
+import json
+from datetime import date, datetime, timedelta
+from typing import Iterable, List
+
+from . import models
+
+try:
+    import orjson
+except ImportError: # Optional: the stdlib fallback gives the same output, only slower
+    orjson = None
+
+# Positions in the columnar day schedule's "status" array
+STATUS_CODES = list(models.BookingStatus)
+_STATUS_CODE = {status: code for code, status in enumerate(STATUS_CODES)}
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(value) -> bytes:
+    """Compact JSON bytes, like TypeAdapter.dump_json (naive datetimes as ISO 8601)."""
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def booking_row(booking) -> dict:
+    """schemas.Booking as a dict, from a models.Booking (or BookingArchive / occurrence) row."""
+    return {
+        "dock_id": booking.dock_id,
+        "start_time": booking.start_time,
+        "end_time": booking.end_time,
+        "carrier_name": booking.carrier_name,
+        "po_number": booking.po_number,
+        "odoo_order_id": booking.odoo_order_id,
+        "driver_phone": booking.driver_phone,
+        "id": booking.id,
+        "status": booking.status.value if booking.status else None,
+    }
+
+
+def booking_rows(bookings: Iterable) -> List[dict]:
+    return [booking_row(booking) for booking in bookings]
+
+
+def dock_row(dock: models.Dock, metrics: dict) -> dict:
+    """schemas.Dock as a dict: the dock plus its crud.get_docks_metrics entry."""
+    return {
+        "name": dock.name,
+        "capabilities": dock.capabilities,
+        "is_active": dock.is_active,
+        "id": dock.id,
+        "today_booking_count": metrics["today_booking_count"],
+        "utilization_percent": metrics["utilization_percent"],
+        "next_booking_info": metrics["next_booking_info"],
+    }
+
+
+def day_schedule(day: date, bookings: Iterable) -> dict:
+    """
+    Compact columnar form of a day's bookings for the schedule grid and the booking
+    wizard: parallel arrays, times as minutes from the day's midnight (a booking running
+    past midnight ends after 1440, one from the day before starts below 0) and statuses
+    as indexes into "status_codes".
+    """
+    midnight = datetime.combine(day, datetime.min.time())
+    minute = timedelta(minutes=1)
+    schedule = {
+        "date": day.isoformat(),
+        "status_codes": [status.value for status in STATUS_CODES],
+        "id": [], "dock_id": [], "start": [], "end": [], "status": [],
+    }
+    for booking in bookings:
+        schedule["id"].append(booking.id)
+        schedule["dock_id"].append(booking.dock_id)
+        schedule["start"].append((booking.start_time - midnight) // minute)
+        schedule["end"].append(-((midnight - booking.end_time) // minute)) # Rounded up
+        schedule["status"].append(_STATUS_CODE.get(booking.status))
+    return schedule
@@ -0,0 +1,149 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from sqlalchemy import and_, insert, or_, update
+from sqlalchemy.exc import IntegrityError
+
+from . import crud, metrics, models
+from .database import AsyncSessionLocal
+
+SWEEPER_ENABLED = os.getenv("SWEEPER_ENABLED", "true").strip().lower() in ("1", "true", "yes", "on")
+SWEEP_INTERVAL_SECONDS = float(os.getenv("SWEEP_INTERVAL_SECONDS", "60"))
+# Confirmed bookings become Late this long after their start time ...
+SWEEP_LATE_GRACE_MINUTES = float(os.getenv("SWEEP_LATE_GRACE_MINUTES", "15"))
+# ... and No Show (from Confirmed or Late) this long after their end time
+SWEEP_NO_SHOW_GRACE_MINUTES = float(os.getenv("SWEEP_NO_SHOW_GRACE_MINUTES", "60"))
+SWEEP_BATCH_SIZE = int(os.getenv("SWEEP_BATCH_SIZE", "1000")) # Rows per UPDATE / transaction
+# Only the worker holding the lease sweeps; if it dies another one takes over after this long
+SWEEP_LEASE_SECONDS = float(os.getenv("SWEEP_LEASE_SECONDS", "300"))
+
+transitions_total = metrics.Counter("simpledock_status_transitions_total", "Bookings moved by the status sweeper.", ("status",))
+sweep_seconds = metrics.Histogram("simpledock_status_sweep_seconds", "Duration of status sweeps that held the lease.")
+
+
+class Lease:
+    """
+    A row in job_leases naming the worker that runs a job until expires_at. Taking or
+    renewing it is one conditional UPDATE, so it works the same on SQLite and Postgres.
+    """
+
+    def __init__(self, name: str, seconds: float = SWEEP_LEASE_SECONDS):
+        self.name = name
+        self.seconds = seconds
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self, db) -> bool:
+        """Takes the lease if it is free or expired (or renews ours). Commits."""
+        now = datetime.now()
+        lease = models.JobLease
+        values = {"holder": self.holder, "expires_at": now + timedelta(seconds=self.seconds)}
+        result = await db.execute(
+            update(lease)
+            .where(lease.name == self.name, or_(lease.holder == self.holder, lease.expires_at <= now))
+            .values(**values)
+        )
+        try:
+            if result.rowcount == 0:
+                # No row yet, or another worker holds it: only the first insert wins
+                await db.execute(insert(lease).values(name=self.name, **values))
+            await db.commit()
+        except IntegrityError:
+            await db.rollback()
+            return False
+        return True
+
+    async def release(self, db):
+        lease = models.JobLease
+        await db.execute(
+            update(lease).where(lease.name == self.name, lease.holder == self.holder).values(holder=None, expires_at=datetime.now())
+        )
+        await db.commit()
+
+
+class StatusSweeper:
+    """
+    Marks overdue bookings in bulk every SWEEP_INTERVAL_SECONDS: No Show once a
+    Confirmed or Late booking ended SWEEP_NO_SHOW_GRACE_MINUTES ago, then Late once a
+    Confirmed one started SWEEP_LATE_GRACE_MINUTES ago (No Show first, so a booking
+    found long overdue skips Late). Every worker runs one; the lease picks the one
+    that sweeps. Each transition goes through crud.mark_overdue, so it is logged,
+    notified and pushed to /ws/schedule like a manual status change.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal, interval: float = SWEEP_INTERVAL_SECONDS,
+                 batch_size: int = SWEEP_BATCH_SIZE):
+        self.session_factory = session_factory
+        self.interval = interval
+        self.batch_size = batch_size
+        self.lease = Lease("status_sweeper")
+        self._task = None
+
+    async def start(self):
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            try:
+                async with self.session_factory() as db:
+                    await self.lease.release(db)
+            except Exception as e:
+                print(f"Status sweeper lease release failed: {e}")
+
+    async def run(self):
+        while True:
+            try:
+                async with self.session_factory() as db:
+                    held = await self.lease.acquire(db)
+                if held:
+                    await self.sweep()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Status sweeper error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def steps(self, now: datetime):
+        """(from, to, overdue condition), in the order a sweep applies them."""
+        booking = models.Booking
+        no_show_before = now - timedelta(minutes=SWEEP_NO_SHOW_GRACE_MINUTES)
+        late_before = now - timedelta(minutes=SWEEP_LATE_GRACE_MINUTES)
+        # The start_time bound (implied by the end_time one) is what ix_bookings_awaiting_start ranges on
+        ended = and_(booking.start_time < no_show_before, booking.end_time < no_show_before)
+        return [
+            (models.BookingStatus.CONFIRMED, models.BookingStatus.NO_SHOW, ended),
+            (models.BookingStatus.LATE, models.BookingStatus.NO_SHOW, ended),
+            (models.BookingStatus.CONFIRMED, models.BookingStatus.LATE, booking.start_time < late_before),
+        ]
+
+    async def sweep(self, now: Optional[datetime] = None) -> Dict[models.BookingStatus, int]:
+        """One pass, batch by batch until nothing is overdue. Returns {status: bookings moved to it}."""
+        started = time.perf_counter()
+        moved = {}
+        for source, target, overdue in self.steps(now or datetime.now()):
+            while True:
+                async with self.session_factory() as db:
+                    count = len(await crud.mark_overdue(db, source, target, overdue, self.batch_size))
+                if count:
+                    moved[target] = moved.get(target, 0) + count
+                    transitions_total.inc(count, status=target.value)
+                if count < self.batch_size:
+                    break
+        sweep_seconds.observe(time.perf_counter() - started)
+        if moved:
+            print("Status sweep: " + ", ".join(f"{count} -> {status.value}" for status, count in moved.items()))
+        return moved
+
+
+# Singleton instance
+status_sweeper = StatusSweeper()
@@ -0,0 +1,142 @@
+"""
+Dock allocation for POST /bookings/auto: latency and packing quality.
+
+    python -m benchmarks.allocation
+
+1. allocation.rank() latency per strategy on a half-booked day with 100-1000 docks.
+2. Packing quality: the same random stream of requests (30-180 minute visits,
+   windows of 1-4 hours inside 06:00-22:00) is allocated into an empty day with
+   each strategy; reports how many requests fit, utilization of the day and how
+   many unusable free slivers (< 30 minutes) are left behind.
+3. End-to-end POST /bookings/auto crud latency on SQLite (and Postgres with BENCH_POSTGRES_URL).
+"""
+import asyncio
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from app import allocation, crud, models, schemas
+from app.occupancy import DayOccupancy, occupancy_index
+from benchmarks.common import database_urls, fresh_database, seed_docks, seed_bookings, measure
+
+OPEN, CLOSE = 6 * 60, 22 * 60
+
+
+def random_day(dock_count: int, fill: float, rng: random.Random) -> DayOccupancy:
+    day = DayOccupancy(date.today())
+    day.loading = False
+    booking_id = 0
+    start_of_day = datetime.combine(day.day, datetime.min.time())
+    for dock_id in range(1, dock_count + 1):
+        minute = OPEN
+        while minute < CLOSE:
+            length = rng.choice((30, 60, 90, 120))
+            if rng.random() < fill:
+                booking_id += 1
+                start = start_of_day + timedelta(minutes=minute)
+                day.place(booking_id, (dock_id, start, start + timedelta(minutes=length), models.BookingStatus.CONFIRMED))
+            minute += length
+    return day
+
+
+def requests(count: int, rng: random.Random):
+    for _ in range(count):
+        duration = rng.choice((30, 45, 60, 90, 120, 180))
+        window = rng.choice((60, 120, 240))
+        start = rng.randrange(OPEN, CLOSE - max(window, duration), 15)
+        yield start, start + max(window, duration), duration
+
+
+def latency():
+    print("\n== allocation.rank latency (half-booked day, 60 minute visit in a 4 hour window)")
+    print("cold: no cached per-dock results; warm: one dock changed since the previous query")
+    print(f"{'docks':>6} " + " ".join(f"{name + ' ' + label + ' us':>25}" for name in allocation.STRATEGIES for label in ("cold", "warm")))
+    rng = random.Random(7)
+    for dock_count in (100, 300, 1000):
+        day = random_day(dock_count, 0.5, rng)
+        dock_ids = list(range(1, dock_count + 1))
+        row = []
+        for strategy in allocation.STRATEGIES:
+            for label in ("cold", "warm"):
+                samples = []
+                for _ in range(200):
+                    if label == "cold":
+                        day._placements.clear()
+                    started = time.perf_counter()
+                    allocation.rank(day, dock_ids, 10 * 60, 14 * 60, 60, step=15, strategy=strategy, limit=1)
+                    samples.append((time.perf_counter() - started) * 1e6)
+                    if label == "warm":
+                        # A booking landed on one dock since the last query
+                        day._forget_placements(rng.choice(dock_ids))
+                samples.sort()
+                row.append(f"p50 {samples[100]:>5.0f} p95 {samples[190]:>5.0f}")
+        print(f"{dock_count:>6} " + " ".join(f"{cell:>25}" for cell in row))
+
+
+def packing():
+    print("\n== packing quality (50 docks, 1500 requests into an empty day)")
+    print(f"{'strategy':>18} {'placed':>7} {'utilization':>12} {'slivers <30m':>13}")
+    dock_ids = list(range(1, 51))
+    stream = list(requests(1500, random.Random(11)))
+    for strategy in allocation.STRATEGIES:
+        day = DayOccupancy(date.today())
+        day.loading = False
+        start_of_day = datetime.combine(day.day, datetime.min.time())
+        placed = 0
+        for booking_id, (start_min, end_min, duration) in enumerate(stream):
+            best = allocation.rank(day, dock_ids, start_min, end_min, duration, step=15, strategy=strategy, limit=1)
+            if best:
+                dock_id, start = best[0]
+                begin = start_of_day + timedelta(minutes=start)
+                day.place(booking_id, (dock_id, begin, begin + timedelta(minutes=duration), models.BookingStatus.CONFIRMED))
+                placed += 1
+        booked = sum(day.booked_minutes(dock_id) for dock_id in dock_ids)
+        slivers = sum(
+            1 for dock_id in dock_ids for run_start, run_end in day.free_runs(dock_id, OPEN, CLOSE)
+            if run_end - run_start < 30
+        )
+        utilization = booked / (len(dock_ids) * (CLOSE - OPEN)) * 100
+        print(f"{strategy:>18} {placed:>7} {utilization:>11.1f}% {slivers:>13}")
+
+
+async def end_to_end(name: str, url: str):
+    engine, session_factory = await fresh_database(url)
+    day = date.today() + timedelta(days=1)
+    start_of_day = datetime.combine(day, datetime.min.time())
+    async with session_factory() as db:
+        await seed_docks(db, 200)
+        dock_ids = (await db.execute(select(models.Dock.id))).scalars().all()
+        await seed_bookings(db, dock_ids, days_back=0, days_ahead=1, per_dock_per_day=6)
+        occupancy_index.clear()
+
+        counter = iter(range(10**6))
+
+        async def book():
+            index = next(counter)
+            request = schemas.AutoBookingRequest(
+                capability="General",
+                window_start=start_of_day + timedelta(hours=6),
+                window_end=start_of_day + timedelta(hours=22),
+                duration_minutes=30,
+                carrier_name="Bench",
+                po_number=f"AUTO-{index}",
+            )
+            assert await crud.auto_assign_booking(db, request) is not None
+
+        stats = await measure(book, repeat=200, warmup=5)
+    await engine.dispose()
+    print(f"\n== {name}: POST /bookings/auto (crud, 200 docks) mean {stats['mean_ms']:.2f} ms, "
+          f"p50 {stats['p50_ms']:.2f} ms, p95 {stats['p95_ms']:.2f} ms")
+
+
+async def main():
+    latency()
+    packing()
+    for name, url in database_urls().items():
+        await end_to_end(name, url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,110 @@
+"""
+Hot-path latency vs. history size, with old finished bookings left in `bookings` and
+after they were moved to bookings_archive.
+
+    python -m benchmarks.archive [history_rows ...]   # default 0 200000 1000000
+
+History is Completed/Cancelled bookings from a year ago and older, on the same docks and
+drivers as the current two weeks. Once archived, the hot paths should cost the same
+whatever the history size; only listings reaching back that far read the archive.
+"""
+import asyncio
+import random
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app import archive, crud, models, schemas
+from app.occupancy import occupancy_index
+from benchmarks.common import CARRIERS, database_urls, fresh_database, seed_docks, seed_bookings, measure
+
+DOCKS = 30
+HISTORY_ROWS = [0, 200_000, 1_000_000]
+
+
+async def seed_history(db, dock_ids, rows: int, seed: int = 7):
+    """`rows` finished bookings ending more than a year ago, hourly from 06:00."""
+    rng = random.Random(seed)
+    first_day = date.today() - timedelta(days=365)
+    batch = []
+    for index in range(rows):
+        day, slot = divmod(index, len(dock_ids) * 12)
+        start = datetime.combine(first_day - timedelta(days=day), datetime.min.time()) + timedelta(hours=6 + slot // len(dock_ids))
+        batch.append({
+            "dock_id": dock_ids[slot % len(dock_ids)],
+            "start_time": start,
+            "end_time": start + timedelta(hours=1),
+            "carrier_name": rng.choice(CARRIERS),
+            "po_number": f"PO-H{index:07d}",
+            "status": models.BookingStatus.CANCELLED if rng.random() < 0.1 else models.BookingStatus.COMPLETED,
+            "driver_phone": f"+9715{rng.randrange(5000):07d}",
+        })
+        if len(batch) >= 10_000:
+            await db.execute(insert(models.Booking), batch)
+            batch = []
+    if batch:
+        await db.execute(insert(models.Booking), batch)
+    await db.commit()
+
+
+def hot_paths(db, dock_ids):
+    today = date.today()
+    slots = iter(range(10_000))
+
+    async def create():
+        # A fresh slot each time, far enough ahead to be free
+        slot = next(slots)
+        start = datetime.combine(today + timedelta(days=30 + slot // 24), datetime.min.time()) + timedelta(hours=slot % 24)
+        await crud.create_booking(db, schemas.BookingCreate(
+            dock_id=dock_ids[slot % len(dock_ids)], start_time=start, end_time=start + timedelta(minutes=30),
+            carrier_name="UPS", po_number="PO-BENCH", driver_phone="+971500000000",
+        ))
+
+    async def day_scan():
+        occupancy_index.clear()
+        await occupancy_index.get_day(db, today)
+
+    return {
+        "create booking": create,
+        "day listing": lambda: crud.get_bookings(db, date_filter=today, limit=500),
+        "next 7 days": lambda: crud.get_bookings(db, start_from=datetime.combine(today, datetime.min.time()), limit=100),
+        "occupancy day": day_scan,
+        "dock metrics": lambda: crud.get_docks_metrics(db, dock_ids),
+    }
+
+
+async def run(name: str, url: str, history_sizes):
+    print(f"\n== {name}: p50 ms per hot path")
+    results = {}
+    for rows in history_sizes:
+        engine, session_factory = await fresh_database(url)
+        async with session_factory() as db:
+            await seed_docks(db, DOCKS)
+            dock_ids = (await db.execute(select(models.Dock.id))).scalars().all()
+            await seed_bookings(db, dock_ids, days_back=7, days_ahead=7)
+            await seed_history(db, dock_ids, rows)
+
+            for label, fn in hot_paths(db, dock_ids).items():
+                results.setdefault(label, {})[(rows, "in bookings")] = (await measure(fn, repeat=30))["p50_ms"]
+            moved = await archive.archive(session_factory, after_days=90, batch_size=5000, pause=0)
+            assert moved == rows, (moved, rows)
+            for label, fn in hot_paths(db, dock_ids).items():
+                results[label][(rows, "archived")] = (await measure(fn, repeat=30))["p50_ms"]
+        await engine.dispose()
+
+    columns = [(rows, where) for rows in history_sizes for where in ("in bookings", "archived")]
+    print(f"{'history rows':>16}" + "".join(f"{rows:>14,}" for rows, _ in columns))
+    print(f"{'':>16}" + "".join(f"{where:>14}" for _, where in columns))
+    for label, timings in results.items():
+        print(f"{label:>16}" + "".join(f"{timings[column]:>14.2f}" for column in columns))
+
+
+async def main():
+    history_sizes = [int(arg) for arg in sys.argv[1:]] or HISTORY_ROWS
+    for name, url in database_urls().items():
+        await run(name, url, history_sizes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+"""
+Authenticated request throughput for GET /auth/driver/me.
+
+    python -m benchmarks.auth_cache [requests] [concurrency]
+
+Compares three modes through the ASGI app on a throwaway SQLite database:
+  uncached   - every request decodes the JWT and selects the driver (AUTH_CACHE_TTL_SECONDS=0)
+  cached     - decoded tokens and driver rows come from the in-process TTL cache
+  stateless  - AUTH_STATELESS tokens carry the driver fields, no lookup at all
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import httpx
+
+
+async def login(client: httpx.AsyncClient) -> dict:
+    response = await client.post("/auth/driver/login", data={"username": "+971500000000", "password": "benchmark"})
+    assert response.status_code == 200, response.text
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+async def hammer(client: httpx.AsyncClient, headers: dict, total: int, concurrency: int):
+    async def worker(count):
+        for _ in range(count):
+            response = await client.get("/auth/driver/me", headers=headers)
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(total // concurrency) for _ in range(concurrency)])
+    return time.perf_counter() - started
+
+
+async def run(total: int, concurrency: int):
+    from app.main import app
+    from app import security
+    from benchmarks.common import fresh_database
+
+    engine, _ = await fresh_database(os.environ["DATABASE_URL"])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        response = await client.post("/auth/driver/signup", json={"phone": "+971500000000", "name": "Bench", "password": "benchmark"})
+        assert response.status_code == 200, response.text
+
+        modes = [
+            ("uncached", {"AUTH_CACHE_TTL_SECONDS": 0, "AUTH_STATELESS": False}),
+            ("cached", {"AUTH_STATELESS": False}),
+            ("stateless", {"AUTH_STATELESS": True}),
+        ]
+        baseline = None
+        for name, settings in modes:
+            security.token_cache.clear()
+            security.driver_cache.clear()
+            with mock.patch.multiple(security, **settings):
+                headers = await login(client)
+                await hammer(client, headers, concurrency, concurrency) # warm up
+                elapsed = await hammer(client, headers, total, concurrency)
+            rate = total / elapsed
+            baseline = baseline or rate
+            print(f"{name:10} {total} requests in {elapsed:.2f}s: {rate:.0f} req/s ({rate / baseline:.2f}x)")
+
+    await engine.dispose()
+
+
+def main():
+    total = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'simpledock_auth_bench.db')}")
+    # Login cost is not what is measured here
+    os.environ.setdefault("BCRYPT_ROUNDS", "4")
+    asyncio.run(run(total, concurrency))
+
+
+if __name__ == "__main__":
+    main()
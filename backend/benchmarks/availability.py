@@ -0,0 +1,46 @@
+"""
+GET /availability: cold (index build) and warm (in-memory) latency on busy days.
+
+    python -m benchmarks.availability
+"""
+import asyncio
+import json
+from datetime import date, timedelta
+
+from sqlalchemy import select
+
+from app import crud, models, schemas
+from app.occupancy import occupancy_index
+from benchmarks.common import database_urls, fresh_database, seed_docks, seed_bookings, measure
+
+# (docks, bookings per dock per day) -> up to ~5k bookings on the measured day
+SCENARIOS = [(20, 8), (100, 16), (200, 24)]
+
+
+async def run(name: str, url: str):
+    print(f"\n== {name}")
+    print(f"{'docks':>6} {'bookings/day':>13} {'cold ms':>9} {'warm p50 ms':>12} {'response bytes':>15}")
+    day = date.today() + timedelta(days=1)
+    for dock_count, per_day in SCENARIOS:
+        engine, session_factory = await fresh_database(url)
+        async with session_factory() as db:
+            await seed_docks(db, dock_count)
+            dock_ids = (await db.execute(select(models.Dock.id))).scalars().all()
+            await seed_bookings(db, dock_ids, days_back=0, days_ahead=1, per_dock_per_day=per_day)
+
+            occupancy_index.clear()
+            cold = await measure(lambda: crud.get_availability(db, day, capability="General", slot_minutes=30), repeat=1, warmup=0)
+            warm = await measure(lambda: crud.get_availability(db, day, capability="General", slot_minutes=30), repeat=50)
+            payload = schemas.Availability(**await crud.get_availability(db, day, capability="General", slot_minutes=30))
+        await engine.dispose()
+        size = len(json.dumps(payload.model_dump(mode="json")))
+        print(f"{dock_count:>6} {dock_count * per_day:>13} {cold['p50_ms']:>9.2f} {warm['p50_ms']:>12.2f} {size:>15}")
+
+
+async def main():
+    for name, url in database_urls().items():
+        await run(name, url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+"""
+Concurrency stress test for POST /bookings/.
+
+    python -m benchmarks.booking_race [requests]
+
+Fires N simultaneous POSTs for the same dock and slot through the ASGI app and
+checks that exactly one is accepted, then measures write throughput with N
+simultaneous POSTs for distinct slots (all of which must be accepted).
+Runs against SQLite, and Postgres when BENCH_POSTGRES_URL is set.
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+
+async def fire(client: httpx.AsyncClient, payloads):
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[client.post("/bookings/", json=payload) for payload in payloads])
+    elapsed = time.perf_counter() - started
+    return [response.status_code for response in responses], elapsed
+
+
+def payload(start: datetime, index: int):
+    return {
+        "dock_id": 1,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+        "carrier_name": f"Carrier {index}",
+        "po_number": f"PO-{index:05d}",
+    }
+
+
+async def run(name: str, url: str, count: int):
+    # The app binds its engine at import time, so each database runs in its own process
+    from app.main import app
+    from app import models
+    from benchmarks.common import fresh_database, seed_docks
+
+    engine, session_factory = await fresh_database(url)
+    async with session_factory() as db:
+        await seed_docks(db, 1)
+
+    slot = datetime.combine(date.today() + timedelta(days=1), datetime.min.time()) + timedelta(hours=9)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        codes, elapsed = await fire(client, [payload(slot, i) for i in range(count)])
+        winners = codes.count(200)
+        print(f"\n== {name}")
+        print(f"same slot:      {count} requests in {elapsed:.2f}s ({count / elapsed:.0f} req/s), "
+              f"{winners} accepted, {codes.count(400)} rejected, {count - winners - codes.count(400)} errors")
+        assert winners == 1, f"expected exactly one booking to win, got {winners}"
+
+        later = slot + timedelta(days=1)
+        codes, elapsed = await fire(client, [payload(later + timedelta(hours=i), i) for i in range(count)])
+        print(f"distinct slots: {count} requests in {elapsed:.2f}s ({count / elapsed:.0f} req/s), "
+              f"{codes.count(200)} accepted")
+        assert codes.count(200) == count
+
+    await engine.dispose()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    if "BENCH_RACE_TARGET" in os.environ:
+        name, url = os.environ["BENCH_RACE_TARGET"].split("=", 1)
+        asyncio.run(run(name, url, count))
+        return
+
+    import subprocess
+    from benchmarks.common import database_urls
+    for name, url in database_urls().items():
+        env = {**os.environ, "DATABASE_URL": url, "BENCH_RACE_TARGET": f"{name}={url}"}
+        subprocess.run([sys.executable, "-m", "benchmarks.booking_race", str(count)], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+POST /bookings/bulk throughput versus one POST /bookings/ per row.
+
+    python -m benchmarks.bulk_import [rows]
+
+Seeds 50 docks with a week of existing bookings, then imports a week of new
+appointments (a good share of which collide with existing bookings or each other)
+through the HTTP endpoint as JSON and as CSV, and compares with creating a
+sample of the rows one at a time. Runs against SQLite, and Postgres when
+BENCH_POSTGRES_URL is set (each database in its own process, like booking_race).
+"""
+import asyncio
+import csv
+import io
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+import httpx
+
+DOCKS = 50
+
+
+def appointments(count: int, rng: random.Random, prefix: str):
+    start_day = datetime.combine(date.today() + timedelta(days=1), datetime.min.time())
+    rows = []
+    for index in range(count):
+        # Half-hour grid from 06:00 to 22:00; the seeded bookings fill 08:00-12:00
+        start = start_day + timedelta(days=rng.randrange(7), minutes=6 * 60 + 30 * rng.randrange(32))
+        rows.append({
+            "dock_id": rng.randrange(1, DOCKS + 1),
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(minutes=30)).isoformat(),
+            "carrier_name": rng.choice(["Aramex", "UPS", "DHL"]),
+            "po_number": f"{prefix}-{index:06d}",
+            "driver_phone": f"+9715{rng.randrange(2000):07d}",
+        })
+    return rows
+
+
+def to_csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(rows[0]))
+    writer.writeheader()
+    writer.writerows(rows)
+    return buffer.getvalue()
+
+
+async def run(name: str, url: str, count: int):
+    from app.main import app
+    from app import models
+    from app.routers import bookings as bookings_router
+    from benchmarks.common import fresh_database, seed_docks, seed_bookings
+    from sqlalchemy import select
+
+    bookings_router.send_notification = lambda *args: None # Keep the mock WhatsApp print out of the timings
+    engine, session_factory = await fresh_database(url)
+    async with session_factory() as db:
+        await seed_docks(db, DOCKS)
+        dock_ids = (await db.execute(select(models.Dock.id))).scalars().all()
+        await seed_bookings(db, dock_ids, days_back=0, days_ahead=8, per_dock_per_day=4)
+
+    rng = random.Random(5)
+    print(f"\n== {name}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=600) as client:
+        for label, send in (
+            ("bulk json", lambda rows: client.post("/bookings/bulk", json=rows)),
+            ("bulk csv", lambda rows: client.post("/bookings/bulk", content=to_csv(rows), headers={"content-type": "text/csv"})),
+        ):
+            rows = appointments(count, rng, label.replace(" ", "-"))
+            started = time.perf_counter()
+            response = await send(rows)
+            elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.text
+            body = response.json()
+            print(f"{label:10} {count} rows in {elapsed:.2f}s: {count / elapsed:>7.0f} rows/s "
+                  f"({body['created']} created, {body['rejected']} rejected, {body['invalid']} invalid)")
+
+        sample = appointments(min(count, 500), rng, "single")
+        started = time.perf_counter()
+        created = 0
+        for row in sample:
+            response = await client.post("/bookings/", json=row)
+            created += response.status_code == 200
+        elapsed = time.perf_counter() - started
+        print(f"{'single':10} {len(sample)} rows in {elapsed:.2f}s: {len(sample) / elapsed:>7.0f} rows/s ({created} created)")
+
+    await engine.dispose()
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    if "BENCH_BULK_TARGET" in os.environ:
+        name, url = os.environ["BENCH_BULK_TARGET"].split("=", 1)
+        asyncio.run(run(name, url, count))
+        return
+
+    import subprocess
+    from benchmarks.common import database_urls
+    for name, url in database_urls().items():
+        env = {**os.environ, "DATABASE_URL": url, "BENCH_BULK_TARGET": f"{name}={url}"}
+        subprocess.run([sys.executable, "-m", "benchmarks.bulk_import", str(count)], env=env, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+GET /docks/ metrics: per-dock queries (old path) vs. the bulk grouped/windowed path.
+
+    python -m benchmarks.dock_metrics
+
+The bulk path issues three queries regardless of the dock count, so it only grows
+with the rows scanned; the per-dock path adds two round trips for every dock.
+The per-dock path is the old crud.get_dock_metrics, kept here as it was (that
+function now delegates to the bulk path). Its utilization was a mock formula, so
+only the counts and next bookings are compared.
+"""
+import asyncio
+from datetime import date, datetime
+
+from sqlalchemy import and_, func, select
+
+from app import crud, models
+from benchmarks.common import database_urls, fresh_database, seed_docks, seed_bookings, measure
+
+DOCK_COUNTS = [10, 30, 60, 120, 240]
+
+
+async def dock_metrics(db, dock_id):
+    start_of_day = datetime.combine(date.today(), datetime.min.time())
+    end_of_day = datetime.combine(date.today(), datetime.max.time())
+    count = (await db.execute(select(func.count(models.Booking.id)).where(
+        and_(
+            models.Booking.dock_id == dock_id,
+            models.Booking.start_time >= start_of_day,
+            models.Booking.start_time <= end_of_day,
+            models.Booking.status != models.BookingStatus.CANCELLED
+        )
+    ))).scalar() or 0
+
+    next_booking = (await db.execute(select(models.Booking).where(
+        and_(
+            models.Booking.dock_id == dock_id,
+            models.Booking.start_time >= datetime.now(),
+            models.Booking.status != models.BookingStatus.CANCELLED
+        )
+    ).order_by(models.Booking.start_time).limit(1))).scalars().first()
+
+    return {
+        "today_booking_count": count,
+        "utilization_percent": min(int((count / 8) * 100), 100),
+        "next_booking_info": f"{next_booking.start_time.strftime('%H:%M')} - {next_booking.carrier_name}" if next_booking else None,
+    }
+
+
+async def per_dock(db, dock_ids):
+    return {dock_id: await dock_metrics(db, dock_id) for dock_id in dock_ids}
+
+
+def comparable(metrics):
+    return {
+        dock_id: (values["today_booking_count"], values["next_booking_info"])
+        for dock_id, values in metrics.items()
+    }
+
+
+async def run(name: str, url: str):
+    print(f"\n== {name}")
+    print(f"{'docks':>6} {'per-dock p50 ms':>16} {'bulk p50 ms':>12} {'speedup':>8}")
+    for count in DOCK_COUNTS:
+        engine, session_factory = await fresh_database(url)
+        async with session_factory() as db:
+            await seed_docks(db, count)
+            dock_ids = (await db.execute(select(models.Dock.id))).scalars().all()
+            await seed_bookings(db, dock_ids, days_back=7, days_ahead=7)
+
+            legacy = await measure(lambda: per_dock(db, dock_ids), repeat=10)
+            bulk = await measure(lambda: crud.get_docks_metrics(db, dock_ids), repeat=10)
+            assert comparable(await per_dock(db, dock_ids)) == comparable(await crud.get_docks_metrics(db, dock_ids))
+        await engine.dispose()
+        print(f"{count:>6} {legacy['p50_ms']:>16.2f} {bulk['p50_ms']:>12.2f} {legacy['p50_ms'] / bulk['p50_ms']:>7.1f}x")
+
+
+async def main():
+    for name, url in database_urls().items():
+        await run(name, url)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
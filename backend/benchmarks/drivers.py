@@ -0,0 +1,63 @@
+"""
+GET /drivers/: full-table GROUP BY over bookings (old path) vs. the driver_stats table.
+
+    python -m benchmarks.drivers [booking_rows]   # default 1,000,000
+
+Seeding a million rows takes a minute or two on SQLite.
+"""
+import asyncio
+import sys
+import time
+
+from sqlalchemy import desc, func, select
+
+from app import crud, models
+from benchmarks.common import database_urls, fresh_database, seed_docks, seed_bookings, measure
+
+
+async def legacy_registry(db):
+    stmt = (
+        select(
+            models.Booking.driver_phone,
+            func.max(models.Booking.carrier_name).label("carrier_name"),
+            func.count(models.Booking.id).label("total_visits"),
+            func.max(models.Booking.start_time).label("last_visit")
+        )
+        .where(models.Booking.driver_phone.isnot(None))
+        .where(models.Booking.driver_phone != "")
+        .group_by(models.Booking.driver_phone)
+        .order_by(desc("last_visit"))
+    )
+    return (await db.execute(stmt)).all()
+
+
+async def run(name: str, url: str, rows: int):
+    engine, session_factory = await fresh_database(url)
+    async with session_factory() as db:
+        docks = 50
+        await seed_docks(db, docks)
+        dock_ids = (await db.execute(select(models.Dock.id))).scalars().all()
+        days = max(1, rows // (docks * 8))
+        started = time.perf_counter()
+        await seed_bookings(db, dock_ids, days_back=days - 1, days_ahead=0)
+        await crud.rebuild_driver_stats(db)
+        drivers = (await db.execute(select(func.count()).select_from(models.DriverStats))).scalar()
+        print(f"\n== {name}: {days * docks * 8:,} bookings, {drivers:,} drivers (seeded in {time.perf_counter() - started:.0f}s)")
+
+        legacy = await measure(lambda: legacy_registry(db), repeat=3, warmup=1)
+        page = await measure(lambda: crud.get_driver_stats(db, limit=100), repeat=50)
+        search = await measure(lambda: crud.get_driver_stats(db, limit=100, search="+97150"), repeat=20)
+    await engine.dispose()
+    print(f"GROUP BY over bookings:      p50 {legacy['p50_ms']:10.2f} ms")
+    print(f"driver_stats first page:     p50 {page['p50_ms']:10.2f} ms")
+    print(f"driver_stats phone search:   p50 {search['p50_ms']:10.2f} ms")
+
+
+async def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    for name, url in database_urls().items():
+        await run(name, url, rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,130 @@
+"""
+Local fake of the Odoo XML-RPC API (authenticate + purchase.order search_read),
+so PO validation can be exercised and benchmarked offline.
+
+    python -m benchmarks.fake_odoo --port 8069 --latency-ms 80 --orders 5000
+
+then point the backend at it with ODOO_URL=http://127.0.0.1:8069 ODOO_DB=fake
+ODOO_USER=admin ODOO_PASSWORD=admin.
+"""
+import argparse
+import threading
+import time
+from socketserver import ThreadingMixIn
+from xmlrpc.server import MultiPathXMLRPCServer, SimpleXMLRPCDispatcher, SimpleXMLRPCRequestHandler
+
+STATES = ["purchase", "done", "draft", "cancel"]
+
+
+class _ThreadingServer(ThreadingMixIn, MultiPathXMLRPCServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class _Handler(SimpleXMLRPCRequestHandler):
+    # HTTP/1.1 keeps connections alive, like a real Odoo behind a proxy
+    protocol_version = "HTTP/1.1"
+    rpc_paths = ("/xmlrpc/2/common", "/xmlrpc/2/object")
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeOdoo:
+    """PO-000000 .. PO-{orders-1}; every fourth order is draft/cancelled and so invalid."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 50, orders: int = 5000):
+        self.latency = latency_ms / 1000
+        self.orders = {
+            f"PO-{i:06d}": {"id": i + 1, "partner_id": [1000 + i % 50, f"Supplier {i % 50}"], "state": STATES[i % 4]}
+            for i in range(orders)
+        }
+        self.calls = 0
+        self._lock = threading.Lock()
+
+        self.server = _ThreadingServer((host, port), requestHandler=_Handler, allow_none=True, logRequests=False)
+        common = SimpleXMLRPCDispatcher(allow_none=True)
+        common.register_function(self.authenticate, "authenticate")
+        obj = SimpleXMLRPCDispatcher(allow_none=True)
+        obj.register_function(self.execute_kw, "execute_kw")
+        self.server.add_dispatcher("/xmlrpc/2/common", common)
+        self.server.add_dispatcher("/xmlrpc/2/object", obj)
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _tick(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.latency)
+
+    def authenticate(self, db, username, password, context):
+        self._tick()
+        return 2 if password == "admin" else False
+
+    def execute_kw(self, db, uid, password, model, method, args, kwargs=None):
+        self._tick()
+        kwargs = kwargs or {}
+        if model != "purchase.order" or method not in ("search_read", "search_count"):
+            raise ValueError(f"fake odoo does not implement {model}.{method}")
+
+        domain = args[0]
+        candidates = self.orders.items()
+        for field, operator, value in domain:
+            # Index lookups for name filters so the fake itself isn't the bottleneck
+            if field == "name" and operator == "=":
+                candidates = [(value, self.orders[value])] if value in self.orders else []
+            elif field == "name" and operator == "in":
+                candidates = [(name, self.orders[name]) for name in value if name in self.orders]
+
+        matches = []
+        for name, order in candidates:
+            if all(self._match(name, order, condition) for condition in domain):
+                matches.append({"id": order["id"], "name": name, "partner_id": order["partner_id"], "state": order["state"]})
+        if method == "search_count":
+            return len(matches)
+        offset = kwargs.get("offset", 0)
+        limit = kwargs.get("limit") or len(matches)
+        fields = kwargs.get("fields")
+        page = matches[offset:offset + limit]
+        if fields:
+            page = [{key: value for key, value in row.items() if key in fields or key == "id"} for row in page]
+        return page
+
+    @staticmethod
+    def _match(name, order, condition):
+        field, operator, value = condition
+        actual = name if field == "name" else order.get(field)
+        if operator == "=":
+            return actual == value
+        if operator == "in":
+            return actual in value
+        raise ValueError(f"fake odoo does not implement operator {operator}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8069)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--orders", type=int, default=5000)
+    args = parser.parse_args()
+    fake = FakeOdoo(args.host, args.port, args.latency_ms, args.orders)
+    print(f"Fake Odoo listening on {fake.url}")
+    fake.server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+"""
+Load-testing harness for the SimpleDock API.
+
+    python -m benchmarks.load [--server inprocess|uvicorn] [--database sqlite|postgres]
+                              [--duration 30] [--concurrency 50] [--mix availability=35,...]
+                              [--output report.json] [--compare baseline.json]
+
+Builds a realistic database through the real migrations (docks with capabilities,
+months of bookings, thousands of drivers), optionally starts a fake Odoo, serves
+the app in-process (httpx ASGI transport, same event loop) or under uvicorn
+(separate process, real sockets, --workers), and replays a weighted mix of:
+
+    availability  booking wizard: GET /availability for a day and load type
+    dashboard     admin dashboard: GET /docks/ + GET /bookings/?date=today
+    create        POST /bookings/ into a small set of hot slots (races, 400s expected)
+    login         POST /auth/driver/login bursts (bcrypt)
+    validate_po   GET /bookings/validate-po against the fake Odoo
+
+The JSON report has throughput and p50/p95/p99 per endpoint plus the commit and
+settings it was taken with; --compare prints the deltas against an earlier report
+and exits 1 when an endpoint's p95 regressed by more than --max-regression.
+Postgres uses BENCH_POSTGRES_URL (the database is wiped, never point it at real data).
+"""
@@ -0,0 +1,129 @@
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load", description="Replay a mixed workload against the API.")
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--database", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--duration", type=float, default=30, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=5, help="seconds run before measuring")
+    parser.add_argument("--concurrency", type=int, default=50, help="virtual users")
+    parser.add_argument("--mix", default="", help="journey weights, e.g. availability=40,login=0")
+    parser.add_argument("--docks", type=int, default=40)
+    parser.add_argument("--drivers", type=int, default=5000)
+    parser.add_argument("--days-back", type=int, default=90)
+    parser.add_argument("--odoo-latency-ms", type=float, default=50, help="fake Odoo latency")
+    parser.add_argument("--reuse-data", action="store_true", help="skip rebuilding the database")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 growth for --compare")
+    return parser.parse_args(argv)
+
+
+def database_url(name: str) -> str:
+    if name == "postgres":
+        url = os.getenv("BENCH_POSTGRES_URL")
+        if not url:
+            sys.exit("--database postgres needs BENCH_POSTGRES_URL")
+        return url
+    path = os.path.join(tempfile.gettempdir(), "simpledock_load.db")
+    return os.getenv("BENCH_SQLITE_URL", f"sqlite+aiosqlite:///{path}")
+
+
+async def prepare(url: str, args) -> dict:
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from sqlalchemy.orm import sessionmaker
+
+    from app.database import create_engine
+    from benchmarks.load import dataset
+
+    engine = create_engine(url)
+    session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    async with session_factory() as db:
+        info = await dataset.seed(db, docks=args.docks, days_back=args.days_back, drivers=args.drivers)
+    await engine.dispose()
+    return info
+
+
+async def describe(url: str) -> dict:
+    from sqlalchemy import func, select
+
+    from app import models
+    from app.database import create_engine
+
+    engine = create_engine(url)
+    async with engine.connect() as conn:
+        dock_ids = (await conn.execute(select(models.Dock.id).order_by(models.Dock.id))).scalars().all()
+        drivers = (await conn.execute(select(func.count(models.Driver.id)))).scalar()
+        bookings = (await conn.execute(select(func.count(models.Booking.id)))).scalar()
+    await engine.dispose()
+    return {"docks": len(dock_ids), "dock_ids": list(dock_ids), "drivers": drivers, "bookings": bookings}
+
+
+async def run(args, mix: dict, dataset: dict):
+    from benchmarks.load import server, workload
+
+    if args.server == "uvicorn":
+        target = server.uvicorn(args.concurrency, workers=args.workers)
+    else:
+        target = server.inprocess(args.concurrency)
+    async with target as client:
+        return await workload.run(client, dataset, mix, args.concurrency, args.duration, args.warmup)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    url = database_url(args.database)
+
+    # The app reads these at import time, and a uvicorn subprocess inherits them
+    os.environ["DATABASE_URL"] = url
+    from benchmarks.fake_odoo import FakeOdoo
+    odoo = FakeOdoo(latency_ms=args.odoo_latency_ms)
+    odoo.start()
+    os.environ.update(ODOO_URL=odoo.url, ODOO_DB="bench", ODOO_USER="admin", ODOO_PASSWORD="admin")
+
+    from app import manage
+    from benchmarks.load import dataset as data, report, workload
+
+    mix = dict(workload.DEFAULT_MIX)
+    try:
+        mix.update(workload.parse_mix(args.mix))
+    except ValueError as e:
+        sys.exit(str(e))
+
+    try:
+        if args.reuse_data:
+            dataset = asyncio.run(describe(url))
+        else:
+            print(f"Building dataset on {args.database} ...")
+            asyncio.run(data.reset(url))
+            manage.migrate()
+            dataset = asyncio.run(prepare(url, args))
+        print(f"{dataset['docks']} docks, {dataset['bookings']} bookings, {dataset['drivers']} drivers | "
+              f"{args.server}, {args.concurrency} users, {args.warmup:g}s warm-up + {args.duration:g}s")
+
+        recorder = asyncio.run(run(args, mix, dataset))
+    finally:
+        odoo.stop()
+
+    settings = {
+        "server": args.server, "workers": args.workers if args.server == "uvicorn" else None,
+        "database": args.database, "duration_s": args.duration, "warmup_s": args.warmup,
+        "concurrency": args.concurrency, "mix": mix, "odoo_latency_ms": args.odoo_latency_ms,
+    }
+    result = report.build(recorder, args.duration, settings, dataset)
+    report.print_table(result)
+    if args.output:
+        report.write(result, args.output)
+        print(f"\nReport written to {args.output}")
+    if args.compare and not report.compare(result, args.compare, args.max_regression):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
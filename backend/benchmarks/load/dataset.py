@@ -0,0 +1,64 @@
+"""Realistic seed data for load runs."""
+import random
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models, security
+from app.database import Base, create_engine
+from benchmarks.common import CAPABILITIES, seed_bookings
+
+DRIVER_PASSWORD = "benchmark"
+
+
+def driver_phone(index: int) -> str:
+    # Same numbering as benchmarks.common.seed_bookings, so drivers have booking history
+    return f"+9715{index:07d}"
+
+
+async def reset(url: str):
+    """Drop every table, including alembic_version, so the migrations start from scratch."""
+    engine = create_engine(url)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.execute(text("DROP TABLE IF EXISTS alembic_version"))
+    await engine.dispose()
+
+
+async def seed(db: AsyncSession, docks: int = 40, days_back: int = 90, days_ahead: int = 14,
+               per_dock_per_day: int = 6, drivers: int = 5000, seed: int = 42) -> dict:
+    """Fills an empty, migrated database. Returns what the workload needs to know about it."""
+    rng = random.Random(seed)
+    rows = []
+    for i in range(docks):
+        # Mostly general docks; some also take a second load type
+        capabilities = [CAPABILITIES[i % len(CAPABILITIES)]]
+        if capabilities[0] != "General" and rng.random() < 0.5:
+            capabilities.append("General")
+        rows.append({"name": f"Dock {i + 1}", "capabilities": capabilities, "is_active": rng.random() > 0.05})
+    await db.execute(insert(models.Dock), rows)
+    await db.commit()
+    dock_ids = (await db.execute(select(models.Dock.id).order_by(models.Dock.id))).scalars().all()
+
+    await seed_bookings(db, dock_ids, days_back=days_back, days_ahead=days_ahead,
+                        per_dock_per_day=per_dock_per_day, drivers=drivers, seed=seed)
+
+    # One bcrypt hash shared by every driver; hashing thousands would dominate the setup
+    hashed = security.get_password_hash(DRIVER_PASSWORD)
+    now = datetime.now()
+    for offset in range(0, drivers, 5000):
+        await db.execute(insert(models.Driver), [
+            {"phone": driver_phone(i), "name": f"Driver {i}", "hashed_password": hashed, "created_at": now}
+            for i in range(offset, min(offset + 5000, drivers))
+        ])
+    await db.commit()
+    await crud.rebuild_driver_stats(db)
+
+    return {
+        "docks": len(dock_ids),
+        "dock_ids": list(dock_ids),
+        "drivers": drivers,
+        "bookings_days": [(date.today() - timedelta(days=days_back)).isoformat(), (date.today() + timedelta(days=days_ahead)).isoformat()],
+        "bookings": (await db.execute(select(func.count(models.Booking.id)))).scalar(),
+    }
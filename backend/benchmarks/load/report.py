@@ -0,0 +1,85 @@
+"""Machine-readable load reports and comparisons between them."""
+import json
+import platform
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+
+def percentile(samples, fraction: float) -> float:
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def build(recorder, duration: float, settings: dict, dataset: dict) -> dict:
+    endpoints = {}
+    for endpoint, samples in sorted(recorder.samples.items()):
+        samples = sorted(samples)
+        endpoints[endpoint] = {
+            "requests": len(samples),
+            "throughput_rps": round(len(samples) / duration, 2),
+            "errors": recorder.errors.get(endpoint, 0),
+            "statuses": dict(recorder.statuses[endpoint]),
+            "p50_ms": round(percentile(samples, 0.50), 3),
+            "p95_ms": round(percentile(samples, 0.95), 3),
+            "p99_ms": round(percentile(samples, 0.99), 3),
+            "max_ms": round(samples[-1], 3),
+        }
+    total = sum(endpoint["requests"] for endpoint in endpoints.values())
+    return {
+        "commit": git_commit(),
+        "taken_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "settings": settings,
+        "dataset": {key: value for key, value in dataset.items() if key != "dock_ids"},
+        "total": {
+            "requests": total,
+            "throughput_rps": round(total / duration, 2),
+            "errors": sum(endpoint["errors"] for endpoint in endpoints.values()),
+        },
+        "endpoints": endpoints,
+    }
+
+
+def print_table(report: dict):
+    print(f"\n{'endpoint':28} {'req':>7} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    for endpoint, stats in report["endpoints"].items():
+        print(f"{endpoint:28} {stats['requests']:>7} {stats['throughput_rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['errors']:>7}")
+    total = report["total"]
+    print(f"{'total':28} {total['requests']:>7} {total['throughput_rps']:>8.1f} {'':>8} {'':>8} {'':>8} {total['errors']:>7}")
+
+
+def compare(report: dict, baseline_path: str, max_regression: float) -> bool:
+    """Prints p95/throughput deltas per endpoint; False when any p95 grew by more than max_regression."""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nvs {baseline_path} (commit {baseline.get('commit')}, {baseline.get('taken_at')})")
+    ok = True
+    for endpoint, stats in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if not previous:
+            print(f"{endpoint:28} new")
+            continue
+        p95_change = stats["p95_ms"] / previous["p95_ms"] - 1 if previous["p95_ms"] else 0.0
+        rps_change = stats["throughput_rps"] / previous["throughput_rps"] - 1 if previous["throughput_rps"] else 0.0
+        flag = ""
+        if p95_change > max_regression:
+            flag = "  REGRESSION"
+            ok = False
+        print(f"{endpoint:28} p95 {previous['p95_ms']:>8.1f} -> {stats['p95_ms']:>8.1f} ms ({p95_change:+.0%})  "
+              f"rps {rps_change:+.0%}{flag}")
+    return ok
+
+
+def write(report: dict, path: str):
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+        f.write("\n")
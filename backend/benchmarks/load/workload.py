@@ -0,0 +1,122 @@
+"""Weighted mix of user journeys, replayed by concurrent virtual users."""
+import asyncio
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from benchmarks.common import CAPABILITIES, CARRIERS
+from benchmarks.load.dataset import DRIVER_PASSWORD, driver_phone
+
+DEFAULT_MIX = {"availability": 35, "dashboard": 25, "create": 15, "login": 10, "validate_po": 15}
+
+
+def parse_mix(spec: str) -> dict:
+    """"availability=40,create=10" -> weights; unknown names are an error."""
+    mix = {}
+    for part in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown journey '{name}', expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+class Recorder:
+    """Latency samples per endpoint; only requests finished after the warm-up count."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.recording = False
+
+    async def call(self, endpoint: str, request):
+        started = time.perf_counter()
+        try:
+            response = await request
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        elapsed = (time.perf_counter() - started) * 1000
+        if self.recording:
+            self.samples[endpoint].append(elapsed)
+            self.statuses[endpoint][str(status)] += 1
+            if not isinstance(status, int) or status >= 500:
+                self.errors[endpoint] += 1
+        return status
+
+
+class Journeys:
+    def __init__(self, client: httpx.AsyncClient, recorder: Recorder, dataset: dict, hot_slots: int = 40):
+        self.client = client
+        self.record = recorder.call
+        self.dataset = dataset
+        today = datetime.combine(date.today(), datetime.min.time())
+        # A small pool of slots many users go after, so creates actually race
+        rng = random.Random(1)
+        self.hot_slots = [
+            (rng.choice(dataset["dock_ids"]), today + timedelta(days=rng.randint(1, 3), hours=rng.randint(8, 16)))
+            for _ in range(hot_slots)
+        ]
+        self.po_counter = 0
+
+    async def availability(self, rng: random.Random):
+        day = date.today() + timedelta(days=rng.randint(0, 13))
+        await self.record("GET /availability", self.client.get("/availability", params={
+            "date": day.isoformat(), "capability": rng.choice(CAPABILITIES), "slot_minutes": 60,
+        }))
+
+    async def dashboard(self, rng: random.Random):
+        await self.record("GET /docks/", self.client.get("/docks/"))
+        await self.record("GET /bookings/?date", self.client.get("/bookings/", params={
+            "date": date.today().isoformat(), "limit": 500,
+        }))
+
+    async def create(self, rng: random.Random):
+        dock_id, start = rng.choice(self.hot_slots)
+        self.po_counter += 1
+        await self.record("POST /bookings/", self.client.post("/bookings/", json={
+            "dock_id": dock_id,
+            "start_time": start.isoformat(),
+            "end_time": (start + timedelta(hours=1)).isoformat(),
+            "carrier_name": rng.choice(CARRIERS),
+            "po_number": f"LOAD-{self.po_counter:07d}",
+            "driver_phone": driver_phone(rng.randrange(self.dataset["drivers"])),
+        }))
+
+    async def login(self, rng: random.Random):
+        await self.record("POST /auth/driver/login", self.client.post("/auth/driver/login", data={
+            "username": driver_phone(rng.randrange(self.dataset["drivers"])), "password": DRIVER_PASSWORD,
+        }))
+
+    async def validate_po(self, rng: random.Random):
+        # A few hot POs and a long tail, like the wizard sees
+        po = f"PO-{int(rng.paretovariate(1.2)) % 3000:06d}"
+        await self.record("GET /bookings/validate-po", self.client.get("/bookings/validate-po", params={"po": po}))
+
+
+async def run(client: httpx.AsyncClient, dataset: dict, mix: dict, concurrency: int,
+              duration: float, warmup: float, seed: int = 7) -> Recorder:
+    recorder = Recorder()
+    journeys = Journeys(client, recorder, dataset)
+    names = [name for name, weight in mix.items() if weight > 0]
+    weights = [mix[name] for name in names]
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + warmup + duration
+
+    async def user(index: int):
+        rng = random.Random(seed * 1000 + index)
+        while loop.time() < deadline:
+            await getattr(journeys, rng.choices(names, weights)[0])(rng)
+
+    async def start_recording():
+        await asyncio.sleep(warmup)
+        recorder.recording = True
+
+    timer = asyncio.create_task(start_recording())
+    await asyncio.gather(*[user(i) for i in range(concurrency)])
+    await timer
+    return recorder
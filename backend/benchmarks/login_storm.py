@@ -0,0 +1,92 @@
+"""
+Event-loop latency during a login storm.
+
+    python -m benchmarks.login_storm [logins]
+
+Fires N concurrent POST /auth/driver/login requests through the ASGI app while a
+probe keeps calling GET / (which does no work), and reports the probe's p50/p99.
+Runs twice: with bcrypt inline on the event loop (the old behaviour) and with it
+offloaded to the password thread pool. BCRYPT_ROUNDS and PASSWORD_HASH_WORKERS
+apply as usual.
+"""
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+import httpx
+
+
+async def probe(client: httpx.AsyncClient, stop: asyncio.Event, samples: list):
+    while not stop.is_set():
+        started = time.perf_counter()
+        await client.get("/")
+        samples.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0.005)
+
+
+async def storm(client: httpx.AsyncClient, logins: int):
+    stop = asyncio.Event()
+    samples = []
+    probe_task = asyncio.create_task(probe(client, stop, samples))
+    started = time.perf_counter()
+    responses = await asyncio.gather(*[
+        client.post("/auth/driver/login", data={"username": "+971500000000", "password": "benchmark"})
+        for _ in range(logins)
+    ])
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    assert all(response.status_code == 200 for response in responses)
+    samples.sort()
+    return elapsed, samples
+
+
+def report(name: str, logins: int, elapsed: float, samples):
+    p99 = samples[min(len(samples) - 1, int(len(samples) * 0.99))]
+    print(f"{name:9} {logins} logins in {elapsed:.2f}s ({logins / elapsed:.1f}/s) | "
+          f"GET / p50 {statistics.median(samples):.1f} ms, p99 {p99:.1f} ms, max {samples[-1]:.1f} ms ({len(samples)} probes)")
+
+
+async def inline_hash(password):
+    from app import security
+    return security.pwd_context.hash(password)
+
+
+async def inline_verify(plain_password, hashed_password):
+    from app import security
+    return security.pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+async def run(logins: int):
+    from app.main import app
+    from app import security
+    from benchmarks.common import fresh_database
+
+    engine, _ = await fresh_database(os.environ["DATABASE_URL"])
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=300) as client:
+        response = await client.post("/auth/driver/signup", json={"phone": "+971500000000", "name": "Bench", "password": "benchmark"})
+        assert response.status_code == 200, response.text
+
+        print(f"bcrypt rounds {security.BCRYPT_ROUNDS}, {security.PASSWORD_HASH_WORKERS} hash workers")
+        with mock.patch.object(security, "hash_password_async", inline_hash), \
+                mock.patch.object(security, "verify_and_update_password_async", inline_verify):
+            report("inline", logins, *await storm(client, logins))
+        report("offloaded", logins, *await storm(client, logins))
+
+    await engine.dispose()
+
+
+def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    # The app binds its engine at import time, so point it at a throwaway database first
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{os.path.join(tempfile.gettempdir(), 'simpledock_login_bench.db')}")
+    asyncio.run(run(logins))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+PO validation against the fake Odoo: latency, upstream calls and cache hit rate.
+
+    python -m benchmarks.odoo_validation
+
+Replays a skewed stream of PO checks (a few hot POs, a long tail, and some unknown
+numbers) with N concurrent callers, once through the blocking ServerProxy path the
+API used to have and once through the async cached client, then measures the
+batch lookup and a full prefetch.
+"""
+import asyncio
+import random
+import time
+import xmlrpc.client
+from concurrent.futures import ThreadPoolExecutor
+
+from app.odoo_client import OdooClient
+from benchmarks.fake_odoo import FakeOdoo
+
+CHECKS = 2000
+CONCURRENCY = 50
+LATENCY_MS = 50
+
+
+def workload(seed: int = 7):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(CHECKS):
+        roll = rng.random()
+        if roll < 0.1:
+            names.append(f"PO-X{rng.randrange(100):04d}") # unknown
+        else:
+            names.append(f"PO-{int(rng.paretovariate(1.2)) % 3000:06d}")
+    return names
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+def blocking_validate(url, po_number):
+    # Same calls as the previous synchronous client: authenticate once per worker + search_read
+    common = xmlrpc.client.ServerProxy(f"{url}/xmlrpc/2/common")
+    uid = common.authenticate("fake", "admin", "admin", {})
+    models = xmlrpc.client.ServerProxy(f"{url}/xmlrpc/2/object")
+    return models.execute_kw("fake", uid, "admin", "purchase.order", "search_read",
+                             [[["name", "=", po_number], ["state", "in", ["purchase", "done"]]]],
+                             {"fields": ["id", "partner_id"], "limit": 1})
+
+
+async def run_blocking(fake, names):
+    loop = asyncio.get_running_loop()
+    latencies = []
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as pool:
+        async def check(name):
+            started = time.perf_counter()
+            await loop.run_in_executor(pool, blocking_validate, fake.url, name)
+            latencies.append((time.perf_counter() - started) * 1000)
+        started = time.perf_counter()
+        await asyncio.gather(*[check(name) for name in names[:CHECKS // 10]])
+    return latencies, time.perf_counter() - started
+
+
+async def run_async(fake, names):
+    client = OdooClient()
+    client.url, client.db, client.username, client.password = fake.url, "fake", "admin", "admin"
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+    latencies = []
+
+    async def check(name):
+        async with semaphore:
+            started = time.perf_counter()
+            await client.validate_po(name)
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[check(name) for name in names])
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return latencies, elapsed, client
+
+
+async def main():
+    names = workload()
+    fake = FakeOdoo(latency_ms=LATENCY_MS).start()
+    try:
+        print(f"fake Odoo latency {LATENCY_MS} ms, {CONCURRENCY} concurrent callers")
+
+        calls_before = fake.calls
+        latencies, elapsed = await run_blocking(fake, names)
+        print(f"blocking ServerProxy: {len(latencies)} checks in {elapsed:.2f}s, "
+              f"p50 {percentile(latencies, .5):.1f} ms, p95 {percentile(latencies, .95):.1f} ms, "
+              f"upstream calls {fake.calls - calls_before}")
+
+        calls_before = fake.calls
+        latencies, elapsed, client = await run_async(fake, names)
+        lookups = client.cache.hits + client.cache.misses
+        print(f"async cached client:  {len(latencies)} checks in {elapsed:.2f}s, "
+              f"p50 {percentile(latencies, .5):.1f} ms, p95 {percentile(latencies, .95):.1f} ms, "
+              f"upstream calls {fake.calls - calls_before}, cache hit rate {client.cache.hits / lookups:.0%}")
+
+        client = OdooClient()
+        client.url, client.db, client.username, client.password = fake.url, "fake", "admin", "admin"
+        await client.connect()
+        batch = sorted(set(names))[:200]
+        calls_before = fake.calls
+        started = time.perf_counter()
+        await client.validate_pos(batch)
+        print(f"batch endpoint path:  {len(batch)} POs in {(time.perf_counter() - started) * 1000:.1f} ms, "
+              f"upstream calls {fake.calls - calls_before}")
+
+        client.cache.clear()
+        client.prefetch_interval = 600
+        started = time.perf_counter()
+        loaded = await client.prefetch()
+        calls_before = fake.calls
+        await asyncio.gather(*[client.validate_po(name) for name in names])
+        print(f"prefetch:             {loaded} POs cached in {time.perf_counter() - started:.2f}s, "
+              f"then {len(names)} checks cost {fake.calls - calls_before} upstream calls (POs outside the prefetch)")
+        await client.close()
+    finally:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,202 @@
+"""
+Query-plan regression check for the hot booking queries.
+
+    python -m benchmarks.query_plans [bookings] [--update] [--max-slowdown N]
+
+Seeds a large bookings table (default 1,000,000 rows over 100 docks), runs the real
+crud code paths while capturing the SQL they send, and EXPLAINs every statement
+that touches `bookings` (EXPLAIN QUERY PLAN on SQLite). Exits with status 1 when a
+plan scans the whole bookings table instead of searching an index.
+
+Plans and p50 timings are written next to each other in
+benchmarks/baselines/query_plans_<database>.json. With --update the baseline is
+replaced; otherwise the run is compared to it and also fails when a query got more
+than --max-slowdown (default 3) times slower. Changed plans are printed, not failed.
+Runs against SQLite, and Postgres when BENCH_POSTGRES_URL is set.
+"""
+import argparse
+import asyncio
+import json
+import os
+import re
+import sys
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import event, select, text
+
+from app import crud, models, schemas, sweeper
+from app.occupancy import occupancy_index
+from benchmarks.common import database_urls, fresh_database, seed_docks, seed_bookings, measure
+
+DOCKS = 100
+PER_DOCK_PER_DAY = 8
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+FULL_SCAN = {
+    "sqlite": re.compile(r"^SCAN bookings\b"),
+    "postgresql": re.compile(r"Seq Scan on bookings\b"),
+}
+
+
+class StatementCapture:
+    """Records the SQL and parameters sent to the database while `active`."""
+
+    def __init__(self, engine):
+        self.active = False
+        self.statements = []
+        event.listen(engine.sync_engine, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        if self.active and re.search(r"\bbookings\b", statement) and not statement.lstrip().upper().startswith("EXPLAIN"):
+            self.statements.append((statement, parameters))
+
+
+def hot_queries(dock_ids):
+    """name -> coroutine function(db, iteration) exercising one crud path."""
+    today = date.today()
+    free_day = datetime.combine(today + timedelta(days=400), datetime.min.time())
+    state = {}
+
+    async def create_booking(db, i):
+        start = free_day + timedelta(hours=i % 24, days=i // 24)
+        await crud.create_booking(db, schemas.BookingCreate(
+            dock_id=dock_ids[0], start_time=start, end_time=start + timedelta(minutes=30),
+            carrier_name="Plan", po_number=f"PLAN-{i}", driver_phone="+971500000001",
+        ))
+
+    async def bookings_day(db, i):
+        page = await crud.get_bookings(db, limit=100, date_filter=today)
+        state["cursor"] = crud.encode_cursor(page[-1])
+
+    async def bookings_dock_day(db, i):
+        await crud.get_bookings(db, limit=100, dock_id=dock_ids[1], date_filter=today)
+
+    async def bookings_next_page(db, i):
+        await crud.get_bookings(db, limit=100, date_filter=today, cursor=state["cursor"])
+
+    async def bookings_range_status(db, i):
+        await crud.get_bookings(
+            db, limit=100, start_from=datetime.combine(today, datetime.min.time()),
+            start_to=datetime.combine(today + timedelta(days=7), datetime.min.time()),
+            statuses=[models.BookingStatus.CONFIRMED],
+        )
+
+    async def dock_metrics(db, i):
+        await crud.get_docks_metrics(db, dock_ids)
+
+    async def occupancy_day(db, i):
+        occupancy_index.clear()
+        await occupancy_index.get_day(db, today + timedelta(days=1))
+
+    async def bulk_range(db, i):
+        start = free_day + timedelta(days=200 + i)
+        await crud.create_bookings_bulk(db, [
+            schemas.BookingCreate(
+                dock_id=dock_id, start_time=start, end_time=start + timedelta(hours=1),
+                carrier_name="Plan", po_number=f"PLAN-BULK-{i}",
+            )
+            for dock_id in dock_ids[:20]
+        ])
+
+    async def move_booking(db, i):
+        # Moving a booking refreshes the driver's stats by phone
+        booking_id = state.setdefault("moved", (await db.execute(
+            select(models.Booking.id).where(models.Booking.driver_phone.isnot(None)).limit(1)
+        )).scalar())
+        start = free_day + timedelta(days=300, hours=i % 24, minutes=i // 24 % 60)
+        await crud.update_booking(db, booking_id, schemas.BookingUpdate(start_time=start, end_time=start + timedelta(minutes=30)))
+
+    async def status_sweep(db, i):
+        # One batch per step: the seeded past Confirmed bookings are overdue
+        for source, target, overdue in sweeper.status_sweeper.steps(datetime.now()):
+            await crud.mark_overdue(db, source, target, overdue, batch_size=100)
+
+    return {fn.__name__: fn for fn in (
+        create_booking, bookings_day, bookings_dock_day, bookings_next_page, bookings_range_status,
+        dock_metrics, occupancy_day, bulk_range, move_booking, status_sweep,
+    )}
+
+
+async def explain(db, dialect: str, statement: str, parameters):
+    prefix = "EXPLAIN QUERY PLAN " if dialect == "sqlite" else "EXPLAIN "
+    conn = await db.connection()
+    result = await conn.exec_driver_sql(prefix + statement, parameters)
+    if dialect == "sqlite":
+        return [row[3] for row in result.all()]
+    return [row[0] for row in result.all()]
+
+
+async def run(name: str, url: str, bookings: int, update: bool, max_slowdown: float) -> bool:
+    days = max(bookings // (DOCKS * PER_DOCK_PER_DAY), 8)
+    print(f"\n== {name}: seeding {DOCKS * PER_DOCK_PER_DAY * (days + 1):,} bookings")
+    engine, session_factory = await fresh_database(url)
+    async with session_factory() as db:
+        await seed_docks(db, DOCKS)
+        dock_ids = (await db.execute(select(models.Dock.id).order_by(models.Dock.id))).scalars().all()
+        await seed_bookings(db, dock_ids, days_back=days - 7, days_ahead=7, per_dock_per_day=PER_DOCK_PER_DAY)
+        await db.execute(text("ANALYZE" if engine.dialect.name == "sqlite" else "ANALYZE bookings"))
+        await db.commit()
+
+    dialect = engine.dialect.name
+    capture = StatementCapture(engine)
+    report = {"database": dialect, "bookings": DOCKS * PER_DOCK_PER_DAY * (days + 1), "queries": {}}
+    failures = []
+    async with session_factory() as db:
+        for query, fn in hot_queries(dock_ids).items():
+            counter = iter(range(10**6))
+            capture.statements, capture.active = [], True
+            await fn(db, next(counter))
+            capture.active = False
+            statements = []
+            for statement, parameters in capture.statements:
+                plan = await explain(db, dialect, statement, parameters)
+                statements.append({"sql": " ".join(statement.split()), "plan": plan})
+                if any(FULL_SCAN[dialect].search(line.strip()) for line in plan):
+                    failures.append(f"{query}: full scan of bookings\n    {' '.join(statement.split())[:200]}\n    " + "\n    ".join(plan))
+            await db.rollback()
+            timing = await measure(lambda: fn(db, next(counter)), repeat=20, warmup=2)
+            report["queries"][query] = {"p50_ms": round(timing["p50_ms"], 3), "statements": statements}
+            print(f"{query:22} p50 {timing['p50_ms']:8.2f} ms  ({len(statements)} statements)")
+    await engine.dispose()
+
+    path = os.path.join(BASELINE_DIR, f"query_plans_{name}.json")
+    if not update and os.path.exists(path):
+        with open(path) as f:
+            baseline = json.load(f)["queries"]
+        for query, current in report["queries"].items():
+            previous = baseline.get(query)
+            if not previous:
+                continue
+            if [s["plan"] for s in previous["statements"]] != [s["plan"] for s in current["statements"]]:
+                print(f"plan changed for {query}:")
+                for statement in current["statements"]:
+                    print("    " + "\n    ".join(statement["plan"]))
+            if previous["p50_ms"] > 0 and current["p50_ms"] > previous["p50_ms"] * max_slowdown:
+                failures.append(f"{query}: p50 {current['p50_ms']:.2f} ms vs baseline {previous['p50_ms']:.2f} ms")
+    elif not failures:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {os.path.relpath(path)}")
+
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return not failures
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.query_plans")
+    parser.add_argument("bookings", nargs="?", type=int, default=1_000_000)
+    parser.add_argument("--update", action="store_true", help="rewrite the baselines instead of comparing")
+    parser.add_argument("--max-slowdown", type=float, default=3.0)
+    args = parser.parse_args()
+
+    ok = True
+    for name, url in database_urls().items():
+        ok = await run(name, url, args.bookings, args.update, args.max_slowdown) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+"""
+Response serialization for a day schedule and the dock list: Pydantic response models
+(validate every row, then dump) vs. serialization.dumps on plain dicts, and the
+columnar day schedule.
+
+    python -m benchmarks.serialization
+
+No database: rows are transient ORM objects, as crud returns them. The row path must
+produce the same bytes as the Pydantic path.
+"""
+import random
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from typing import List
+
+from pydantic import TypeAdapter
+
+from app import models, schemas, serialization
+from benchmarks.common import CARRIERS
+
+BOOKING_COUNTS = [100, 1000, 5000, 20000]
+DOCK_COUNTS = [30, 240]
+
+_bookings_adapter = TypeAdapter(List[schemas.Booking])
+_docks_adapter = TypeAdapter(List[schemas.Dock])
+
+
+def day_bookings(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    midnight = datetime.combine(date.today(), datetime.min.time())
+    statuses = list(models.BookingStatus)
+    bookings = []
+    for index in range(count):
+        start = midnight + timedelta(minutes=15 * rng.randrange(96))
+        bookings.append(models.Booking(
+            id=index + 1, dock_id=index % 60 + 1, start_time=start, end_time=start + timedelta(hours=1),
+            carrier_name=rng.choice(CARRIERS), po_number=f"PO-{index:07d}", odoo_order_id=None,
+            driver_phone=f"+9715{rng.randrange(5000):07d}", status=rng.choice(statuses),
+        ))
+    return bookings
+
+
+def docks_with_metrics(count: int):
+    docks = [models.Dock(id=index + 1, name=f"Dock {index + 1}", capabilities=["General"], is_active=True) for index in range(count)]
+    metrics = {
+        dock.id: {"today_booking_count": 8, "utilization_percent": 100, "next_booking_info": "14:00 - UPS"}
+        for dock in docks
+    }
+    return docks, metrics
+
+
+def measure(fn, repeat: int = 20, warmup: int = 2) -> float:
+    """p50 of fn() in milliseconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def pydantic_bookings(bookings) -> bytes:
+    # What response_model / the old cached render did
+    return _bookings_adapter.dump_json(_bookings_adapter.validate_python(bookings, from_attributes=True))
+
+
+def pydantic_docks(docks, metrics) -> bytes:
+    results = []
+    for dock in docks:
+        dock_data = schemas.Dock.model_validate(dock)
+        dock_data.today_booking_count = metrics[dock.id]["today_booking_count"]
+        dock_data.utilization_percent = metrics[dock.id]["utilization_percent"]
+        dock_data.next_booking_info = metrics[dock.id]["next_booking_info"]
+        results.append(dock_data)
+    return _docks_adapter.dump_json(results)
+
+
+def main():
+    backend = "orjson" if serialization.orjson is not None else "json (orjson not installed)"
+    print(f"\n== day schedule, serialization.dumps via {backend}: p50 ms (KiB)")
+    print(f"{'bookings':>9} {'pydantic':>16} {'rows':>16} {'columnar':>16} {'speedup':>8}")
+    day = date.today()
+    for count in BOOKING_COUNTS:
+        bookings = day_bookings(count)
+        legacy_body = pydantic_bookings(bookings)
+        rows_body = serialization.dumps(serialization.booking_rows(bookings))
+        columnar_body = serialization.dumps(serialization.day_schedule(day, bookings))
+        assert rows_body == legacy_body
+
+        legacy = measure(lambda: pydantic_bookings(bookings))
+        rows = measure(lambda: serialization.dumps(serialization.booking_rows(bookings)))
+        columnar = measure(lambda: serialization.dumps(serialization.day_schedule(day, bookings)))
+        print(
+            f"{count:>9} {legacy:>8.2f} ({len(legacy_body) / 1024:>5.0f}) {rows:>8.2f} ({len(rows_body) / 1024:>5.0f})"
+            f" {columnar:>8.2f} ({len(columnar_body) / 1024:>5.0f}) {legacy / rows:>7.1f}x"
+        )
+
+    print("\n== dock list: p50 ms")
+    print(f"{'docks':>9} {'pydantic':>10} {'rows':>10} {'speedup':>8}")
+    for count in DOCK_COUNTS:
+        docks, metrics = docks_with_metrics(count)
+        render = lambda: serialization.dumps([serialization.dock_row(dock, metrics[dock.id]) for dock in docks])
+        assert render() == pydantic_docks(docks, metrics)
+        legacy = measure(lambda: pydantic_docks(docks, metrics))
+        rows = measure(render)
+        print(f"{count:>9} {legacy:>10.3f} {rows:>10.3f} {legacy / rows:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Status sweeper throughput: how long one sweep takes to mark N overdue Confirmed
+bookings Late, next to a large history of bookings it must not touch.
+
+    python -m benchmarks.status_sweep [overdue ...]   # default 1000 10000 50000
+
+The candidates come off ix_bookings_awaiting_start, so the time per booking should
+stay flat as N grows, and a sweep with nothing overdue costs a few index probes.
+"""
+import asyncio
+import sys
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from app import models
+from app.sweeper import StatusSweeper
+from benchmarks.common import CARRIERS, database_urls, fresh_database, seed_docks, seed_bookings
+
+DOCKS = 50
+OVERDUE = [1_000, 10_000, 50_000]
+
+
+async def seed_overdue(db, dock_ids, rows: int):
+    """`rows` Confirmed bookings that started within the last two hours (Late, not yet No Show)."""
+    start = datetime.now() - timedelta(hours=2)
+    batch = []
+    for index in range(rows):
+        begins = start + timedelta(seconds=index * 5400 / max(rows, 1))
+        batch.append({
+            "dock_id": dock_ids[index % len(dock_ids)], "start_time": begins, "end_time": begins + timedelta(hours=3),
+            "carrier_name": CARRIERS[index % len(CARRIERS)], "po_number": f"PO-S{index:07d}",
+            "status": models.BookingStatus.CONFIRMED, "driver_phone": f"+9716{index % 5000:07d}",
+        })
+        if len(batch) >= 10_000:
+            await db.execute(insert(models.Booking), batch)
+            batch = []
+    if batch:
+        await db.execute(insert(models.Booking), batch)
+    await db.commit()
+
+
+async def run(name: str, url: str, sizes):
+    print(f"\n== {name}")
+    print(f"{'overdue':>8} {'sweep s':>9} {'us/booking':>11} {'idle sweep ms':>14}")
+    for rows in sizes:
+        engine, session_factory = await fresh_database(url)
+        async with session_factory() as db:
+            await seed_docks(db, DOCKS)
+            dock_ids = (await db.execute(select(models.Dock.id))).scalars().all()
+            # History the sweep must skip: finished or future bookings
+            await seed_bookings(db, dock_ids, days_back=0, days_ahead=30)
+            await seed_overdue(db, dock_ids, rows)
+
+        sweeper = StatusSweeper(session_factory)
+        started = time.perf_counter()
+        moved = await sweeper.sweep()
+        elapsed = time.perf_counter() - started
+        assert moved.get(models.BookingStatus.LATE, 0) >= rows, moved
+        started = time.perf_counter()
+        await sweeper.sweep()
+        idle = time.perf_counter() - started
+        await engine.dispose()
+        print(f"{rows:>8,} {elapsed:>9.2f} {elapsed * 1e6 / rows:>11.1f} {idle * 1000:>14.2f}")
+
+
+async def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or OVERDUE
+    for name, url in database_urls().items():
+        await run(name, url, sizes)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+"""Baseline: docks, bookings and drivers
+
+Databases created by the old create_all-on-startup code already have some or all
+of these tables; they are adopted as they are (plus the odoo_order_id column the
+old startup probe used to add) instead of being recreated.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_baseline"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+BOOKING_STATUSES = ("PENDING", "CONFIRMED", "CANCELLED", "ARRIVED", "COMPLETED", "LATE", "RESCHEDULED")
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+
+    if "docks" not in tables:
+        op.create_table(
+            "docks",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("name", sa.String(), nullable=True),
+            sa.Column("capabilities", sa.JSON(), nullable=True),
+            sa.Column("is_active", sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_docks_id", "docks", ["id"])
+        op.create_index("ix_docks_name", "docks", ["name"], unique=True)
+
+    if "bookings" not in tables:
+        op.create_table(
+            "bookings",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("dock_id", sa.Integer(), nullable=True),
+            sa.Column("start_time", sa.DateTime(), nullable=True),
+            sa.Column("end_time", sa.DateTime(), nullable=True),
+            sa.Column("carrier_name", sa.String(), nullable=True),
+            sa.Column("po_number", sa.String(), nullable=True),
+            sa.Column("odoo_order_id", sa.Integer(), nullable=True),
+            sa.Column("status", sa.Enum(*BOOKING_STATUSES, name="bookingstatus"), nullable=True),
+            sa.Column("driver_phone", sa.String(), nullable=True),
+            sa.ForeignKeyConstraint(["dock_id"], ["docks.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_bookings_id", "bookings", ["id"])
+        op.create_index("ix_bookings_start_time", "bookings", ["start_time"])
+        op.create_index("ix_bookings_end_time", "bookings", ["end_time"])
+        op.create_index("ix_bookings_po_number", "bookings", ["po_number"])
+    elif "odoo_order_id" not in {column["name"] for column in inspector.get_columns("bookings")}:
+        op.add_column("bookings", sa.Column("odoo_order_id", sa.Integer(), nullable=True))
+
+    if "drivers" not in tables:
+        op.create_table(
+            "drivers",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("phone", sa.String(), nullable=True),
+            sa.Column("hashed_password", sa.String(), nullable=True),
+            sa.Column("name", sa.String(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_drivers_id", "drivers", ["id"])
+        op.create_index("ix_drivers_phone", "drivers", ["phone"], unique=True)
+
+
+def downgrade():
+    op.drop_table("drivers")
+    op.drop_table("bookings")
+    op.drop_table("docks")
+    sa.Enum(name="bookingstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,49 @@
+"""driver_stats table and the bookings.driver_phone index, backfilled from bookings
+
+Revision ID: 0002_driver_stats
+Revises: 0001_baseline
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_driver_stats"
+down_revision = "0001_baseline"
+branch_labels = None
+depends_on = None
+
+
+def _indexes(inspector, table):
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+
+    if "ix_bookings_driver_phone" not in _indexes(inspector, "bookings"):
+        op.create_index("ix_bookings_driver_phone", "bookings", ["driver_phone"])
+
+    if not inspector.has_table("driver_stats"):
+        op.create_table(
+            "driver_stats",
+            sa.Column("driver_phone", sa.String(), nullable=False),
+            sa.Column("carrier_name", sa.String(), nullable=True),
+            sa.Column("total_visits", sa.Integer(), nullable=True),
+            sa.Column("last_visit", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("driver_phone"),
+        )
+        op.create_index("ix_driver_stats_last_visit", "driver_stats", ["last_visit"])
+
+    # Same aggregate as crud.rebuild_driver_stats; skipped when the table is already populated
+    op.execute(
+        "INSERT INTO driver_stats (driver_phone, carrier_name, total_visits, last_visit) "
+        "SELECT driver_phone, max(carrier_name), count(id), max(start_time) FROM bookings "
+        "WHERE driver_phone IS NOT NULL AND driver_phone <> '' "
+        "AND NOT EXISTS (SELECT 1 FROM driver_stats) "
+        "GROUP BY driver_phone"
+    )
+
+
+def downgrade():
+    op.drop_table("driver_stats")
+    op.drop_index("ix_bookings_driver_phone", table_name="bookings")
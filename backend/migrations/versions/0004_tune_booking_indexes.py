@@ -0,0 +1,57 @@
+"""Booking indexes matched to the hot queries
+
+- (start_time, id) and (dock_id, start_time, id) follow the listing/keyset order, so
+  pages come straight off the index. They replace (start_time) and (dock_id, start_time).
+- (dock_id, end_time, start_time) WHERE status <> 'CANCELLED' for overlap checks.
+  New bookings lie in the future, so the end_time range only covers the dock's later
+  bookings. With (dock_id, start_time, end_time) the check walked the dock's whole
+  history; that index is dropped so the planner can't pick it for overlaps.
+- (start_time, end_time) WHERE status <> 'CANCELLED' for whole-day scans across docks
+  (occupancy index). It replaces the single-column end_time index.
+
+Revision ID: 0004_tune_booking_indexes
+Revises: 0003_booking_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004_tune_booking_indexes"
+down_revision = "0003_booking_indexes"
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text("status <> 'CANCELLED'")
+
+
+def upgrade():
+    op.create_index("ix_bookings_start_id", "bookings", ["start_time", "id"])
+    op.create_index("ix_bookings_dock_start_id", "bookings", ["dock_id", "start_time", "id"])
+    op.create_index(
+        "ix_bookings_active_dock_end", "bookings", ["dock_id", "end_time", "start_time"],
+        sqlite_where=ACTIVE, postgresql_where=ACTIVE,
+    )
+    op.create_index(
+        "ix_bookings_active_time", "bookings", ["start_time", "end_time"],
+        sqlite_where=ACTIVE, postgresql_where=ACTIVE,
+    )
+    op.drop_index("ix_bookings_start_time", table_name="bookings")
+    op.drop_index("ix_bookings_end_time", table_name="bookings")
+    op.drop_index("ix_bookings_dock_start", table_name="bookings")
+    op.drop_index("ix_bookings_active_dock_time", table_name="bookings")
+    # Fresh statistics so the planner picks the new indexes right away
+    op.execute("ANALYZE bookings")
+
+
+def downgrade():
+    op.create_index(
+        "ix_bookings_active_dock_time", "bookings", ["dock_id", "start_time", "end_time"],
+        sqlite_where=ACTIVE, postgresql_where=ACTIVE,
+    )
+    op.create_index("ix_bookings_dock_start", "bookings", ["dock_id", "start_time"])
+    op.create_index("ix_bookings_end_time", "bookings", ["end_time"])
+    op.create_index("ix_bookings_start_time", "bookings", ["start_time"])
+    op.drop_index("ix_bookings_active_time", table_name="bookings")
+    op.drop_index("ix_bookings_active_dock_end", table_name="bookings")
+    op.drop_index("ix_bookings_dock_start_id", table_name="bookings")
+    op.drop_index("ix_bookings_start_id", table_name="bookings")
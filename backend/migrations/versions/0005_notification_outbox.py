@@ -0,0 +1,38 @@
+"""notification_outbox table for the notification dispatcher
+
+Revision ID: 0005_notification_outbox
+Revises: 0004_tune_booking_indexes
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_notification_outbox"
+down_revision = "0004_tune_booking_indexes"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "notification_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("booking_id", sa.Integer(), nullable=True),
+        sa.Column("kind", sa.String(), nullable=True),
+        sa.Column("recipient", sa.String(), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=True),
+        sa.Column("next_attempt_at", sa.DateTime(), nullable=True),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("last_error", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_notification_outbox_booking_id", "notification_outbox", ["booking_id"])
+    op.create_index("ix_notification_outbox_due", "notification_outbox", ["status", "next_attempt_at"])
+
+
+def downgrade():
+    op.drop_table("notification_outbox")
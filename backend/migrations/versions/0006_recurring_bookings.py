@@ -0,0 +1,53 @@
+"""recurring_bookings and recurring_exceptions
+
+Revision ID: 0006_recurring_bookings
+Revises: 0005_notification_outbox
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_recurring_bookings"
+down_revision = "0005_notification_outbox"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "recurring_bookings",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("dock_id", sa.Integer(), nullable=True),
+        sa.Column("rule", sa.String(), nullable=True),
+        sa.Column("starts_on", sa.Date(), nullable=True),
+        sa.Column("ends_on", sa.Date(), nullable=True),
+        sa.Column("start_time", sa.Time(), nullable=True),
+        sa.Column("duration_minutes", sa.Integer(), nullable=True),
+        sa.Column("carrier_name", sa.String(), nullable=True),
+        sa.Column("po_number", sa.String(), nullable=True),
+        sa.Column("odoo_order_id", sa.Integer(), nullable=True),
+        sa.Column("driver_phone", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["dock_id"], ["docks.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_table(
+        "recurring_exceptions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("recurring_booking_id", sa.Integer(), nullable=True),
+        sa.Column("occurrence_date", sa.Date(), nullable=True),
+        sa.Column("kind", sa.String(), nullable=True),
+        sa.Column("new_dock_id", sa.Integer(), nullable=True),
+        sa.Column("new_start", sa.DateTime(), nullable=True),
+        sa.Column("new_end", sa.DateTime(), nullable=True),
+        sa.Column("booking_id", sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(["recurring_booking_id"], ["recurring_bookings.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("recurring_booking_id", "occurrence_date", name="uq_recurring_exceptions_occurrence"),
+    )
+
+
+def downgrade():
+    op.drop_table("recurring_exceptions")
+    op.drop_table("recurring_bookings")
@@ -0,0 +1,48 @@
+"""utilization rollups, booking arrival/completion times and the No Show status
+
+Revision ID: 0007_utilization_rollups
+Revises: 0006_recurring_bookings
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0007_utilization_rollups"
+down_revision = "0006_recurring_bookings"
+branch_labels = None
+depends_on = None
+
+MEASURES = ("booked_minutes", "bookings", "cancelled", "completed", "late", "no_show", "turnaround_minutes", "turnarounds")
+
+
+def _create_rollup(name):
+    op.create_table(
+        name,
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("dock_id", sa.Integer(), nullable=False),
+        *[sa.Column(measure, sa.Integer(), nullable=False) for measure in MEASURES],
+        sa.PrimaryKeyConstraint("bucket_start", "dock_id"),
+    )
+
+
+def upgrade():
+    if op.get_bind().dialect.name == "postgresql":
+        # A new enum label can't be used in the transaction that adds it
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE bookingstatus ADD VALUE IF NOT EXISTS 'NO_SHOW'")
+    # SQLite stores the enum as VARCHAR without a CHECK constraint: nothing to do
+
+    op.add_column("bookings", sa.Column("arrived_at", sa.DateTime(), nullable=True))
+    op.add_column("bookings", sa.Column("completed_at", sa.DateTime(), nullable=True))
+    _create_rollup("utilization_hourly")
+    _create_rollup("utilization_daily")
+    # Fill the rollups with `python -m app.manage backfill-utilization`
+
+
+def downgrade():
+    op.drop_table("utilization_daily")
+    op.drop_table("utilization_hourly")
+    op.drop_column("bookings", "completed_at")
+    op.drop_column("bookings", "arrived_at")
+    # Postgres can't drop an enum label; rows using it are moved back to Late
+    op.execute("UPDATE bookings SET status = 'LATE' WHERE status = 'NO_SHOW'")
@@ -0,0 +1,59 @@
+"""bookings_archive for finished bookings, and the archiver's candidate index
+
+Revision ID: 0008_bookings_archive
+Revises: 0007_utilization_rollups
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0008_bookings_archive"
+down_revision = "0007_utilization_rollups"
+branch_labels = None
+depends_on = None
+
+BOOKING_STATUSES = ("PENDING", "CONFIRMED", "CANCELLED", "ARRIVED", "COMPLETED", "LATE", "RESCHEDULED", "NO_SHOW")
+FINISHED = sa.text("status IN ('CANCELLED', 'COMPLETED', 'NO_SHOW')")
+
+
+def upgrade():
+    # Reuses the bookings' enum type on Postgres
+    status_type = sa.Enum(*BOOKING_STATUSES, name="bookingstatus").with_variant(
+        postgresql.ENUM(name="bookingstatus", create_type=False), "postgresql"
+    )
+    op.create_table(
+        "bookings_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("dock_id", sa.Integer(), nullable=True),
+        sa.Column("start_time", sa.DateTime(), nullable=True),
+        sa.Column("end_time", sa.DateTime(), nullable=True),
+        sa.Column("carrier_name", sa.String(), nullable=True),
+        sa.Column("po_number", sa.String(), nullable=True),
+        sa.Column("odoo_order_id", sa.Integer(), nullable=True),
+        sa.Column("status", status_type, nullable=True),
+        sa.Column("driver_phone", sa.String(), nullable=True),
+        sa.Column("arrived_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("archived_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_bookings_archive_start_id", "bookings_archive", ["start_time", "id"])
+    op.create_index("ix_bookings_archive_dock_start_id", "bookings_archive", ["dock_id", "start_time", "id"])
+    op.create_index("ix_bookings_archive_driver_phone", "bookings_archive", ["driver_phone"])
+    op.create_index(
+        "ix_bookings_finished_end", "bookings", ["end_time"],
+        sqlite_where=FINISHED, postgresql_where=FINISHED,
+    )
+
+
+def downgrade():
+    # Archived rows go back first so no history is lost
+    op.execute(
+        "INSERT INTO bookings (id, dock_id, start_time, end_time, carrier_name, po_number, odoo_order_id, "
+        "status, driver_phone, arrived_at, completed_at) "
+        "SELECT id, dock_id, start_time, end_time, carrier_name, po_number, odoo_order_id, "
+        "status, driver_phone, arrived_at, completed_at FROM bookings_archive"
+    )
+    op.drop_index("ix_bookings_finished_end", table_name="bookings")
+    op.drop_table("bookings_archive")
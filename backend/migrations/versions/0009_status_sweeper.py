@@ -0,0 +1,51 @@
+"""status sweeper: awaiting-bookings index, transition log and job leases
+
+Revision ID: 0009_status_sweeper
+Revises: 0008_bookings_archive
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = "0009_status_sweeper"
+down_revision = "0008_bookings_archive"
+branch_labels = None
+depends_on = None
+
+BOOKING_STATUSES = ("PENDING", "CONFIRMED", "CANCELLED", "ARRIVED", "COMPLETED", "LATE", "RESCHEDULED", "NO_SHOW")
+AWAITING = sa.text("status IN ('CONFIRMED', 'LATE')")
+
+
+def upgrade():
+    # Reuses the bookings' enum type on Postgres
+    status_type = sa.Enum(*BOOKING_STATUSES, name="bookingstatus").with_variant(
+        postgresql.ENUM(name="bookingstatus", create_type=False), "postgresql"
+    )
+    op.create_index(
+        "ix_bookings_awaiting_start", "bookings", ["start_time", "end_time"],
+        sqlite_where=AWAITING, postgresql_where=AWAITING,
+    )
+    op.create_table(
+        "booking_status_transitions",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("booking_id", sa.Integer(), nullable=True),
+        sa.Column("from_status", status_type, nullable=True),
+        sa.Column("to_status", status_type, nullable=True),
+        sa.Column("changed_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_booking_status_transitions_booking_id", "booking_status_transitions", ["booking_id"])
+    op.create_table(
+        "job_leases",
+        sa.Column("name", sa.String(), nullable=False),
+        sa.Column("holder", sa.String(), nullable=True),
+        sa.Column("expires_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("name"),
+    )
+
+
+def downgrade():
+    op.drop_table("job_leases")
+    op.drop_table("booking_status_transitions")
+    op.drop_index("ix_bookings_awaiting_start", table_name="bookings")
@@ -0,0 +1,21 @@
+"""recurring_bookings.revision, bumped on every change to a series or its exceptions
+
+Revision ID: 0010_recurring_revision
+Revises: 0009_status_sweeper
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0010_recurring_revision"
+down_revision = "0009_status_sweeper"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column("recurring_bookings", sa.Column("revision", sa.Integer(), nullable=False, server_default="1"))
+
+
+def downgrade():
+    op.drop_column("recurring_bookings", "revision")
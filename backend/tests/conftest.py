@@ -0,0 +1,62 @@
+"""
+Shared fixtures. The app binds its engines when app.database is imported, so the test
+databases are configured here, before any test module imports the app: two SQLite
+files, a primary and a replica that never catches up (see test_replica_routing).
+"""
+import os
+import tempfile
+
+directory = tempfile.mkdtemp(prefix="simpledock_tests_")
+PRIMARY_URL = f"sqlite+aiosqlite:///{os.path.join(directory, 'primary.db')}"
+REPLICA_URL = f"sqlite+aiosqlite:///{os.path.join(directory, 'replica.db')}"
+READ_YOUR_WRITES_SECONDS = 0.5
+os.environ.update(
+    DATABASE_URL=PRIMARY_URL, DATABASE_REPLICA_URLS=REPLICA_URL, READ_YOUR_WRITES_SECONDS=str(READ_YOUR_WRITES_SECONDS),
+    # httpx.ASGITransport connects from 127.0.0.1, standing in for the reverse proxy
+    TRUSTED_PROXIES="127.0.0.1", RESPONSE_CACHE_ENABLED="false",
+)
+
+import httpx
+import pytest
+
+from app import database
+from app.archive import archive_watermark
+from app.main import app
+from app.occupancy import occupancy_index
+from app.recurrence import recurrence_index
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session", autouse=True)
+async def app_engines(anyio_backend):
+    """
+    Session-scoped so every test shares one event loop, like a server worker: the app's
+    module-level locks bind to the first loop they wait on.
+    """
+    yield
+    for engine in [database.engine, *database.replica_engines]:
+        await engine.dispose()
+
+
+@pytest.fixture
+async def engines():
+    """Empty schema on every engine the app uses, and no cached state from earlier tests."""
+    for engine in [database.engine, *database.replica_engines]:
+        async with engine.begin() as conn:
+            await conn.run_sync(database.Base.metadata.drop_all)
+            await conn.run_sync(database.Base.metadata.create_all)
+    occupancy_index.clear()
+    recurrence_index.invalidate()
+    archive_watermark.invalidate()
+    return database.engine, database.replica_engines
+
+
+@pytest.fixture
+async def client(engines):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=60) as client:
+        yield client
@@ -0,0 +1,115 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, insert, select
+
+from app import archive, crud, database, models
+from app.archive import archive_watermark
+
+pytestmark = pytest.mark.anyio
+
+Status = models.BookingStatus
+OLD = (datetime.now() - timedelta(days=archive.ARCHIVE_AFTER_DAYS + 10)).replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def row(booking_id: int, start: datetime, status=Status.COMPLETED, hours: float = 1):
+    return {
+        "id": booking_id, "dock_id": 1, "start_time": start, "end_time": start + timedelta(hours=hours),
+        "carrier_name": f"Carrier {booking_id}", "po_number": f"PO-{booking_id:05d}", "status": status,
+    }
+
+
+@pytest.fixture
+async def dock(engines):
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Dock), [{"id": 1, "name": "Dock 1", "capabilities": ["General"], "is_active": True}])
+
+
+async def ids(model):
+    async with database.AsyncSessionLocal() as db:
+        return set((await db.execute(select(model.id))).scalars().all())
+
+
+async def test_pass_moves_only_old_finished_bookings(dock):
+    recent = datetime.now() - timedelta(days=1)
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Booking), [
+            row(1, OLD, Status.COMPLETED),
+            row(2, OLD + timedelta(hours=1), Status.CANCELLED),
+            row(3, OLD + timedelta(hours=2), Status.NO_SHOW),
+            row(4, OLD + timedelta(hours=3), Status.CONFIRMED), # Never closed: kept for the sweeper
+            row(5, OLD + timedelta(hours=4), Status.LATE),
+            row(6, recent, Status.COMPLETED), # Finished, but not old enough
+        ])
+
+    # Two rows per batch, so the pass takes several
+    assert await archive.archive(batch_size=2, pause=0) == 3
+    assert await ids(models.BookingArchive) == {1, 2, 3}
+    assert await ids(models.Booking) == {4, 5, 6}
+    assert await archive.archive(batch_size=2, pause=0) == 0
+
+
+@pytest.fixture
+async def split_history(dock):
+    """One old day with bookings in both tables, interleaved and with start_time ties."""
+    live = [row(i, OLD + timedelta(hours=i // 2), Status.CONFIRMED) for i in range(1, 20, 2)]
+    archived = [row(i, OLD + timedelta(hours=i // 2)) for i in range(2, 21, 2)]
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Booking), live)
+        await conn.execute(insert(models.BookingArchive), archived)
+    return sorted((booking["start_time"], booking["id"]) for booking in live + archived)
+
+
+def order(bookings):
+    return [(booking.start_time, booking.id) for booking in bookings]
+
+
+@pytest.mark.parametrize("skip", [0, 3, 8, 15])
+async def test_offset_pages_merge_archived_bookings_in_order(split_history, skip):
+    async with database.AsyncSessionLocal() as db:
+        page = await crud.get_bookings(db, skip=skip, limit=5, date_filter=OLD.date())
+    assert order(page) == split_history[skip:skip + 5]
+
+
+async def test_cursor_pages_merge_archived_bookings_in_order(split_history):
+    listed, cursor = [], None
+    async with database.AsyncSessionLocal() as db:
+        while True:
+            page = await crud.get_bookings(db, limit=3, date_filter=OLD.date(), cursor=cursor)
+            if not page:
+                break
+            listed += page
+            cursor = crud.encode_cursor(page[-1])
+    assert order(listed) == split_history
+
+
+async def test_recent_ranges_skip_the_archive(split_history):
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(database.engine.sync_engine, "before_cursor_execute", capture)
+    try:
+        async with database.AsyncSessionLocal() as db:
+            assert await archive_watermark.needed(db, None)
+            assert await archive_watermark.needed(db, OLD)
+            # Loads (and caches) the archive's newest start_time
+            assert not await archive_watermark.needed(db, datetime.now() - timedelta(days=1))
+            statements.clear()
+            await crud.get_bookings(db, date_filter=datetime.now().date())
+            await crud.get_bookings(db, start_from=datetime.now() - timedelta(days=7))
+    finally:
+        event.remove(database.engine.sync_engine, "before_cursor_execute", capture)
+    assert statements and not any("bookings_archive" in statement for statement in statements)
+
+
+async def test_shorter_horizon_pass_moves_the_watermark(dock):
+    ended = datetime.now() - timedelta(days=2)
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Booking), [row(1, ended)])
+    async with database.AsyncSessionLocal() as db:
+        assert not await archive_watermark.needed(db, ended - timedelta(days=1))
+        assert await archive.archive(after_days=1, pause=0) == 1
+        assert await archive_watermark.needed(db, ended - timedelta(days=1))
+        assert not await archive_watermark.needed(db, datetime.now())
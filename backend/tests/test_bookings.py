@@ -0,0 +1,188 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app import database, models
+
+pytestmark = pytest.mark.anyio
+
+SLOT = datetime.combine(date.today() + timedelta(days=1), datetime.min.time()) + timedelta(hours=9)
+
+
+def payload(start: datetime, index: int = 0, dock_id: int = 1, hours: float = 1):
+    return {
+        "dock_id": dock_id,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=hours)).isoformat(),
+        "carrier_name": f"Carrier {index}",
+        "po_number": f"PO-{index:05d}",
+    }
+
+
+@pytest.fixture
+async def docks(engines):
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Dock), [
+            {"id": dock_id, "name": f"Dock {dock_id}", "capabilities": ["General"], "is_active": True}
+            for dock_id in (1, 2)
+        ])
+
+
+async def test_same_slot_race_has_exactly_one_winner(client, docks):
+    responses = await asyncio.gather(*[client.post("/bookings/", json=payload(SLOT, i)) for i in range(50)])
+    codes = [response.status_code for response in responses]
+    assert codes.count(200) == 1
+    assert codes.count(400) == 49
+
+
+async def test_distinct_slots_are_all_accepted(client, docks):
+    responses = await asyncio.gather(*[client.post("/bookings/", json=payload(SLOT + timedelta(hours=i), i)) for i in range(20)])
+    assert [response.status_code for response in responses] == [200] * 20
+
+
+@pytest.mark.parametrize("hours", [0, -1])
+async def test_create_rejects_empty_or_inverted_range(client, docks, hours):
+    response = await client.post("/bookings/", json=payload(SLOT, hours=hours))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "end_time must be after start_time"
+
+
+async def test_update_rejects_inverted_range(client, docks):
+    booking = (await client.post("/bookings/", json=payload(SLOT))).json()
+    response = await client.put(f"/bookings/{booking['id']}", json={"end_time": (SLOT - timedelta(hours=1)).isoformat()})
+    assert response.status_code == 400
+
+
+async def test_update_cannot_move_onto_a_taken_slot(client, docks):
+    taken = (await client.post("/bookings/", json=payload(SLOT, 1))).json()
+    moved = (await client.post("/bookings/", json=payload(SLOT, 2, dock_id=2))).json()
+
+    response = await client.put(f"/bookings/{moved['id']}", json={"dock_id": taken["dock_id"]})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Time slot already booked"
+
+    # Its own slot doesn't count against it, and a free one is fine
+    response = await client.put(f"/bookings/{moved['id']}", json={"start_time": (SLOT + timedelta(minutes=30)).isoformat(),
+                                                                  "end_time": (SLOT + timedelta(hours=2)).isoformat()})
+    assert response.status_code == 200
+    response = await client.put(f"/bookings/{moved['id']}", json={"dock_id": 1, "start_time": (SLOT + timedelta(hours=1)).isoformat()})
+    assert response.status_code == 200
+
+
+async def test_uncancelling_needs_the_slot_to_be_free(client, docks):
+    cancelled = (await client.post("/bookings/", json=payload(SLOT, 1))).json()
+    await client.put(f"/bookings/{cancelled['id']}", json={"status": "Cancelled"})
+    assert (await client.post("/bookings/", json=payload(SLOT, 2))).status_code == 200
+
+    response = await client.put(f"/bookings/{cancelled['id']}", json={"status": "Confirmed"})
+    assert response.status_code == 400
+
+
+async def test_auto_assign_window_already_over(client, docks):
+    now = datetime.now().replace(second=0, microsecond=0)
+    midnight = datetime.combine(now.date(), datetime.min.time())
+    if now - midnight < timedelta(minutes=2):
+        pytest.skip("no past window left today")
+    response = await client.post("/bookings/auto", json={
+        "window_start": midnight.isoformat(), "window_end": (now - timedelta(minutes=1)).isoformat(),
+        "duration_minutes": 1, "step_minutes": 1, "carrier_name": "Carrier", "po_number": "PO-AUTO",
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No capable dock is free in the requested window"
+
+
+async def test_auto_assign_window_shorter_than_booking(client, docks):
+    response = await client.post("/bookings/auto", json={
+        "window_start": SLOT.isoformat(), "window_end": (SLOT + timedelta(minutes=30)).isoformat(),
+        "duration_minutes": 60, "carrier_name": "Carrier", "po_number": "PO-AUTO",
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No capable dock is free in the requested window"
+
+
+async def test_columnar_day_schedule_is_never_paged(client, docks):
+    day = SLOT.date()
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Booking), [
+            {"dock_id": 1, "start_time": SLOT + timedelta(minutes=i), "end_time": SLOT + timedelta(minutes=i + 1),
+             "carrier_name": "Carrier", "po_number": f"PO-{i:05d}", "status": models.BookingStatus.CONFIRMED}
+            for i in range(150)
+        ])
+
+    response = await client.get("/bookings/", params={"date": day.isoformat()})
+    assert len(response.json()) == 100 and "X-Next-Cursor" in response.headers
+
+    response = await client.get("/bookings/", params={"date": day.isoformat(), "format": "columnar", "limit": 10})
+    assert len(response.json()["id"]) == 150 and "X-Next-Cursor" not in response.headers
+
+
+async def test_moving_an_occurrence_cannot_double_book(client, docks):
+    from app import recurrence
+
+    day = SLOT.date()
+    series = (await client.post("/recurring-bookings/", json={
+        "dock_id": 1, "rule": "FREQ=DAILY", "starts_on": day.isoformat(), "start_time": "08:00:00",
+        "duration_minutes": 60, "carrier_name": "Standing", "po_number": "PO-SERIES",
+    })).json()
+    noon = datetime.combine(day, datetime.min.time()) + timedelta(hours=12)
+    assert (await client.post("/bookings/", json=payload(noon))).status_code == 200
+    occurrence_id = recurrence.occurrence_id(series["id"], day)
+
+    response = await client.put(f"/bookings/{occurrence_id}", json={
+        "start_time": noon.isoformat(), "end_time": (noon + timedelta(minutes=30)).isoformat(),
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Time slot already booked"
+
+    # Overlapping its own old slot is fine
+    response = await client.put(f"/bookings/{occurrence_id}", json={"end_time": (noon - timedelta(hours=3, minutes=30)).isoformat()})
+    assert response.status_code == 200 and response.json()["id"] > 0
+
+
+async def test_bookings_are_capped_at_the_occupancy_lookback(client, docks):
+    # A longer one would be missing from the later day's occupancy (see OCCUPANCY_LOOKBACK_HOURS)
+    response = await client.post("/bookings/", json=payload(SLOT, hours=25))
+    assert response.status_code == 400 and "at most 24 hours" in response.json()["detail"]
+    assert (await client.post("/bookings/", json=payload(SLOT, hours=24))).status_code == 200
+
+    booking = (await client.post("/bookings/", json=payload(SLOT + timedelta(days=2)))).json()
+    response = await client.put(f"/bookings/{booking['id']}", json={"end_time": (SLOT + timedelta(days=3, hours=2)).isoformat()})
+    assert response.status_code == 400
+
+    response = await client.post("/bookings/bulk", json=[payload(SLOT + timedelta(days=5), hours=30)])
+    assert response.json()["results"][0]["status"] == "rejected"
+
+
+async def test_bulk_results_line_up_with_input_rows(client, docks):
+    rows = [payload(SLOT + timedelta(hours=i), i, dock_id=1 + i % 2) for i in range(40)][::-1]
+    rows.insert(5, payload(SLOT, 999, hours=-1))
+    results = (await client.post("/bookings/bulk", json=rows)).json()["results"]
+    assert results[5]["status"] == "rejected"
+    for row, result in zip(rows, results):
+        if result["status"] == "created":
+            assert (result["booking"]["po_number"], result["booking"]["start_time"]) == (row["po_number"], row["start_time"])
+    assert sum(result["status"] == "created" for result in results) == 40
+
+
+async def test_update_does_not_overwrite_a_concurrent_status_change(client, docks, monkeypatch):
+    import sqlite3
+    from app import crud
+
+    booking = (await client.post("/bookings/", json=payload(SLOT))).json()
+    stamp_status = crud._stamp_status
+
+    def swept_meanwhile(db_booking, previous_status):
+        # The sweeper commits Confirmed -> No Show after the update read the row
+        with sqlite3.connect(database.engine.url.database) as conn:
+            conn.execute("UPDATE bookings SET status = 'NO_SHOW' WHERE id = ?", (booking["id"],))
+        stamp_status(db_booking, previous_status)
+
+    monkeypatch.setattr(crud, "_stamp_status", swept_meanwhile)
+    response = await client.put(f"/bookings/{booking['id']}", json={"status": "Arrived"})
+    assert response.status_code == 409
+    monkeypatch.undo()
+
+    rows = (await client.get("/bookings/", params={"date": SLOT.date().isoformat()})).json()
+    assert [row["status"] for row in rows] == ["No Show"]
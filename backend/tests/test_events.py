@@ -0,0 +1,30 @@
+from app.events import ScheduleHub
+
+DAY = "2026-01-05"
+
+
+def delta(seq: int, day: str = DAY):
+    return {"type": "booking.updated", "dates": [day], "booking": {}, "seq": seq}
+
+
+def test_resume_replays_missed_deltas():
+    hub = ScheduleHub()
+    for seq in (1, 2, 3):
+        hub._deliver(delta(seq))
+    _, missed, reset = hub.subscribe(DAY, since=1, epoch=hub.epoch)
+    assert [item["seq"] for item in missed] == [2, 3] and not reset
+
+
+def test_worker_that_started_later_resets_older_clients():
+    # Another worker published seqs 1-10 (some for DAY) before this one subscribed
+    hub = ScheduleHub()
+    hub._deliver(delta(11, "2026-01-06"))
+    hub._deliver(delta(12))
+    assert hub.subscribe(DAY, since=5, epoch=hub.epoch)[2]
+    _, missed, reset = hub.subscribe(DAY, since=10, epoch=hub.epoch)
+    assert [item["seq"] for item in missed] == [12] and not reset
+
+
+def test_worker_that_heard_nothing_resets():
+    hub = ScheduleHub()
+    assert hub.subscribe(DAY, since=0, epoch=hub.epoch)[2]
@@ -0,0 +1,122 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from app import crud, database, models, notifications, schemas
+
+pytestmark = pytest.mark.anyio
+
+SLOT = datetime.combine(date.today() + timedelta(days=1), datetime.min.time()) + timedelta(hours=9)
+
+
+def payload(start: datetime, index: int = 0, phone=None):
+    return {
+        "dock_id": 1,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+        "carrier_name": f"Carrier {index}",
+        "po_number": f"PO-{index:05d}",
+        "driver_phone": phone,
+    }
+
+
+class ScriptedProvider(notifications.NotificationProvider):
+    """Raises the queued errors in order, then succeeds."""
+
+    def __init__(self, *errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send(self, notification):
+        if self.errors:
+            raise self.errors.pop(0)
+        self.sent.append(notification.recipient)
+
+
+@pytest.fixture
+async def dock(engines):
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Dock), [{"id": 1, "name": "Dock 1", "capabilities": ["General"], "is_active": True}])
+
+
+@pytest.fixture
+def no_backoff(monkeypatch):
+    # Failed sends come straight back instead of minutes later
+    monkeypatch.setattr(notifications, "NOTIFY_BACKOFF_SECONDS", 0)
+
+
+def dispatcher(provider):
+    return notifications.NotificationDispatcher(provider=provider, rate_per_second=0)
+
+
+async def outbox():
+    async with database.AsyncSessionLocal() as db:
+        return (await db.execute(select(models.NotificationOutbox).order_by(models.NotificationOutbox.id))).scalars().all()
+
+
+async def test_bookings_without_a_phone_are_not_enqueued(client, dock):
+    await client.post("/bookings/", json=payload(SLOT, 1))
+    await client.post("/bookings/", json=payload(SLOT + timedelta(hours=1), 2, phone="+15550002"))
+    assert [row.recipient for row in await outbox()] == ["+15550002"]
+
+
+async def test_each_notification_is_delivered_once_despite_failures(client, dock, no_backoff, monkeypatch):
+    monkeypatch.setattr(notifications, "NOTIFY_MAX_ATTEMPTS", 100)
+    random.seed(7)
+    phones = [f"+1555{i:07d}" for i in range(30)]
+    for i, phone in enumerate(phones):
+        assert (await client.post("/bookings/", json=payload(SLOT + timedelta(hours=i), i, phone))).status_code == 200
+
+    provider = notifications.FakeProvider(fail_rate=0.5)
+    worker = dispatcher(provider)
+    for _ in range(100):
+        if not await worker.dispatch_once():
+            break
+    rows = await outbox()
+    assert {row.status for row in rows} == {notifications.SENT}
+    assert sorted(recipient for recipient, _ in provider.sent) == phones
+    assert any(row.attempts > 1 for row in rows)
+
+
+async def test_rate_limited_send_keeps_its_attempt(client, dock, no_backoff):
+    await client.post("/bookings/", json=payload(SLOT, phone="+15550001"))
+    provider = ScriptedProvider(notifications.RateLimited(retry_after=0))
+    worker = dispatcher(provider)
+
+    await worker.dispatch_once()
+    [row] = await outbox()
+    assert (row.status, row.attempts) == (notifications.PENDING, 0)
+    assert "rate limited" in row.last_error
+
+    await worker.dispatch_once()
+    [row] = await outbox()
+    assert (row.status, row.attempts) == (notifications.SENT, 1)
+    assert provider.sent == ["+15550001"]
+
+
+async def test_permanent_error_is_not_retried(client, dock, no_backoff):
+    await client.post("/bookings/", json=payload(SLOT, phone="+15550001"))
+    provider = ScriptedProvider(notifications.PermanentError("invalid number"))
+    worker = dispatcher(provider)
+
+    await worker.dispatch_once()
+    assert await worker.dispatch_once() == 0
+    [row] = await outbox()
+    assert (row.status, row.attempts) == (notifications.FAILED, 1)
+    assert row.last_error == "PermanentError: invalid number"
+    assert provider.sent == []
+
+
+async def test_rolled_back_booking_leaves_no_outbox_row(engines, dock):
+    async def rejected():
+        # What Postgres's bookings_no_overlap constraint does to a concurrent insert
+        raise IntegrityError("INSERT INTO bookings", {}, Exception("bookings_no_overlap"))
+
+    async with database.AsyncSessionLocal() as db:
+        db.commit = rejected
+        booking = schemas.BookingCreate(**payload(SLOT, phone="+15550001"))
+        assert await crud.create_booking(db, booking) is None
+    assert await outbox() == []
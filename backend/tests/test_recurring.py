@@ -0,0 +1,122 @@
+from datetime import date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app import database, models, recurrence
+from app.recurrence import recurrence_index
+
+
+@pytest.mark.parametrize("text, starts_on, expected", [
+    ("FREQ=DAILY;INTERVAL=3;COUNT=4", date(2026, 1, 1), date(2026, 1, 10)),
+    ("FREQ=WEEKLY;BYDAY=MO,TH;COUNT=3", date(2026, 10, 15), date(2026, 10, 22)),
+    # February, April have no 31st
+    ("FREQ=MONTHLY;BYMONTHDAY=31;COUNT=3", date(2026, 1, 31), date(2026, 5, 31)),
+    ("FREQ=WEEKLY;UNTIL=20261231", date(2026, 10, 15), date(2026, 12, 31)),
+    ("FREQ=DAILY", date(2026, 10, 15), None),
+])
+def test_last_date(text, starts_on, expected):
+    assert recurrence.last_date(recurrence.parse_rule(text), starts_on) == expected
+
+
+@pytest.mark.parametrize("text", ["FREQ=MONTHLY;INTERVAL=12;BYMONTHDAY=31;COUNT=1", "FREQ=MONTHLY;INTERVAL=12;BYMONTHDAY=31"])
+def test_rule_that_never_matches_is_rejected(text):
+    # Every 12 months from April never reaches a 31st
+    with pytest.raises(ValueError):
+        recurrence.last_date(recurrence.parse_rule(text), date(2026, 4, 10))
+
+
+def test_count_is_capped():
+    with pytest.raises(ValueError):
+        recurrence.parse_rule(f"FREQ=DAILY;COUNT={recurrence.RECURRING_MAX_COUNT + 1}")
+
+
+DAY = date.today() + timedelta(days=7)
+
+
+def at(day: date, hour: int, minute: int = 0) -> datetime:
+    return datetime.combine(day, time(hour, minute))
+
+
+def series_request(**overrides):
+    return {
+        "dock_id": 1, "rule": "FREQ=DAILY;COUNT=5", "starts_on": DAY.isoformat(), "start_time": "08:00:00",
+        "duration_minutes": 60, "carrier_name": "Standing", "po_number": "PO-SERIES", **overrides,
+    }
+
+
+def booking_request(start: datetime, minutes: int = 60):
+    return {
+        "dock_id": 1, "start_time": start.isoformat(), "end_time": (start + timedelta(minutes=minutes)).isoformat(),
+        "carrier_name": "Carrier", "po_number": "PO-1",
+    }
+
+
+@pytest.fixture
+async def dock(engines):
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Dock).values(id=1, name="Dock 1", capabilities=["General"], is_active=True))
+
+
+async def listed(client, day: date):
+    return [(row["id"], row["start_time"]) for row in (await client.get("/bookings/", params={"date": day.isoformat()})).json()]
+
+
+@pytest.mark.anyio
+async def test_series_expands_into_listings(client, dock):
+    series = (await client.post("/recurring-bookings/", json=series_request(rule="FREQ=WEEKLY;COUNT=3"))).json()
+    assert series["ends_on"] == (DAY + timedelta(weeks=2)).isoformat()
+
+    occurrences = (await client.get(f"/recurring-bookings/{series['id']}/occurrences",
+                                    params={"start": DAY.isoformat(), "end": (DAY + timedelta(weeks=4)).isoformat()})).json()
+    assert [row["start_time"] for row in occurrences] == [at(DAY + timedelta(weeks=week), 8).isoformat() for week in range(3)]
+    assert all(row["id"] < 0 for row in occurrences)
+    assert await listed(client, DAY + timedelta(days=1)) == []
+    assert await listed(client, DAY) == [(recurrence.occurrence_id(series["id"], DAY), at(DAY, 8).isoformat())]
+
+
+@pytest.mark.anyio
+async def test_skip_and_move_exceptions(client, dock):
+    series = (await client.post("/recurring-bookings/", json=series_request())).json()
+    skipped, moved = DAY + timedelta(days=1), DAY + timedelta(days=2)
+
+    response = await client.put(f"/recurring-bookings/{series['id']}/exceptions/{skipped}", json={"skip": True})
+    assert response.status_code == 200
+    assert await listed(client, skipped) == []
+
+    response = await client.put(f"/recurring-bookings/{series['id']}/exceptions/{moved}", json={
+        "new_start": at(moved, 14).isoformat(), "new_end": at(moved, 15).isoformat(),
+    })
+    assert response.status_code == 200
+    assert await listed(client, moved) == [(recurrence.occurrence_id(series["id"], moved), at(moved, 14).isoformat())]
+    # The slot it left is free, the one it took is not
+    assert (await client.post("/bookings/", json=booking_request(at(moved, 8)))).status_code == 200
+    assert (await client.post("/bookings/", json=booking_request(at(moved, 14, 30)))).status_code == 400
+
+    assert (await client.delete(f"/recurring-bookings/{series['id']}/exceptions/{skipped}")).status_code == 204
+    assert await listed(client, skipped) == [(recurrence.occurrence_id(series["id"], skipped), at(skipped, 8).isoformat())]
+
+
+@pytest.mark.anyio
+async def test_series_and_bookings_conflict_both_ways(client, dock):
+    assert (await client.post("/bookings/", json=booking_request(at(DAY + timedelta(days=3), 8, 30)))).status_code == 200
+    response = await client.post("/recurring-bookings/", json=series_request())
+    assert response.status_code == 400 and (DAY + timedelta(days=3)).isoformat() in response.json()["detail"]
+
+    response = await client.post("/recurring-bookings/", json=series_request(skip_dates=[(DAY + timedelta(days=3)).isoformat()]))
+    assert response.status_code == 200
+    assert (await client.post("/bookings/", json=booking_request(at(DAY, 8, 30)))).status_code == 400
+    assert (await client.post("/bookings/", json=booking_request(at(DAY, 9)))).status_code == 200
+
+
+@pytest.mark.anyio
+async def test_booking_check_sees_a_series_added_by_another_worker(client, dock):
+    async with database.AsyncSessionLocal() as db:
+        await recurrence_index.catalog(db) # Cached, and inside its TTL
+    # Written behind this worker's back: its catalog is not invalidated
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.RecurringBooking).values(
+            dock_id=1, rule="FREQ=DAILY", starts_on=DAY, start_time=time(8), duration_minutes=60,
+            carrier_name="Elsewhere", po_number="PO-OTHER", is_active=True,
+        ))
+    assert (await client.post("/bookings/", json=booking_request(at(DAY, 8, 30)))).status_code == 400
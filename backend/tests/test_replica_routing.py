@@ -0,0 +1,82 @@
+"""
+Read-replica routing: every response shows which database served it, since the replica
+never catches up with the primary.
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+from starlette.requests import Request
+
+from app import database, models
+
+pytestmark = pytest.mark.anyio
+
+ADMIN = {"X-Forwarded-For": "10.0.0.1"}
+OTHER = {"X-Forwarded-For": "10.0.0.2"}
+
+
+async def seed(engine, name: str):
+    """One dock and one past booking, both labelled with the database's name."""
+    async with engine.begin() as conn:
+        await conn.execute(insert(models.Dock).values(id=1, name=name, capabilities=["General"], is_active=True))
+        start = datetime(2026, 1, 5, 9)
+        await conn.execute(insert(models.Booking).values(
+            dock_id=1, start_time=start, end_time=start + timedelta(hours=1), carrier_name=name,
+            po_number=f"PO-{name}", status=models.BookingStatus.COMPLETED,
+        ))
+
+
+@pytest.fixture
+async def labelled(engines):
+    primary, replicas = engines
+    await seed(primary, "primary")
+    await seed(replicas[0], "replica")
+
+
+def served_by(response) -> set:
+    return {row["carrier_name"] for row in response.json()}
+
+
+async def test_reads_go_to_the_replica(client, labelled):
+    assert served_by(await client.get("/bookings/", headers=ADMIN)) == {"replica"}
+    assert (await client.get("/drivers/", headers=ADMIN)).status_code == 200
+    response = await client.get("/health/db")
+    assert [replica["status"] for replica in response.json()["replicas"]] == ["ok"]
+
+
+async def test_cached_renderings_come_from_the_primary(client, labelled):
+    response = await client.get("/docks/", headers=ADMIN)
+    assert [dock["name"] for dock in response.json()] == ["primary"]
+    response = await client.get("/bookings/", params={"date": "2026-01-05"}, headers=ADMIN)
+    assert served_by(response) == {"primary"}
+
+
+async def test_writer_reads_its_own_writes_for_the_window(client, labelled):
+    start = datetime.now() + timedelta(days=30)
+    response = await client.post("/bookings/", headers=ADMIN, json={
+        "dock_id": 1, "start_time": start.isoformat(), "end_time": (start + timedelta(hours=1)).isoformat(),
+        "carrier_name": "admin", "po_number": "PO-ADMIN",
+    })
+    assert response.status_code == 200
+
+    assert served_by(await client.get("/bookings/", headers=ADMIN)) == {"primary", "admin"}
+    assert served_by(await client.get("/bookings/", headers=OTHER)) == {"replica"}
+
+    await asyncio.sleep(database.READ_YOUR_WRITES_SECONDS * 2)
+    assert served_by(await client.get("/bookings/", headers=ADMIN)) == {"replica"}
+
+
+def request(peer: str, forwarded: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (peer, 1234)})
+
+
+def test_forwarded_for_is_only_believed_from_a_trusted_proxy():
+    router = database.ReadRouter([], trusted_proxies={"10.0.0.254"})
+    assert router.client_key(request("203.0.113.9", "10.0.0.1")) == "203.0.113.9"
+    assert router.client_key(request("10.0.0.254", "10.0.0.1")) == "10.0.0.1"
+    # A client can prepend anything; the proxy's own entry is the one that counts
+    assert router.client_key(request("10.0.0.254", "10.0.0.1, 198.51.100.7")) == "198.51.100.7"
+    assert router.client_key(request("10.0.0.254")) == "10.0.0.254"
@@ -0,0 +1,96 @@
+"""
+Cached day schedules. conftest turns the cache off for every other test; here it is
+on, with the in-process backend emptied first.
+"""
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import insert
+
+from app import database, models, response_cache as response_cache_module
+from app.response_cache import response_cache
+
+pytestmark = pytest.mark.anyio
+
+DAY = date.today() + timedelta(days=1)
+SLOT = datetime.combine(DAY, datetime.min.time()) + timedelta(hours=9)
+
+
+def payload(start: datetime, index: int = 0):
+    return {
+        "dock_id": 1,
+        "start_time": start.isoformat(),
+        "end_time": (start + timedelta(hours=1)).isoformat(),
+        "carrier_name": f"Carrier {index}",
+        "po_number": f"PO-{index:05d}",
+    }
+
+
+@pytest.fixture
+async def cached(client, monkeypatch):
+    monkeypatch.setattr(response_cache_module, "RESPONSE_CACHE_ENABLED", True)
+    await response_cache.invalidate_all()
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Dock).values(id=1, name="Dock 1", capabilities=["General"], is_active=True))
+    return client
+
+
+async def schedule(client, day: date, etag: str = None):
+    headers = {"If-None-Match": etag} if etag else {}
+    return await client.get("/bookings/", params={"date": day.isoformat()}, headers=headers)
+
+
+def pos(response):
+    return [booking["po_number"] for booking in response.json()]
+
+
+async def test_matching_etag_gets_not_modified(cached):
+    await cached.post("/bookings/", json=payload(SLOT))
+    first = await schedule(cached, DAY)
+    etag = first.headers["ETag"]
+
+    response = await schedule(cached, DAY, etag)
+    assert response.status_code == 304 and response.content == b""
+    assert response.headers["ETag"] == etag
+    assert (await schedule(cached, DAY, f'"other", W/{etag}')).status_code == 304
+    assert (await schedule(cached, DAY, '"other"')).status_code == 200
+
+
+async def test_writes_the_cache_did_not_hear_about_stay_hidden(cached):
+    etag = (await schedule(cached, DAY)).headers["ETag"]
+    # Straight into the database, so nothing invalidates the cached schedule
+    async with database.engine.begin() as conn:
+        await conn.execute(insert(models.Booking).values(
+            dock_id=1, start_time=SLOT, end_time=SLOT + timedelta(hours=1), carrier_name="Carrier",
+            po_number="PO-DIRECT", status=models.BookingStatus.CONFIRMED,
+        ))
+    assert (await schedule(cached, DAY, etag)).status_code == 304
+
+
+async def test_new_booking_changes_the_etag(cached):
+    before = await schedule(cached, DAY)
+    other_day = await schedule(cached, DAY + timedelta(days=1))
+    assert (await cached.post("/bookings/", json=payload(SLOT, 1))).status_code == 200
+
+    response = await schedule(cached, DAY, before.headers["ETag"])
+    assert response.status_code == 200 and response.headers["ETag"] != before.headers["ETag"]
+    assert pos(response) == ["PO-00001"]
+    assert (await schedule(cached, DAY + timedelta(days=1), other_day.headers["ETag"])).status_code == 304
+
+
+async def test_move_across_dates_refreshes_both_days(cached):
+    booking = (await cached.post("/bookings/", json=payload(SLOT, 1))).json()
+    next_day = DAY + timedelta(days=1)
+    old_day, new_day = await schedule(cached, DAY), await schedule(cached, next_day)
+    assert pos(old_day) == ["PO-00001"] and pos(new_day) == []
+
+    moved = SLOT + timedelta(days=1)
+    response = await cached.put(f"/bookings/{booking['id']}", json={
+        "start_time": moved.isoformat(), "end_time": (moved + timedelta(hours=1)).isoformat(),
+    })
+    assert response.status_code == 200
+
+    response = await schedule(cached, DAY, old_day.headers["ETag"])
+    assert response.status_code == 200 and pos(response) == []
+    response = await schedule(cached, next_day, new_day.headers["ETag"])
+    assert response.status_code == 200 and pos(response) == ["PO-00001"]
@@ -40,11 +40,18 @@ export default function CarrierDatabase() {
     useEffect(() => {
         const fetchDrivers = async () => {
             try {
-                const res = await fetch(`${API_BASE_URL}/drivers/`)
-                if (res.ok) {
-                    const data = await res.json()
-                    setDrivers(data)
-                }
+                // Page through /drivers/ (most recent visit first) until a short page ends the list
+                const pageSize = 1000
+                const all: DriverSummary[] = []
+                let page: DriverSummary[] = []
+                do {
+                    const params = new URLSearchParams({ skip: String(all.length), limit: String(pageSize) })
+                    const res = await fetch(`${API_BASE_URL}/drivers/?${params}`)
+                    if (!res.ok) throw new Error("Failed to fetch drivers")
+                    page = await res.json()
+                    all.push(...page)
+                } while (page.length === pageSize)
+                setDrivers(all)
             } catch (error) {
                 console.error("Failed to fetch drivers", error)
             } finally {
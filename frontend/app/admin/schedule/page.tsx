@@ -34,7 +34,7 @@ interface Booking {
     po_number: string
     odoo_order_id?: number
     driver_phone: string
-    status: "Pending" | "Confirmed" | "Arrived" | "Completed" | "Cancelled" | "Late" | "Rescheduled"
+    status: "Pending" | "Confirmed" | "Arrived" | "Completed" | "Cancelled" | "Late" | "Rescheduled" | "No Show"
 }
 
 // Draggable Booking Component
@@ -56,6 +56,7 @@ const DraggableBooking = ({ booking, style, onClick }: { booking: Booking, style
             case "Completed": return "bg-slate-100 border-slate-300 text-slate-500"
             case "Late": return "bg-red-100 border-red-500 text-red-700"
             case "Rescheduled": return "bg-orange-100 border-orange-500 text-orange-700"
+            case "No Show": return "bg-zinc-100 border-zinc-400 text-zinc-500 line-through"
             case "Confirmed":
             default: return "bg-blue-100 border-blue-500 text-blue-700 hover:bg-blue-200"
         }
@@ -125,6 +126,58 @@ export default function SchedulePage() {
         fetchData()
     }, [date])
 
+    // Live updates: the backend pushes booking deltas for this day, so we don't re-fetch after every change
+    useEffect(() => {
+        const dateStr = format(date, 'yyyy-MM-dd')
+        let socket: WebSocket | null = null
+        let retry: ReturnType<typeof setTimeout> | null = null
+        let lastSeq: number | null = null
+        let epoch: string | null = null
+        let closed = false
+
+        const connect = () => {
+            const params = new URLSearchParams({ date: dateStr })
+            if (lastSeq !== null && epoch) {
+                // Resume: the server replays what we missed, or sends "reset"
+                params.set("since", String(lastSeq))
+                params.set("epoch", epoch)
+            }
+            socket = new WebSocket(`${API_BASE_URL.replace(/^http/, "ws")}/ws/schedule?${params}`)
+            socket.onmessage = (event) => {
+                const message = JSON.parse(event.data)
+                if (message.type === "hello") {
+                    epoch = message.epoch
+                    if (lastSeq === null) lastSeq = message.seq
+                    return
+                }
+                lastSeq = message.seq
+                if (message.type === "reset") {
+                    fetchData()
+                    return
+                }
+                applyBookingDelta(message.booking, dateStr)
+            }
+            socket.onclose = () => {
+                if (!closed) retry = setTimeout(connect, 3000)
+            }
+        }
+
+        connect()
+        return () => {
+            closed = true
+            if (retry) clearTimeout(retry)
+            socket?.close()
+        }
+    }, [date])
+
+    const applyBookingDelta = (booking: Booking, dateStr: string) => {
+        const onThisDay = format(parseISO(booking.start_time), 'yyyy-MM-dd') === dateStr
+        setBookings(prev => {
+            const others = prev.filter(b => b.id !== booking.id)
+            return onThisDay ? [...others, booking] : others
+        })
+    }
+
     const fetchData = async () => {
         setLoading(true)
         setErrorMsg("")
@@ -137,10 +190,17 @@ export default function SchedulePage() {
             const dockData = await dockRes.json()
             setDocks(dockData)
 
-            // 2. Fetch Bookings
-            const bookingRes = await fetch(`${API_BASE_URL}/bookings/?date=${dateStr}`)
-            if (!bookingRes.ok) throw new Error("Failed to fetch bookings")
-            const bookingData = await bookingRes.json()
+            // 2. Fetch Bookings (follow X-Next-Cursor until the whole day is loaded)
+            const bookingData: Booking[] = []
+            let cursor: string | null = null
+            do {
+                const params = new URLSearchParams({ date: dateStr, limit: "500" })
+                if (cursor) params.set("cursor", cursor)
+                const bookingRes = await fetch(`${API_BASE_URL}/bookings/?${params}`)
+                if (!bookingRes.ok) throw new Error("Failed to fetch bookings")
+                bookingData.push(...await bookingRes.json())
+                cursor = bookingRes.headers.get("X-Next-Cursor")
+            } while (cursor)
             setBookings(bookingData)
         } catch (error: any) {
             console.error("Failed to load schedule data", error)
@@ -187,6 +247,7 @@ export default function SchedulePage() {
             case "Completed": return "bg-slate-100 border-slate-300 text-slate-500"
             case "Late": return "bg-red-100 border-red-500 text-red-700"
             case "Rescheduled": return "bg-orange-100 border-orange-500 text-orange-700"
+            case "No Show": return "bg-zinc-100 border-zinc-400 text-zinc-500 line-through"
             case "Confirmed":
             default: return "bg-blue-100 border-blue-500 text-blue-700 hover:bg-blue-200"
         }
@@ -224,8 +285,9 @@ export default function SchedulePage() {
 
             if (!res.ok) throw new Error("Failed to reschedule")
 
+            // Other screens get this change through /ws/schedule; apply it here right away
+            applyBookingDelta(await res.json(), format(date, 'yyyy-MM-dd'))
             setIsSheetOpen(false)
-            fetchData()
         } catch (error) {
             console.error("Reschedule failed", error)
         }
@@ -584,11 +646,18 @@ export default function SchedulePage() {
                                         </Button>
                                         <Button
                                             variant="secondary"
-                                            className="w-full col-span-2"
+                                            className="w-full"
                                             onClick={() => { updateStatus("Late"); setIsSheetOpen(false) }}
                                         >
                                             Mark as Late
                                         </Button>
+                                        <Button
+                                            variant="secondary"
+                                            className="w-full"
+                                            onClick={() => { updateStatus("No Show"); setIsSheetOpen(false) }}
+                                        >
+                                            Mark as No Show
+                                        </Button>
                                     </div>
                                 </div>
                             )}
@@ -19,6 +19,13 @@ interface Dock {
     is_active: boolean
 }
 
+interface AvailabilitySlot {
+    start: string // "HH:MM:SS"
+    end: string
+    free_docks: number
+    dock_id: number
+}
+
 // Load Types Map
 const LOAD_TYPES = [
     { id: "General", label: "General Cargo", icon: Box, description: "Standard dry goods, pallets, boxes." },
@@ -44,8 +51,8 @@ export default function BookingWizard() {
     // We select a load type, which filters the capable docks.
     const [selectedLoadType, setSelectedLoadType] = useState("")
 
-    // bookings for the selected date across ALL docks
-    const [allBookings, setAllBookings] = useState<any[]>([])
+    // free slots for the selected date & load type, keyed by "HH:MM" (computed by the backend)
+    const [availableSlots, setAvailableSlots] = useState<Record<string, AvailabilitySlot>>({})
 
     // Form Fields
     const [poNumber, setPoNumber] = useState("")
@@ -104,60 +111,37 @@ export default function BookingWizard() {
         fetchDocks()
     }, [])
 
-    // Fetch All Bookings when Date changes
+    // Fetch Availability when Date or Load Type changes
     useEffect(() => {
-        if (selectedDate) {
-            fetchAllBookings(selectedDate)
+        if (selectedDate && selectedLoadType) {
+            fetchAvailability(selectedDate, selectedLoadType)
         }
-    }, [selectedDate])
+    }, [selectedDate, selectedLoadType])
 
-    const fetchAllBookings = async (date: string) => {
+    const fetchAvailability = async (date: string, loadType: string): Promise<Record<string, AvailabilitySlot>> => {
         try {
-            // We fetch bookings for ALL docks for this date to determine availability client-side
-            // In a real large-scale app, this filtering would happen on the backend.
-            const res = await fetch(`${API_BASE_URL}/bookings/?date=${date}`)
+            // The backend checks every capable dock against its occupancy index and only returns free slots
+            const params = new URLSearchParams({ date, capability: loadType, slot_minutes: "60" })
+            const res = await fetch(`${API_BASE_URL}/availability?${params}`)
             if (res.ok) {
                 const data = await res.json()
-                setAllBookings(data)
+                const slots: Record<string, AvailabilitySlot> = {}
+                for (const slot of data.slots) {
+                    slots[slot.start.slice(0, 5)] = slot
+                }
+                setAvailableSlots(slots)
+                return slots
             }
         } catch (e) {
-            console.error("Failed to fetch bookings")
+            console.error("Failed to fetch availability")
         }
+        return {}
     }
 
-    // Smart availability check
+    // A slot is available if at least one capable dock is free (past slots are never returned)
     const isTimeSlotAvailable = (time: string): boolean => {
         if (!selectedLoadType) return false
-
-        // 1. Find all docks that can handle this load type
-        const capableDocks = docks.filter(d => (d.capabilities || []).includes(selectedLoadType))
-        if (capableDocks.length === 0) return false
-
-        // 2. Check if passed (standard check)
-        if (selectedDate) {
-            const todayStr = new Date().toLocaleDateString('en-CA')
-            if (selectedDate === todayStr) {
-                const now = new Date()
-                const [slotHour, slotMinute] = time.split(':').map(Number)
-                const slotDate = new Date()
-                slotDate.setHours(slotHour, slotMinute, 0, 0)
-                if (now > slotDate) return false
-            }
-        }
-
-        // 3. Check if AT LEAST ONE capable dock is free at this time
-        // A dock is free if it doesn't have a booking at this time
-        const freeDocks = capableDocks.filter(dock => {
-            const bookingAtTime = allBookings.find(b => {
-                if (b.dock_id !== dock.id) return false
-                const d = new Date(b.start_time)
-                const bookingTime = d.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit', hour12: false })
-                return bookingTime === time
-            })
-            return !bookingAtTime // True if no booking found
-        })
-
-        return freeDocks.length > 0
+        return time in availableSlots
     }
 
     const handleNext = () => {
@@ -196,45 +180,24 @@ export default function BookingWizard() {
         setLoading(true)
         setMessage("")
 
-        // 1. Re-calculate the best dock (Smart Assign)
-        // We do this right before submit to ensure we pick a valid one.
-        const capableDocks = docks.filter(d => (d.capabilities || []).includes(selectedLoadType))
-
-        // Find the first dock that is free at the selected time
-        const availableDock = capableDocks.find(dock => {
-            const bookingAtTime = allBookings.find(b => {
-                if (b.dock_id !== dock.id) return false
-                const d = new Date(b.start_time)
-                const bookingTime = d.toLocaleTimeString([], { hour: '2-digit', minute: '2-digit', hour12: false })
-                return bookingTime === selectedTime
-            })
-            return !bookingAtTime
-        })
-
-        if (!availableDock) {
-            setMessage("Error: This slot was just taken. Please choose another.")
-            setLoading(false)
-            return
-        }
-
-        setAssignedDockId(availableDock.id)
-
         const startDateTime = new Date(`${selectedDate}T${selectedTime}`)
-        // Add 60 minutes for end time
+        // 60 minute visit; the server picks a capable dock that is free at that time (Smart Assign)
         const endDateTime = new Date(startDateTime.getTime() + 60 * 60 * 1000)
 
         const payload = {
-            dock_id: availableDock.id,
+            capability: selectedLoadType,
+            window_start: format(startDateTime, "yyyy-MM-dd'T'HH:mm:ss"),
+            window_end: format(endDateTime, "yyyy-MM-dd'T'HH:mm:ss"),
+            duration_minutes: 60,
+            strategy: "best_fit",
             po_number: poNumber,
             odoo_order_id: odooOrderId,
             carrier_name: `${carrierName || "Independent"} (${vehicleType})`, // Combine vehicle type since backend doesn't have a field for it yet
-            start_time: format(startDateTime, "yyyy-MM-dd'T'HH:mm:ss"),
-            end_time: format(endDateTime, "yyyy-MM-dd'T'HH:mm:ss"),
             driver_phone: contactPhone || "N/A"
         }
 
         try {
-            const res = await fetch(`${API_BASE_URL}/bookings/`, {
+            const res = await fetch(`${API_BASE_URL}/bookings/auto`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
                 body: JSON.stringify(payload)
@@ -251,6 +214,7 @@ export default function BookingWizard() {
             }
 
             const booking = await res.json()
+            setAssignedDockId(booking.dock_id)
             setBookingRef(`BK-${booking.id}`)
             setStep(5)
         } catch (error: any) {